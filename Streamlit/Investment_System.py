@@ -1,45 +1,101 @@
-import streamlit as st
+# Core engine: keep this import path to numpy/pandas/joblib. UI (streamlit,
+# plotly) and HTTP (requests) imports belong in streamlit_app.py and api.py;
+# benchmarks/import_time.py fails if they come back.
 import pandas as pd
 import numpy as np
-from datetime import datetime
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import json
-import requests
-from typing import Dict, Any, List
-import warnings
 import joblib
+import logging
 import os
-warnings.filterwarnings('ignore')
+import time
+from feature_builder import FeatureBuilder, MODEL_FEATURES, present_fields
+from fast_inference import FastRowScorer
+from compiled_model import MANIFEST_FILE
+from artifact_store import ArtifactStore, LazyModelPipelines
+from catalog import CatalogStore, DEFAULT_CATALOG_PATH
+from ensemble import ModelEnsemble, load_ensemble_config
+from suitability import RISK_CODES, risk_codes, suitability_points, top_products
+from recommendation_result import RecommendationResult
+from metrics import REGISTRY
+from artifact_store import MODEL_LOAD_SECONDS
+
+# Handlers are set up by the entry point (logging_setup.configure_logging); per-request
+# detail is logged at DEBUG with lazy %-arguments, so it costs nothing at INFO
+logger = logging.getLogger(__name__)
+
+# Features the model pipelines expect, in the fixed order used for the row buffer
+EXPECTED_FEATURES = [
+    'savings_usage', 'education_level_encoded', 'location_type_encoded',
+    'formal_service_use', 'mobile_banking', 'age', 'monthly_income',
+    'monthly_expenses', 'current_savings', 'debt_amount', 'dependents',
+    'household_size'
+]
+
+# Largest probability gap allowed between the low-latency and DataFrame paths
+FAST_PATH_TOLERANCE = 1e-6
+
+# With the low-latency scorer, batches up to this size are scored row by row:
+# building the column-wise frames costs more than the per-row path below ~100 rows
+PER_ROW_BATCH_LIMIT = 64
+# get_recommendations returns at most this many products
+SINGLE_RECOMMENDATION_LIMIT = 5
+
+# Per-thread, lock-free metrics (metrics.py), served by the API at /metrics.
+# Stages: segmentation, feature_mapping, model_inference, suitability_scoring
+# (on the low-latency path feature mapping is part of model_inference)
+STAGE_SECONDS = REGISTRY.histogram(
+    "recommendation_stage_seconds", "Time spent in each stage of recommendation generation", ("mode", "stage"))
+FALLBACK_RECOMMENDATIONS = REGISTRY.counter(
+    "recommendation_fallbacks_total", "Recommendations served from a fallback path", ("path",))
 
 
 class InvestmentRecommendationSystem:
-    def __init__(self):
-        self.investment_products = self._define_investment_products()
-        self.risk_categories = self._define_risk_categories()
+    def __init__(self, low_latency=False, use_compiled=True, deployment_folder="deployment",
+                 catalog_path=DEFAULT_CATALOG_PATH, recommendation_cache=None, use_ensemble=False,
+                 ensemble_config=None):
+        # Product catalog: compiled from the JSON file, shared across instances, hot-reloaded
+        self.catalog = CatalogStore.shared(catalog_path)
         self.segment_recommendations = self._define_segment_recommendations()
         self.best_model_name = None
         self.model_pipelines = {}
         self.model_config = None
         self.preprocessor = None
+        self.feature_builder = FeatureBuilder()
+        self.low_latency = low_latency
+        self.fast_scorer = None
+        self.use_compiled = use_compiled
+        self.compiled_models = False
+        self.deployment_folder = deployment_folder
+        # Optional RecommendationCache; model_generation bumps on every model (re)load to invalidate it
+        self.recommendation_cache = recommendation_cache
+        self.model_generation = 0
+        # Ensemble mode: blend all loaded models (settings: dict, JSON path or deployment/ensemble_config.json)
+        self.use_ensemble = use_ensemble
+        self.ensemble_config = ensemble_config
+        self.ensemble = None
+        # (product index, {suitability band key: ranking}) for _rank_user_products
+        self._ranking_memo = (None, {})
         
-        # Automatically load saved models on initialization
-        self.load_saved_models()
+        # Automatically load saved models on initialization, preferring the
+        # NumPy-only compiled export when it matches the pickled pipelines
+        if not (use_compiled and self.load_compiled_models()):
+            self.load_saved_models()
 
     def set_model(self, model_name, pipeline):
         """Set the ML model for predictions"""
         self.best_model_name = model_name
         self.model_pipelines = {model_name: {'pipeline': pipeline}}
+        self.model_generation += 1
+        self._prepare_ensemble()
+        self._prepare_fast_scorer()
 
     def load_saved_models(self):
         """Load all saved model components from deployment folder"""
         try:
-            deployment_folder = "deployment"
+            deployment_folder = self.deployment_folder
             
             # Check if deployment folder exists
             if not os.path.exists(deployment_folder):
-                print(f"Deployment folder '{deployment_folder}' not found. Using rule-based recommendations only.")
+                logger.warning("Deployment folder '%s' not found. Using rule-based recommendations only.", deployment_folder)
                 return False
             
             # Define file paths
@@ -50,226 +106,228 @@ class InvestmentRecommendationSystem:
             # Load model configuration
             if os.path.exists(config_path):
                 self.model_config = joblib.load(config_path)
-                print(f"✅ Loaded model configuration")
+                logger.info("✅ Loaded model configuration")
             else:
-                print(f"❌ Model config file not found: {config_path}")
+                logger.error("❌ Model config file not found: %s", config_path)
                 return False
             
-            # Load model pipelines
-            if os.path.exists(pipelines_path):
-                self.model_pipelines = joblib.load(pipelines_path)
-                print(f"✅ Loaded model pipelines: {list(self.model_pipelines.keys())}")
+            # Load model pipelines, one file per model on first use when the
+            # split artifact store (artifact_store.py) is present and current
+            store = self._open_artifact_store("pipelines", pipelines_path)
+            if store is not None or os.path.exists(pipelines_path):
+                if store is not None:
+                    self.model_pipelines = LazyModelPipelines(store)
+                    logger.info("✅ Found model pipelines (loaded on first use): %s", list(self.model_pipelines.keys()))
+                else:
+                    started = time.perf_counter()
+                    self.model_pipelines = joblib.load(pipelines_path)
+                    MODEL_LOAD_SECONDS.observe(time.perf_counter() - started, "pipelines_bundle")
+                    logger.info("✅ Loaded model pipelines: %s", list(self.model_pipelines.keys()))
                 
                 # Set the best model from config
                 if self.model_config and 'best_model' in self.model_config:
                     self.best_model_name = self.model_config['best_model']
-                    print(f"✅ Best model set to: {self.best_model_name}")
+                    logger.info("✅ Best model set to: %s", self.best_model_name)
                 else:
                     # Use the first available model
                     self.best_model_name = list(self.model_pipelines.keys())[1] if self.model_pipelines else None
-                    print(f"✅ Using first available model: {self.best_model_name}")
+                    logger.info("✅ Using first available model: %s", self.best_model_name)
                     
             else:
-                print(f"❌ Model pipelines file not found: {pipelines_path}")
+                logger.error("❌ Model pipelines file not found: %s", pipelines_path)
                 return False
             
             # Load preprocessor
             if os.path.exists(preprocessor_path):
                 self.preprocessor = joblib.load(preprocessor_path)
-                print(f"✅ Loaded preprocessor")
+                logger.info("✅ Loaded preprocessor")
             else:
-                print(f"❌ Preprocessor file not found: {preprocessor_path}")
+                logger.error("❌ Preprocessor file not found: %s", preprocessor_path)
                 return False
             
-            print(f"🚀 All model components loaded successfully!")
+            self.model_generation += 1
+            self._prepare_ensemble()
+            self._prepare_fast_scorer()
+            logger.info("🚀 All model components loaded successfully!")
             return True
             
         except Exception as e:
-            print(f"❌ Error loading saved models: {str(e)}")
-            print("Continuing with rule-based recommendations only.")
+            logger.error("❌ Error loading saved models: %s", e)
+            logger.warning("Continuing with rule-based recommendations only.")
+            return False
+
+    def load_compiled_models(self):
+        """Load models exported by compiled_model.py from deployment/compiled (no sklearn needed)"""
+        try:
+            config_path = os.path.join(self.deployment_folder, "investment_model_config.pkl")
+            pipelines_path = os.path.join(self.deployment_folder, "investment_model_pipelines.pkl")
+
+            store = self._open_artifact_store("compiled", pipelines_path)
+            if store is None:
+                return False
+
+            if os.path.exists(config_path):
+                self.model_config = joblib.load(config_path)
+                logger.info("✅ Loaded model configuration")
+
+            # Only the manifest is read here; each model is mapped in on first use
+            self.model_pipelines = LazyModelPipelines(store)
+            logger.info("✅ Found compiled models: %s", list(self.model_pipelines.keys()))
+
+            # Same best-model selection as load_saved_models
+            if self.model_config and 'best_model' in self.model_config:
+                self.best_model_name = self.model_config['best_model']
+                logger.info("✅ Best model set to: %s", self.best_model_name)
+            else:
+                self.best_model_name = list(self.model_pipelines.keys())[1] if self.model_pipelines else None
+                logger.info("✅ Using first available model: %s", self.best_model_name)
+
+            self.compiled_models = True
+            self.model_generation += 1
+            self._prepare_ensemble()
+            self._prepare_fast_scorer()
+            logger.info("🚀 Compiled model components loaded successfully!")
+            return True
+
+        except Exception as e:
+            logger.error("❌ Error loading compiled models: %s", e)
+            self.model_pipelines = {}
+            self.best_model_name = None
+            return False
+
+    def _open_artifact_store(self, name, source_path):
+        """Open deployment/<name> as an ArtifactStore, or None if it is missing or out of date"""
+        folder = os.path.join(self.deployment_folder, name)
+        if not os.path.exists(os.path.join(folder, MANIFEST_FILE)):
+            return None
+
+        store = ArtifactStore(folder)
+        # Ignore a store left behind after the pipelines were retrained
+        if not store.is_current(source_path):
+            logger.error("❌ %s is out of date with %s; re-export it", folder, source_path)
+            return None
+        return store
+
+    def _cache_generation(self):
+        """Version of everything a cached recommendation depends on besides the profile"""
+        return (self.model_generation, self.best_model_name, self.catalog.current().generation)
+
+    def _prepare_ensemble(self):
+        """Build the model ensemble over the loaded pipelines when ensemble mode is on"""
+        # The previous ensemble's thread pool would otherwise outlive it
+        if self.ensemble is not None:
+            self.ensemble.shutdown()
+        self.ensemble = None
+        if not self.use_ensemble or not self.model_pipelines:
             return False
 
+        try:
+            config = load_ensemble_config(self.ensemble_config, self.deployment_folder)
+            self.ensemble = ModelEnsemble.from_config(self.model_pipelines, config)
+            logger.info("🧩 Ensemble enabled (%s): %s, gate %s", self.ensemble.method,
+                        self.ensemble.members, self.ensemble.gate_model)
+            return True
+        except Exception as e:
+            logger.error("❌ Ensemble unavailable, using %s only: %s", self.best_model_name, e)
+            return False
+
+    def _prepare_fast_scorer(self):
+        """Build the low-latency scorer for the best model and check it against the DataFrame path"""
+        self.fast_scorer = None
+        if not self.low_latency or self.ensemble is not None or self.best_model_name not in self.model_pipelines:
+            return False
+
+        try:
+            scorer, gap = self._select_fast_scorer(self.model_pipelines[self.best_model_name]['pipeline'])
+            if gap <= FAST_PATH_TOLERANCE:
+                self.fast_scorer = scorer
+                logger.info("⚡ Low-latency inference enabled for %s (%s)", self.best_model_name, scorer.dtype)
+                return True
+
+            logger.warning("❌ Low-latency path differs from DataFrame path by %.2e; keeping DataFrame path", gap)
+            return False
+
+        except Exception as e:
+            logger.warning("❌ Low-latency inference unavailable: %s", e)
+            return False
+
+    def _select_fast_scorer(self, pipeline, profiles=None):
+        """(scorer, parity gap) for a pipeline: the float32 buffer, or float64 if rounding moves a prediction"""
+        reference = lambda user_data: self._predict_proba_dataframe(pipeline, user_data)
+        for dtype in (np.float32, np.float64):
+            scorer = FastRowScorer(pipeline, self.feature_builder, EXPECTED_FEATURES, dtype=dtype)
+            gap = scorer.check_parity(reference, profiles)
+            if gap <= FAST_PATH_TOLERANCE:
+                break
+        return scorer, gap
+
+    def check_fast_path_parity(self, profiles=None):
+        """Gap between the low-latency and DataFrame paths over profiles for every loaded pipeline,
+        using the dtype the loader selects for it: {model name: (dtype name, gap)}"""
+        gaps = {}
+        for model_name, model_entry in self.model_pipelines.items():
+            pipeline = model_entry['pipeline']
+            scorer, _ = self._select_fast_scorer(pipeline)
+            gaps[model_name] = (scorer.dtype.name, scorer.check_parity(
+                lambda user_data: self._predict_proba_dataframe(pipeline, user_data), profiles))
+        return gaps
+
+    def _predict_proba_dataframe(self, pipeline, user_data):
+        """Reference prediction through the one-row DataFrame path"""
+        user_df = pd.DataFrame([self._map_user_data_to_model_features(user_data)])
+        return pipeline.predict_proba(self._add_missing_features(user_df))
+
     def _map_user_data_to_model_features(self, user_data):
         """Map current user data fields to expected model features"""
         try:
-            # Create a mapping from your current fields to model expected fields
-            mapped_data = {}
-            
-            # Direct mappings (if field names match)
-            direct_mappings = {
-                'age': 'age',
-                'monthly_income': 'monthly_income', 
-                'monthly_expenses': 'monthly_expenses',
-                'current_savings': 'current_savings',
-                'debt_amount': 'debt_amount',
-                'dependents': 'dependents',
-                'household_size': 'household_size'
-            }
-            
-            for current_field, model_field in direct_mappings.items():
-                if current_field in user_data:
-                    mapped_data[model_field] = user_data[current_field]
-            
-            # Complex mappings for encoded features
-            
-            # Education level encoding
-            education_mapping = {
-                'Primary': 0,
-                'Secondary': 1,
-                'College/University': 2,
-                'Postgraduate': 3
-            }
-            education = user_data.get('education', 'Secondary')
-            mapped_data['education_level_encoded'] = education_mapping.get(education, 1)
-            
-            # Location type encoding
-            location_mapping = {
-                'Rural': 0,
-                'Semi-Urban': 1,
-                'Urban': 2
-            }
-            location = user_data.get('location', 'Urban')
-            mapped_data['location_type_encoded'] = location_mapping.get(location, 2)
-            
-            # Savings usage (derive from current_savings and monthly_income)
-            current_savings = user_data.get('current_savings', 0)
-            monthly_income = user_data.get('monthly_income', 30000)
-            if monthly_income > 0:
-                mapped_data['savings_usage'] = min(1.0, current_savings / (monthly_income * 6))  # Months of savings
-            else:
-                mapped_data['savings_usage'] = 0.0
-            
-            # Formal service use (derive from investment experience and employment)
-            experience = user_data.get('investment_experience', 'Beginner')
-            employment = user_data.get('employment', 'Employed')
-            
-            formal_service_score = 0
-            if 'Advanced' in experience:
-                formal_service_score += 0.4
-            elif 'Intermediate' in experience:
-                formal_service_score += 0.2
-            
-            if employment in ['Employed', 'Self-Employed']:
-                formal_service_score += 0.3
-            
-            if monthly_income > 50000:
-                formal_service_score += 0.3
-            
-            mapped_data['formal_service_use'] = min(1.0, formal_service_score)
-            
-            # Mobile banking usage (assume based on age and location)
-            age = user_data.get('age', 30)
-            mobile_banking_score = 0.5  # Base assumption
-            
-            if age < 45:  # Younger people more likely to use mobile banking
-                mobile_banking_score += 0.3
-            if location in ['Urban', 'Semi-Urban']:
-                mobile_banking_score += 0.2
-            if monthly_income > 30000:
-                mobile_banking_score += 0.2
-                
-            mapped_data['mobile_banking'] = min(1.0, mobile_banking_score)
-            
-            # Add any other features that might be missing with default values
-            default_features = {
-                'risk_score': self._calculate_risk_score(user_data),
-                'investment_capacity': self._calculate_investment_capacity(user_data),
-                'financial_stability': self._calculate_financial_stability(user_data)
-            }
-            
-            mapped_data.update(default_features)
-            
-            print(f"✅ Mapped {len(user_data)} input features to {len(mapped_data)} model features")
+            # FeatureBuilder.row_values is the one scalar mapping; None fields count as absent there
+            mapped_data = dict(zip(MODEL_FEATURES, self.feature_builder.row_values(user_data)))
+            logger.debug("✅ Mapped %d input features to %d model features", len(user_data), len(mapped_data))
             return mapped_data
-            
+
         except Exception as e:
-            print(f"❌ Error mapping user data: {str(e)}")
+            logger.error("❌ Error mapping user data: %s", e)
             return user_data  # Return original if mapping fails
 
+    def _mapped_feature(self, user_data, feature, default):
+        try:
+            return self.feature_builder.row_values(user_data)[MODEL_FEATURES.index(feature)]
+        except Exception:
+            return default
+
     def _calculate_risk_score(self, user_data):
         """Calculate a risk score for the user"""
-        try:
-            age = user_data.get('age', 30)
-            income = user_data.get('monthly_income', 30000)
-            experience = user_data.get('investment_experience', 'Beginner')
-            
-            risk_score = 0.3  # Base risk
-            
-            if age < 35:
-                risk_score += 0.3
-            elif age > 55:
-                risk_score -= 0.2
-                
-            if income > 100000:
-                risk_score += 0.2
-            elif income < 25000:
-                risk_score -= 0.1
-                
-            if 'Advanced' in experience:
-                risk_score += 0.3
-            elif 'Beginner' in experience:
-                risk_score -= 0.2
-                
-            return max(0.0, min(1.0, risk_score))
-        except:
-            return 0.5
+        return self._mapped_feature(user_data, 'risk_score', 0.5)
 
     def _calculate_investment_capacity(self, user_data):
         """Calculate investment capacity based on income and expenses"""
-        try:
-            income = user_data.get('monthly_income', 30000)
-            expenses = user_data.get('monthly_expenses', 20000)
-            debt = user_data.get('debt_amount', 0)
-            
-            disposable_income = income - expenses
-            debt_to_income_ratio = debt / income if income > 0 else 1
-            
-            capacity = disposable_income / income if income > 0 else 0
-            capacity = capacity * (1 - debt_to_income_ratio)  # Reduce by debt burden
-            
-            return max(0.0, min(1.0, capacity))
-        except:
-            return 0.3
+        return self._mapped_feature(user_data, 'investment_capacity', 0.3)
 
     def _calculate_financial_stability(self, user_data):
         """Calculate financial stability score"""
-        try:
-            income = user_data.get('monthly_income', 30000)
-            savings = user_data.get('current_savings', 0)
-            employment = user_data.get('employment', 'Unemployed')
-            emergency_fund = user_data.get('emergency_fund', 'No')
-            
-            stability = 0.2  # Base stability
-            
-            # Employment stability
-            if employment == 'Employed':
-                stability += 0.3
-            elif employment == 'Self-Employed':
-                stability += 0.2
-            
-            # Emergency fund
-            if emergency_fund == 'Yes':
-                stability += 0.3
-            elif emergency_fund == 'Partial':
-                stability += 0.15
-            
-            # Savings buffer
-            if income > 0:
-                savings_months = savings / income
-                stability += min(0.2, savings_months * 0.05)
-            
-            return max(0.0, min(1.0, stability))
-        except:
-            return 0.5
+        return self._mapped_feature(user_data, 'financial_stability', 0.5)
 
     def get_model_prediction(self, user_data):
         """Get prediction from loaded ML model with proper feature mapping"""
         try:
             if not self.best_model_name or self.best_model_name not in self.model_pipelines:
-                print("No model available for prediction")
+                logger.debug("No model available for prediction")
                 return None
             
+            # Low-latency path: fill the preallocated row buffer, no DataFrame
+            if self.fast_scorer is not None:
+                try:
+                    started = time.perf_counter()
+                    prediction_proba = self.fast_scorer.predict_proba(user_data)
+                    STAGE_SECONDS.observe(time.perf_counter() - started, "single", "model_inference")
+                    if prediction_proba.shape[1] > 1:
+                        return prediction_proba[0][1]
+                    return prediction_proba[0][0]
+                except Exception as e:
+                    logger.warning("❌ Low-latency prediction failed, using DataFrame path: %s", e)
+
             # Map user data to expected model features
+            started = time.perf_counter()
             mapped_data = self._map_user_data_to_model_features(user_data)
             
             # Convert to DataFrame
@@ -277,8 +335,18 @@ class InvestmentRecommendationSystem:
             
             # Ensure all required features are present
             user_df = self._add_missing_features(user_df)
+            STAGE_SECONDS.observe(time.perf_counter() - started, "single", "feature_mapping")
+            started = time.perf_counter()
             
-            print(f"🔧 Model input features: {list(user_df.columns)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("🔧 Model input features: %s", list(user_df.columns))
+            
+            # Ensemble mode: every member scores the same feature frame
+            if self.ensemble is not None:
+                investment_probability = float(self.ensemble.predict_proba(user_df)[0])
+                STAGE_SECONDS.observe(time.perf_counter() - started, "single", "model_inference")
+                logger.debug("🧩 Ensemble prediction: %.2f%% investment probability", investment_probability * 100)
+                return investment_probability
             
             # Get the pipeline
             pipeline = self.model_pipelines[self.best_model_name]['pipeline']
@@ -295,29 +363,56 @@ class InvestmentRecommendationSystem:
                 # Fallback to regular prediction
                 prediction = pipeline.predict(user_df)[0]
                 investment_probability = float(prediction) if isinstance(prediction, (int, float)) else 0.5
+            STAGE_SECONDS.observe(time.perf_counter() - started, "single", "model_inference")
             
-            print(f"🎯 Model prediction: {investment_probability:.2%} investment probability")
+            logger.debug("🎯 Model prediction: %.2f%% investment probability", investment_probability * 100)
             return investment_probability
             
         except Exception as e:
-            print(f"❌ Error making model prediction: {str(e)}")
-            import traceback
-            print(f"Full error: {traceback.format_exc()}")
+            # Traceback is only formatted if the record is actually emitted
+            logger.exception("❌ Error making model prediction: %s", e)
+            return None
+
+    def get_model_predictions(self, users_df, chunk_size=1024):
+        """Get investment probabilities for many users, one predict_proba call per chunk"""
+        if not self.best_model_name or self.best_model_name not in self.model_pipelines:
+            return None
+
+        try:
+            pipeline = self.model_pipelines[self.best_model_name]['pipeline']
+
+            # Build the whole feature matrix column-wise, in the pipeline's column order
+            columns = list(getattr(pipeline, 'feature_names_in_', MODEL_FEATURES))
+            started = time.perf_counter()
+            features = self.feature_builder.build(users_df, columns=columns)
+            STAGE_SECONDS.observe(time.perf_counter() - started, "batch", "feature_mapping")
+            started = time.perf_counter()
+            probabilities = np.empty(len(features), dtype=float)
+
+            for start in range(0, len(features), chunk_size):
+                chunk_df = pd.DataFrame(features[start:start + chunk_size], columns=columns)
+
+                if self.ensemble is not None:
+                    probabilities[start:start + len(chunk_df)] = self.ensemble.predict_proba(chunk_df)
+                elif hasattr(pipeline, 'predict_proba'):
+                    prediction_proba = pipeline.predict_proba(chunk_df)
+                    column = 1 if prediction_proba.shape[1] > 1 else 0
+                    probabilities[start:start + len(chunk_df)] = prediction_proba[:, column]
+                else:
+                    probabilities[start:start + len(chunk_df)] = pipeline.predict(chunk_df)
+
+            STAGE_SECONDS.observe(time.perf_counter() - started, "batch", "model_inference")
+            return probabilities
+
+        except Exception as e:
+            logger.exception("❌ Error making batch model prediction: %s", e)
             return None
 
     def _add_missing_features(self, user_df):
         """Add any missing features expected by the model with default values"""
         
-        # List of features your model expects
-        expected_features = [
-            'savings_usage', 'education_level_encoded', 'location_type_encoded', 
-            'formal_service_use', 'mobile_banking', 'age', 'monthly_income',
-            'monthly_expenses', 'current_savings', 'debt_amount', 'dependents',
-            'household_size'
-        ]
-        
         # Add missing features with sensible defaults
-        for feature in expected_features:
+        for feature in EXPECTED_FEATURES:
             if feature not in user_df.columns:
                 if feature == 'savings_usage':
                     user_df[feature] = 0.3  # Default savings usage
@@ -334,377 +429,27 @@ class InvestmentRecommendationSystem:
         
         return user_df
 
+    @property
+    def investment_products(self):
+        """Read-only {product name: details} from the current catalog snapshot"""
+        return self.catalog.current().investment_products
+
+    @property
+    def product_index(self):
+        """ProductCatalogIndex of the current catalog snapshot"""
+        return self.catalog.current().index
+
+    @property
+    def risk_categories(self):
+        return self._define_risk_categories()
+
     def _define_investment_products(self):
-        """Define investment product categories with detailed information"""
-        return {
-            'Government Bonds (Treasury Bonds)': {
-                'description': 'Long-term debt securities issued by the Kenyan government, typically with maturities of 2+ years, offering fixed interest payments to investors.',
-                'risk_level': 'Low',
-                'expected_return': '8-12%',
-                'liquidity': 'Medium',
-                'pros': [
-                    'Government guaranteed - virtually risk-free',
-                    'Regular interest payments (coupon payments)',
-                    'Can be traded on secondary market',
-                    'Tax-free interest income',
-                    'Hedge against inflation with inflation-linked bonds'
-                ],
-                'cons': [
-                    'Interest rate risk - value decreases when rates rise',
-                    'Long lock-in periods',
-                    'Lower returns compared to equities long-term',
-                    'Early exit may result in capital loss'
-                ]
-            },
-            
-            'Treasury Bills (T-Bills)': {
-                'description': 'Short-term government debt instruments with maturities of 91, 182, or 364 days, sold at discount and redeemed at face value.',
-                'risk_level': 'Low',
-                'expected_return': '6-10%',
-                'liquidity': 'High',
-                'pros': [
-                    'Government guaranteed',
-                    'High liquidity',
-                    'Short investment periods',
-                    'Regular auction opportunities',
-                    'No interest rate risk due to short tenure'
-                ],
-                'cons': [
-                    'Lower returns than long-term investments',
-                    'Need to continuously reinvest',
-                    'Minimum investment amount of KES 100,000',
-                    'Returns may not beat inflation in low-rate environment'
-                ]
-            },
-            
-            'Nairobi Securities Exchange (NSE) Stocks': {
-                'description': 'Equity shares of publicly traded companies listed on Kenya\'s main stock exchange, representing ownership stakes in businesses.',
-                'risk_level': 'High',
-                'expected_return': '12-25%',
-                'liquidity': 'High',
-                'pros': [
-                    'High growth potential',
-                    'Dividend income opportunities',
-                    'Ownership stake in companies',
-                    'High liquidity for blue-chip stocks',
-                    'Hedge against inflation',
-                    'Capital gains tax exemption for individual investors'
-                ],
-                'cons': [
-                    'High volatility and risk',
-                    'Potential for significant losses',
-                    'Requires market knowledge and research',
-                    'Market manipulation risks',
-                    'Company-specific risks'
-                ]
-            },
-            
-            'Unit Trusts/Mutual Funds': {
-                'description': 'Pooled investment vehicles managed by professional fund managers, allowing investors to access diversified portfolios with small amounts.',
-                'risk_level': 'Medium',
-                'expected_return': '8-15%',
-                'liquidity': 'Medium',
-                'pros': [
-                    'Professional fund management',
-                    'Diversification across multiple assets',
-                    'Low minimum investment',
-                    'Various fund types available (equity, bond, balanced)',
-                    'Regular income through dividend distributions'
-                ],
-                'cons': [
-                    'Management fees reduce returns',
-                    'No guarantee of positive returns',
-                    'Limited control over investment decisions',
-                    'Market risk exposure',
-                    'Exit charges may apply'
-                ]
-            },
-            
-            'Money Market Funds': {
-                'description': 'Investment funds that invest in short-term, high-quality debt instruments, offering better returns than savings accounts with easy access to funds.',
-                'risk_level': 'Low',
-                'expected_return': '6-9%',
-                'liquidity': 'High',
-                'pros': [
-                    'High liquidity - can withdraw anytime',
-                    'Low risk and stable returns',
-                    'Low minimum investment',
-                    'Professional management',
-                    'Better returns than savings accounts'
-                ],
-                'cons': [
-                    'Lower returns than equity investments',
-                    'Management fees',
-                    'Inflation risk over long term',
-                    'No capital appreciation potential'
-                ]
-            },
-            
-            'Real Estate Investment': {
-                'description': 'Direct investment in physical property for rental income and capital appreciation, including residential, commercial, or land investments.',
-                'risk_level': 'Medium',
-                'expected_return': '10-20%',
-                'liquidity': 'Low',
-                'pros': [
-                    'Rental income generation',
-                    'Capital appreciation potential',
-                    'Inflation hedge',
-                    'Tangible asset ownership',
-                    'Tax benefits on mortgage interest'
-                ],
-                'cons': [
-                    'High capital requirements',
-                    'Low liquidity',
-                    'Property management responsibilities',
-                    'Market volatility',
-                    'Legal and transaction costs',
-                    'Maintenance and repair costs'
-                ]
-            },
-            
-            'Real Estate Investment Trusts (REITs)': {
-                'description': 'Investment vehicles that own and operate income-generating real estate, allowing investors to buy shares and receive dividends from property investments.',
-                'risk_level': 'Medium',
-                'expected_return': '8-14%',
-                'liquidity': 'Medium',
-                'pros': [
-                    'Access to real estate with low capital',
-                    'Regular dividend income',
-                    'Professional property management',
-                    'High liquidity compared to direct real estate',
-                    'Diversification across property types'
-                ],
-                'cons': [
-                    'Market volatility',
-                    'Interest rate sensitivity',
-                    'Management fees',
-                    'Limited control over properties',
-                    'Relatively new market in Kenya'
-                ]
-            },
-            
-            'Bank Fixed Deposits': {
-                'description': 'Time deposits with predetermined interest rates and fixed maturity periods, offering guaranteed returns with bank protection.',
-                'risk_level': 'Low',
-                'expected_return': '5-8%',
-                'liquidity': 'Low',
-                'pros': [
-                    'Guaranteed returns',
-                    'KDIC deposit protection up to KES 500,000',
-                    'No market risk',
-                    'Predictable income',
-                    'Available at all banks'
-                ],
-                'cons': [
-                    'Low returns, may not beat inflation',
-                    'Early withdrawal penalties',
-                    'Opportunity cost of higher-yielding investments',
-                    'Interest rate risk if rates rise'
-                ]
-            },
-            
-            'High-Yield Savings Accounts': {
-                'description': 'Bank accounts offering higher interest rates than regular savings accounts while maintaining full liquidity and deposit protection.',
-                'risk_level': 'Low',
-                'expected_return': '3-6%',
-                'liquidity': 'High',
-                'pros': [
-                    'Highest liquidity',
-                    'KDIC deposit protection',
-                    'No risk of capital loss',
-                    'Easy access to funds',
-                    'Low minimum balance requirements'
-                ],
-                'cons': [
-                    'Very low returns',
-                    'Inflation erodes purchasing power',
-                    'Opportunity cost',
-                    'Bank charges may apply'
-                ]
-            },
-            
-            'Commodity Trading': {
-                'description': 'Investment in physical commodities like gold, oil, agricultural products, or commodity futures contracts for portfolio diversification.',
-                'risk_level': 'High',
-                'expected_return': '10-30%',
-                'liquidity': 'Medium',
-                'pros': [
-                    'Inflation hedge',
-                    'Portfolio diversification',
-                    'Potential for high returns',
-                    'Tangible assets',
-                    'Kenya is a commodity-producing economy'
-                ],
-                'cons': [
-                    'High price volatility',
-                    'Storage and insurance costs',
-                    'Seasonal price fluctuations',
-                    'Limited commodity exchanges in Kenya',
-                    'Requires specialized knowledge'
-                ]
-            },
-            
-            'Foreign Exchange (Forex) Trading': {
-                'description': 'Trading of currency pairs in the global foreign exchange market, often using leverage to amplify potential returns and risks.',
-                'risk_level': 'Very High',
-                'expected_return': '-50% to +100%',
-                'liquidity': 'High',
-                'pros': [
-                    '24/7 market availability',
-                    'High liquidity',
-                    'Leverage opportunities',
-                    'Currency hedging benefits',
-                    'Low transaction costs'
-                ],
-                'cons': [
-                    'Extremely high risk',
-                    'Potential for total loss',
-                    'Requires extensive knowledge',
-                    'Leverage amplifies losses',
-                    'Regulatory risks',
-                    'Emotional stress'
-                ]
-            },
-            
-            'Pension Schemes (Individual & Occupational)': {
-                'description': 'Long-term retirement savings plans with tax benefits, designed to provide income security after retirement through systematic contributions.',
-                'risk_level': 'Low',
-                'expected_return': '7-12%',
-                'liquidity': 'Very Low',
-                'pros': [
-                    '15% tax relief on contributions',
-                    'Compound growth over long term',
-                    'Professional fund management',
-                    'Employer matching contributions',
-                    'Retirement security'
-                ],
-                'cons': [
-                    'Funds locked until retirement',
-                    'Management fees',
-                    'Limited investment control',
-                    'Inflation risk over long periods',
-                    'Regulatory changes risk'
-                ]
-            },
-            
-            'Cooperative Society Investments (SACCOs)': {
-                'description': 'Member-owned financial cooperatives that pool resources to provide savings, credit, and investment services to their members.',
-                'risk_level': 'Medium',
-                'expected_return': '8-15%',
-                'liquidity': 'Medium',
-                'pros': [
-                    'Higher returns than banks',
-                    'Member ownership and control',
-                    'Access to affordable loans',
-                    'Community-based investment',
-                    'Dividend payments to members'
-                ],
-                'cons': [
-                    'Limited regulation compared to banks',
-                    'Risk of mismanagement',
-                    'Liquidity constraints',
-                    'Member liability in case of losses',
-                    'Limited geographical reach'
-                ]
-            },
-            
-            'Small Business Investment/Entrepreneurship': {
-                'description': 'Starting or investing in small businesses or entrepreneurial ventures to generate income and build wealth through business ownership.',
-                'risk_level': 'High',
-                'expected_return': '15-50%',
-                'liquidity': 'Very Low',
-                'pros': [
-                    'Unlimited earning potential',
-                    'Full control over investment',
-                    'Job creation and economic impact',
-                    'Tax benefits for business expenses',
-                    'Personal and professional growth'
-                ],
-                'cons': [
-                    'High failure rate',
-                    'Requires significant time and effort',
-                    'Market and operational risks',
-                    'Cash flow challenges',
-                    'Regulatory compliance requirements'
-                ]
-            },
-            
-            'Agricultural Investment': {
-                'description': 'Investment in farming activities, agricultural land, or agribusiness ventures to capitalize on Kenya\'s agricultural sector potential.',
-                'risk_level': 'Medium',
-                'expected_return': '10-25%',
-                'liquidity': 'Low',
-                'pros': [
-                    'Kenya\'s agricultural potential',
-                    'Food security investment',
-                    'Export market opportunities',
-                    'Government support programs',
-                    'Inflation hedge through food prices'
-                ],
-                'cons': [
-                    'Weather and climate risks',
-                    'Market price volatility',
-                    'Pest and disease risks',
-                    'Requires agricultural knowledge',
-                    'Seasonal income patterns',
-                    'Infrastructure challenges'
-                ]
-            },
+        """Define investment product categories with detailed information (from data/investment_products.json)"""
+        return dict(self.investment_products)
 
-            'Education Savings Plans': {
-                'description': 'Specialized investment products designed to save and grow funds specifically for educational expenses, often with insurance components.',
-                'risk_level': 'Low',
-                'expected_return': '6-10%',
-                'liquidity': 'Low',
-                'pros': [
-                    'Disciplined long-term saving',
-                    'Investment growth for education costs',
-                    'Some plans offer insurance benefits',
-                    'Goal-oriented saving',
-                    'Professional fund management'
-                ],
-                'cons': [
-                    'Funds locked for specific purpose',
-                    'Management fees',
-                    'Limited flexibility',
-                    'Penalty for early withdrawal',
-                    'Market risk exposure'
-                ]
-            }
-        }
-    
     def _define_risk_categories(self):
-        """Categorize investment products by risk level"""
-        risk_categories = {
-            'low_risk': [],
-            'medium_risk': [],
-            'high_risk': [],
-            'very_high_risk': [],
-            'alternative': []
-        }
-        
-        # Categorize products based on risk level
-        for product_name, details in self.investment_products.items():
-            risk_level = details.get('risk_level', 'Medium')
-            
-            if risk_level == 'Low':
-                risk_categories['low_risk'].append(product_name)
-            elif risk_level == 'Medium':
-                risk_categories['medium_risk'].append(product_name)
-            elif risk_level == 'High':
-                risk_categories['high_risk'].append(product_name)
-            elif risk_level == 'Very High':
-                risk_categories['very_high_risk'].append(product_name)
-        
-        # Alternative investments (unique/specialized products)
-        risk_categories['alternative'] = [
-            'Cooperative Society Investments (SACCOs)',
-            'Agricultural Investment',
-            'Small Business Investment/Entrepreneurship',
-            'Education Savings Plans'
-        ]
-        
-        return risk_categories
+        """Categorize investment products by risk level (buckets precomputed by the product index)"""
+        return dict(self.product_index.risk_categories)
 
     def _define_segment_recommendations(self):
         """Define recommendations by user segment using proper risk categories"""
@@ -718,42 +463,15 @@ class InvestmentRecommendationSystem:
     
     def get_products_by_risk(self, risk_level):
         """Get all products for a specific risk level"""
-        if not hasattr(self, 'risk_categories'):
-            self.risk_categories = self._define_risk_categories()
-        
-        return self.risk_categories.get(risk_level, [])
+        return self.product_index.products_by_category(risk_level)
  
     def get_product_details(self, product_name):
-        """Get detailed information about a specific product"""
-        return self.investment_products.get(product_name, {})
+        """Get detailed information about a specific product (read-only)"""
+        return self.product_index.details(product_name)
     
     def get_recommendations_by_risk_tolerance(self, risk_tolerance):
-        """Get product recommendations based on risk tolerance"""
-                
-        risk_mapping = {
-            'Low': ['low_risk'],
-            'Medium': ['medium_risk', 'low_risk'], 
-            'High': ['high_risk', 'medium_risk'],
-            'Very High': ['very_high_risk', 'high_risk']
-        }
-        
-        risk_categories = risk_mapping.get(risk_tolerance, ['medium_risk'])
-        
-        recommendations = []
-        for category in risk_categories:
-            products = self.get_products_by_risk(category)
-            for product in products[:3]:  # Limit to top 3 per category
-                if product in self.investment_products:
-                    details = self.investment_products[product]
-                    recommendations.append({
-                        'product': product,
-                        'risk_level': details.get('risk_level', 'Medium'),
-                        'expected_return': details.get('expected_return', '8-12%'),
-                        'liquidity': details.get('liquidity', 'Medium'),
-                        'description': details.get('description', '')
-                    })
-        
-        return recommendations
+        """Get product recommendations based on risk tolerance (prebuilt, read-only records)"""
+        return self.product_index.recommendations_for(risk_tolerance)
 
     def get_user_segment(self, user_data):
         """Determine user segment based on profile"""
@@ -775,6 +493,46 @@ class InvestmentRecommendationSystem:
         except Exception:
             return 'balanced_investor'
 
+    def _profile_column(self, users_df, field, default):
+        """Get a profile column with the same default the scalar .get() lookups use"""
+        if field not in users_df.columns:
+            return pd.Series(default, index=users_df.index)
+        return users_df[field].where(users_df[field].notna(), default)
+
+    def get_user_segments(self, users_df):
+        """Vectorized get_user_segment over a DataFrame of user profiles"""
+        age = self._profile_column(users_df, 'age', 30).to_numpy(dtype=float)
+        income = self._profile_column(users_df, 'monthly_income', 30000).to_numpy(dtype=float)
+        location = self._profile_column(users_df, 'location', 'Urban').astype(str).str.lower()
+        is_rural = location.str.contains('rural', regex=False).to_numpy()
+
+        return np.select(
+            [
+                (age < 30) & (income > 50000),
+                age >= 50,
+                is_rural,
+                (age >= 30) & (age < 50)
+            ],
+            ['growth_seeker', 'income_focused', 'opportunity_seeker', 'balanced_investor'],
+            default='moderate'
+        )
+
+    def get_risk_tolerances(self, users_df):
+        """Vectorized risk tolerance: the profile's own value, else the get_risk_tolerance score"""
+        age = self._profile_column(users_df, 'age', 30).to_numpy(dtype=float)
+        income = self._profile_column(users_df, 'monthly_income', 30000).to_numpy(dtype=float)
+        experience = self._profile_column(users_df, 'investment_experience', 'Beginner').astype(str)
+
+        score = np.where(age < 35, 2, np.where(age < 50, 1, 0))
+        score += np.where(income > 100000, 2, np.where(income > 50000, 1, 0))
+        score += np.where(experience.str.contains('Advanced', regex=False).to_numpy(), 2,
+                          np.where(experience.str.contains('Intermediate', regex=False).to_numpy(), 1, 0))
+        computed = np.select([score >= 4, score >= 2], ['High', 'Medium'], default='Low')
+
+        provided = self._profile_column(users_df, 'risk_tolerance', 'Medium')
+        has_provided = provided.astype(bool).to_numpy()
+        return np.where(has_provided, provided.astype(str).to_numpy(), computed)
+
     def get_risk_tolerance(self, user_data):
         """Determine risk tolerance based on profile"""
         try:
@@ -835,32 +593,48 @@ class InvestmentRecommendationSystem:
         
         return allocations.get(risk_tolerance, allocations['medium'])
 
-    def get_recommendations(self, user_id=None, user_data=None, df=None):
-        """Generate personalized investment recommendations using both ML models and rules"""
+    def get_recommendations(self, user_id=None, user_data=None, df=None, use_cache=True):
+        """Generate personalized investment recommendations using both ML models and rules
+        (through the recommendation cache, if any, unless use_cache is False)"""
         
         if user_data is None and user_id is not None and df is not None:
             if user_id in df.index:
                 user_data = df.loc[user_id].to_dict()
             else:
-                print(f"User {user_id} not found in dataset")
+                logger.warning("User %s not found in dataset", user_id)
                 return self._get_emergency_recommendations(None)
         
         if user_data is None:
-            print("No user data provided")
+            logger.warning("No user data provided")
             return self._get_emergency_recommendations(None)
+        # None fields get the defaults of absent ones, as in get_batch_recommendations
+        user_data = present_fields(user_data)
+        
+        # Repeated profiles are answered from the cache without model inference
+        cache = self.recommendation_cache if use_cache else None
+        if cache is not None:
+            cache_key = cache.fingerprint(user_data)
+            cache_generation = self._cache_generation()
+            cached = cache.get(cache_key, cache_generation)
+            if cached is not None:
+                return cached
         
         try:
             # Get user characteristics with fallback values
+            started = time.perf_counter()
             user_segment = self.get_user_segment(user_data)
             
             # Handle risk_tolerance from user_data directly if available
             risk_tolerance = user_data.get('risk_tolerance', 'Medium')
             if not risk_tolerance:
                 risk_tolerance = self.get_risk_tolerance(user_data)
+            STAGE_SECONDS.observe(time.perf_counter() - started, "single", "segmentation")
             
-            print(f"🎯 Investment Recommendations for User")
-            print(f"📊 User Segment: {user_segment}")
-            print(f"⚖️ Risk Tolerance: {risk_tolerance}")
+            debug = logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                logger.debug("🎯 Investment Recommendations for User")
+                logger.debug("📊 User Segment: %s", user_segment)
+                logger.debug("⚖️ Risk Tolerance: %s", risk_tolerance)
             
             recommendations = {
                 'user_segment': user_segment,
@@ -890,78 +664,247 @@ class InvestmentRecommendationSystem:
                 segment_risk_categories = self.segment_recommendations[user_segment]
                 recommendations['segment_recommendations'] = segment_risk_categories
                 
-                print(f"📋 Segment-Based Risk Categories:")
-                for risk_category in segment_risk_categories:
-                    try:
-                        products = self.get_products_by_risk(risk_category)
-                        print(f"  🎯 {risk_category.replace('_', ' ').title()}: {len(products)} products")
-                    except Exception as e:
-                        print(f"❌ Error getting products for {risk_category}: {e}")
-            
-            # 3. Risk-based recommendations
+                if debug:
+                    logger.debug("📋 Segment-Based Risk Categories:")
+                    for risk_category in segment_risk_categories:
+                        try:
+                            products = self.get_products_by_risk(risk_category)
+                            logger.debug("  🎯 %s: %d products", risk_category.replace('_', ' ').title(), len(products))
+                        except Exception as e:
+                            logger.error("❌ Error getting products for %s: %s", risk_category, e)
+            
+            # 3. The most suitable products of the whole catalog
+            started = time.perf_counter()
             try:
-                risk_based_products = self.get_recommendations_by_risk_tolerance(risk_tolerance)
-                if risk_based_products:
-                    recommendations['risk_recommendations'] = [p['product'] for p in risk_based_products]
-                    recommendations['detailed_products'] = risk_based_products
-                    
-                    print(f"💡 Risk-Based Product Recommendations ({len(risk_based_products)} products):")
-                    for product_info in risk_based_products[:5]:  # Show top 5
-                        print(f"  • {product_info['product']}")
-                        print(f"    📊 Risk: {product_info['risk_level'].title()} | 💰 Return: {product_info['expected_return']} | 🔄 Liquidity: {product_info['liquidity'].title()}")
+                final_recommendations = self._rank_user_products(user_data, risk_tolerance)
             except Exception as e:
-                print(f"❌ Error getting risk-based recommendations: {e}")
-                risk_based_products = []
-            
-            # 4. Final recommendation formatting
-            if not risk_based_products:
-                # Fallback recommendations if the main method fails
-                risk_based_products = self._get_fallback_recommendations(risk_tolerance)
-                recommendations['detailed_products'] = risk_based_products
+                logger.error("❌ Error ranking products: %s", e)
+                # Prebuilt records for the risk tolerance, scored one by one
+                products = self.get_recommendations_by_risk_tolerance(risk_tolerance)
+                if not products:
+                    products = self._get_fallback_recommendations(risk_tolerance)
+                final_recommendations = self._format_recommendations(products[:5], user_data)
             
-            # Create final formatted recommendations
-            final_recommendations = []
-            for i, product_info in enumerate(risk_based_products[:5], 1):  # Top 5
-                try:
-                    details = self.get_product_details(product_info['product'])
-                    
-                    # Create standardized recommendation format
-                    rec = {
-                        'name': product_info['product'],
-                        'rank': i,
-                        'expected_return': product_info['expected_return'],
-                        'risk_level': product_info['risk_level'].title(),
-                        'liquidity': product_info['liquidity'].title(),
-                        'description': product_info.get('description', details.get('description', ''))[:200],
-                        'suitability_score': self._calculate_suitability_score(product_info, user_data),
-                        'pros': details.get('pros', [])[:3],  # Limit to top 3
-                        'cons': details.get('cons', [])[:3],  # Limit to top 3
-                    }
-                    final_recommendations.append(rec)
-                    
-                except Exception as e:
-                    print(f"❌ Error processing recommendation {i}: {e}")
-                    continue
-            
-            # Update the detailed_products with the final format
             recommendations['detailed_products'] = final_recommendations
-            
-            print(f"✅ Summary: Generated {len(final_recommendations)} recommendations")
-            if ml_prediction is not None:
-                print(f"🤖 ML Model Prediction: {ml_prediction:.1%} investment probability")
-            
+            recommendations['risk_recommendations'] = [product['name'] for product in final_recommendations]
+            STAGE_SECONDS.observe(time.perf_counter() - started, "single", "suitability_scoring")
+            
+            if debug:
+                logger.debug("💡 Product Recommendations (%d products):", len(final_recommendations))
+                for product in final_recommendations:
+                    logger.debug("  • %s", product['name'])
+                    logger.debug("    📊 Risk: %s | 💰 Return: %s | 🔄 Liquidity: %s",
+                                 product['risk_level'], product['expected_return'], product['liquidity'])
+            
+            if debug:
+                logger.debug("✅ Summary: Generated %d recommendations", len(final_recommendations))
+                if ml_prediction is not None:
+                    logger.debug("🤖 ML Model Prediction: %.1f%% investment probability", ml_prediction * 100)
+            
+            if cache is not None:
+                cache.put(cache_key, recommendations, cache_generation)
             return recommendations
             
         except Exception as e:
-            print(f"❌ Error generating recommendations: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
+            logger.exception("❌ Error generating recommendations: %s", e)
             
             # Return fallback recommendations instead of None
             return self._get_emergency_recommendations(user_data)
 
+    def _format_recommendations(self, products, user_data):
+        """Recommendation dicts for product records in the given order, scored one by one"""
+        final_recommendations = []
+        for i, product_info in enumerate(products, 1):
+            try:
+                details = self.get_product_details(product_info['product'])
+                
+                # Create standardized recommendation format
+                rec = {
+                    'name': product_info['product'],
+                    'rank': i,
+                    'expected_return': product_info['expected_return'],
+                    'risk_level': product_info['risk_level'].title(),
+                    'liquidity': product_info['liquidity'].title(),
+                    'description': product_info.get('description', details.get('description', ''))[:200],
+                    'suitability_score': self._calculate_suitability_score(product_info, user_data),
+                    'pros': details.get('pros', [])[:3],  # Limit to top 3
+                    'cons': details.get('cons', [])[:3],  # Limit to top 3
+                }
+                final_recommendations.append(rec)
+                
+            except Exception as e:
+                logger.error("❌ Error processing recommendation %d: %s", i, e)
+                continue
+        return final_recommendations
+
+    def _rank_catalog(self, index, risk_tolerances, age, income, long_term, short_term, top_n):
+        """Each user's top_n products of the catalog index: (product numbers, scores), best first.
+
+        Product numbers are positions in that index, so callers pass the same
+        index to _catalog_recommendations (a hot reload may swap
+        self.product_index in between).
+        """
+        user_risk = risk_codes(risk_tolerances)
+        points = suitability_points(
+            user_risk[:, None], age[:, None], income[:, None], long_term[:, None], short_term[:, None],
+            index.risk_codes[None, :], index.liquidity_codes[None, :]
+        )
+        # Ties go to the products recommended for the user's risk tolerance (code -1 uses the last row)
+        positions, points = top_products(points, index.rank_priority[user_risk], top_n)
+        return positions, np.clip(points, 0.0, 1.0)
+
+    def _catalog_recommendations(self, index, positions, scores):
+        """Recommendation dicts for one user's ranked product numbers in index"""
+        display_fields = index.display_fields
+        recommendations = []
+        for rank, (position, score) in enumerate(zip(positions, scores), 1):
+            name, expected_return, risk_level, liquidity, description, pros, cons = display_fields[position]
+            recommendations.append({
+                'name': name,
+                'rank': rank,
+                'expected_return': expected_return,
+                'risk_level': risk_level,
+                'liquidity': liquidity,
+                'description': description,
+                'suitability_score': float(score),
+                'pros': pros,
+                'cons': cons,
+            })
+        return recommendations
+
+    def _rank_user_products(self, user_data, risk_tolerance, top_n=SINGLE_RECOMMENDATION_LIMIT):
+        """get_recommendations' products: one row of _rank_catalog, memoized per catalog.
+
+        Suitability only depends on the risk tolerance and on which band age,
+        income and horizon fall in, so the ranking of each combination is
+        computed once instead of paying the array overhead on every request.
+        """
+        age = user_data.get('age')
+        age = 30 if age is None else age
+        income = user_data.get('monthly_income')
+        income = 30000 if income is None else income
+        horizon = str(user_data.get('investment_horizon') or '')
+        long_term, short_term = 'Long-term' in horizon, 'Short-term' in horizon
+
+        # Bands as tested by the suitability rules (NaN fails every comparison: its own band)
+        age_band = 0 if age < 35 else 2 if age >= 50 else 1 if age >= 35 else 3
+        income_band = 2 if income > 100000 else 1 if income > 50000 else 0
+        # Risk tolerances outside RISK_LEVELS all score alike, so the memo stays small
+        key = (RISK_CODES.get(risk_tolerance, -1), age_band, income_band, long_term, short_term, top_n)
+
+        # One snapshot for the whole call; the memo belongs to the snapshot it ranked
+        index = self.product_index
+        memo_index, memo = self._ranking_memo
+        if memo_index is not index:
+            memo = {}
+            self._ranking_memo = (index, memo)
+        ranked = memo.get(key)
+        if ranked is None:
+            positions, scores = self._rank_catalog(
+                index,
+                np.array([risk_tolerance], dtype=object), np.array([age], dtype=float),
+                np.array([income], dtype=float), np.array([long_term]), np.array([short_term]), top_n
+            )
+            ranked = memo[key] = (positions[0].tolist(), scores[0].tolist())
+        return self._catalog_recommendations(index, *ranked)
+
+    def get_batch_recommendations(self, users, chunk_size=1024, top_n=5, use_cache=False):
+        """Generate recommendations for many users with column-wise scoring"""
+        if (self.fast_scorer is not None and not isinstance(users, pd.DataFrame)
+                and top_n <= SINGLE_RECOMMENDATION_LIMIT):
+            users = list(users)
+            if len(users) <= PER_ROW_BATCH_LIMIT:
+                # Cached (under get_recommendations' own keys) only when use_cache is set
+                return [self._batch_result(self.get_recommendations(user_data=user_data, use_cache=use_cache), top_n)
+                        for user_data in users]
+
+        if use_cache and self.recommendation_cache is not None and not isinstance(users, pd.DataFrame):
+            return self._get_cached_batch_recommendations(list(users), chunk_size, top_n)
+
+        users_df = users if isinstance(users, pd.DataFrame) else pd.DataFrame(list(users))
+        if users_df.empty:
+            return []
+
+        started = time.perf_counter()
+        user_segments = self.get_user_segments(users_df)
+        risk_tolerances = self.get_risk_tolerances(users_df)
+        STAGE_SECONDS.observe(time.perf_counter() - started, "batch", "segmentation")
+
+        # 1. ML model probabilities, chunked; fall back to the rule-based estimate
+        probabilities = self.get_model_predictions(users_df, chunk_size=chunk_size)
+        if probabilities is None:
+            age = self._profile_column(users_df, 'age', 30).to_numpy(dtype=float)
+            income = self._profile_column(users_df, 'monthly_income', 30000).to_numpy(dtype=float)
+            probabilities = np.minimum(0.95, 0.4 + (income / 100000) * 0.3 + (age / 100) * 0.2)
+
+        # 2. Each user's most suitable products, ranked over the whole catalog at once
+        started = time.perf_counter()
+        horizons = self._profile_column(users_df, 'investment_horizon', '').astype(str)
+        index = self.product_index
+        positions, scores = self._rank_catalog(
+            index,
+            risk_tolerances,
+            self._profile_column(users_df, 'age', 30).to_numpy(dtype=float),
+            self._profile_column(users_df, 'monthly_income', 30000).to_numpy(dtype=float),
+            horizons.str.contains('Long-term', regex=False).to_numpy(),
+            horizons.str.contains('Short-term', regex=False).to_numpy(),
+            top_n
+        )
+        allocations = {risk_tolerance: self.get_portfolio_allocation(risk_tolerance)
+                       for risk_tolerance in np.unique(risk_tolerances)}
+
+        results = []
+        for row, risk_tolerance in enumerate(risk_tolerances):
+            results.append({
+                'user_segment': str(user_segments[row]),
+                'risk_tolerance': str(risk_tolerance),
+                'recommendations': self._catalog_recommendations(index, positions[row], scores[row]),
+                'portfolio_allocation': allocations[risk_tolerance],
+                'investment_probability': float(probabilities[row])
+            })
+
+        STAGE_SECONDS.observe(time.perf_counter() - started, "batch", "suitability_scoring")
+        return results
+
+    def _batch_result(self, recommendations, top_n):
+        """A get_recommendations result in the per-profile shape of get_batch_recommendations"""
+        return {
+            'user_segment': recommendations['user_segment'],
+            'risk_tolerance': recommendations['risk_tolerance'],
+            'recommendations': recommendations['detailed_products'][:top_n],
+            'portfolio_allocation': self.get_portfolio_allocation(recommendations['risk_tolerance']),
+            'investment_probability': float(recommendations['investment_probability'])
+        }
+
+    def recommend(self, user_data, top_n=SINGLE_RECOMMENDATION_LIMIT):
+        """RecommendationResult for one profile: segment, risk tolerance, products,
+        allocation and model probability from a single get_recommendations pass"""
+        return RecommendationResult.from_dict(self._batch_result(self.get_recommendations(user_data=user_data), top_n))
+
+    def recommend_batch(self, users, chunk_size=1024, top_n=SINGLE_RECOMMENDATION_LIMIT, use_cache=False):
+        """get_batch_recommendations as RecommendationResults, in input order"""
+        return [RecommendationResult.from_dict(result) for result in
+                self.get_batch_recommendations(users, chunk_size=chunk_size, top_n=top_n, use_cache=use_cache)]
+
+    def _get_cached_batch_recommendations(self, users, chunk_size, top_n):
+        """get_batch_recommendations through the recommendation cache; only the misses are scored"""
+        cache = self.recommendation_cache
+        generation = self._cache_generation()
+        # Batch results have their own shape, so they are cached apart from get_recommendations
+        keys = [f"batch{top_n}:{cache.fingerprint(user_data)}" for user_data in users]
+        results = [cache.get(key, generation) for key in keys]
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            scored = self.get_batch_recommendations([users[i] for i in missing], chunk_size=chunk_size, top_n=top_n)
+            for i, result in zip(missing, scored):
+                cache.put(keys[i], result, generation)
+                results[i] = result
+        return results
+
     def _get_fallback_recommendations(self, risk_tolerance):
         """Fallback recommendations when main method fails"""
+        FALLBACK_RECOMMENDATIONS.inc("fallback")
                 
         fallback_products = {
             'Low': [
@@ -985,7 +928,8 @@ class InvestmentRecommendationSystem:
 
     def _get_emergency_recommendations(self, user_data):
         """Emergency fallback when everything fails"""
-        print("⚠️ Using emergency recommendations")
+        FALLBACK_RECOMMENDATIONS.inc("emergency")
+        logger.warning("⚠️ Using emergency recommendations")
         
         try:
             risk_tolerance = user_data.get('risk_tolerance', 'Medium') if user_data else 'Medium'
@@ -1077,7 +1021,7 @@ class InvestmentRecommendationSystem:
             return min(1.0, max(0.0, score))  # Ensure score is between 0 and 1
             
         except Exception as e:
-            print(f"❌ Error calculating suitability score: {e}")
+            logger.error("❌ Error calculating suitability score: %s", e)
             return 0.75  # Default score
 
     def get_model_info(self):
@@ -1087,6 +1031,8 @@ class InvestmentRecommendationSystem:
             'best_model': self.best_model_name,
             'available_models': list(self.model_pipelines.keys()) if self.model_pipelines else [],
             'preprocessor_loaded': self.preprocessor is not None,
+            'compiled_models': self.compiled_models,
+            'ensemble': self.ensemble.describe() if self.ensemble is not None else None,
             'config_loaded': self.model_config is not None
         }
         
@@ -1,19 +1,26 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Dict, Any
-import uvicorn
-from fastapi.responses import RedirectResponse
-from pyngrok import ngrok
-import webbrowser
+from fastapi.responses import RedirectResponse, Response, PlainTextResponse
 import json
 from datetime import datetime
 import numpy as np
 import logging
+import os
+import random
+import time
 import traceback
+from recommendation_cache import RecommendationCache
+from logging_setup import configure_logging
+from inference_pool import InferencePool, PoolSaturated, DEFAULT_KIND, DEFAULT_MAX_WORKERS
+from micro_batcher import MicroBatcher, DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS
+from metrics import REGISTRY
+from request_profiler import ProfileStore, collapsed_stacks, DEFAULT_INTERVAL_MS
+from recommendation_result import RecommendationResult
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging: records are written by a background thread (LOG_LEVEL=DEBUG for per-request detail)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 try:
@@ -22,8 +29,9 @@ except ImportError:
     logger.error("Could not import InvestmentRecommendationSystem")
     # Create a dummy class for deployment
     class InvestmentRecommendationSystem:
-        def __init__(self):
+        def __init__(self, low_latency=False, recommendation_cache=None, use_ensemble=False):
             self.investment_products = {}
+            self.recommendation_cache = recommendation_cache
         
         def get_recommendations(self, user_data):
             return []
@@ -34,6 +42,17 @@ except ImportError:
         def get_portfolio_allocation(self, risk_tolerance):
             return {"bonds": 60, "stocks": 40}
 
+        def get_batch_recommendations(self, users, chunk_size=1024, use_cache=False):
+            return []
+
+        def recommend(self, user_data):
+            risk_tolerance = user_data.get('risk_tolerance', 'Medium')
+            return RecommendationResult(self.get_user_segment(user_data), risk_tolerance,
+                                        portfolio_allocation=self.get_portfolio_allocation(risk_tolerance))
+
+        def recommend_batch(self, users, chunk_size=1024, use_cache=False):
+            return [self.recommend(user_data) for user_data in users]
+
 app = FastAPI(
     title="Kenya Investment Advisor API",
     description="AI-powered investment recommendation system for the Kenyan market",
@@ -71,21 +90,152 @@ class UserProfile(BaseModel):
     preferred_sectors: List[str] = []
 
 class RecommendationResponse(BaseModel):
+    # Built straight from the engine's RecommendationResult
+    model_config = ConfigDict(from_attributes=True)
+
     user_segment: str
     risk_tolerance: str
     recommendations: List[Dict[str, Any]]
     portfolio_allocation: Dict[str, float]
     investment_probability: Optional[float] = None
+    generated_date: datetime = Field(default_factory=datetime.now)
+
+class BatchRecommendationRequest(BaseModel):
+    profiles: List[UserProfile]
+
+class BatchRecommendationResponse(BaseModel):
+    results: List[RecommendationResponse]
+    count: int
     generated_date: datetime
 
+# Batch scoring limits
+MAX_BATCH_SIZE = 10000
+BATCH_CHUNK_SIZE = 1024
+
+# Identical profiles within CACHE_TTL seconds are served without re-running the model
+CACHE_MAXSIZE = 4096
+CACHE_TTL = 300.0
+recommendation_cache = RecommendationCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+
+# USE_ENSEMBLE=1 blends all deployment models (see ensemble.py) instead of using the best one
+USE_ENSEMBLE = os.environ.get("USE_ENSEMBLE", "0") == "1"
+
 # Initialize system with error handling
 try:
-    system = InvestmentRecommendationSystem()
+    system = InvestmentRecommendationSystem(low_latency=True, recommendation_cache=recommendation_cache,
+                                            use_ensemble=USE_ENSEMBLE)
     logger.info("Investment system initialized successfully")
 except Exception as e:
     logger.error(f"Error initializing system: {e}")
     system = InvestmentRecommendationSystem()
 
+# Scoring runs on a worker pool so the event loop (and /health) stays free.
+# INFERENCE_POOL=process gives each worker process its own engine (and no shared cache).
+INFERENCE_POOL = os.environ.get("INFERENCE_POOL", DEFAULT_KIND)
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", DEFAULT_MAX_WORKERS))
+INFERENCE_MAX_PENDING = int(os.environ.get("INFERENCE_MAX_PENDING", 0)) or None
+# Seconds a client is asked to wait after a 503 from a full pool
+RETRY_AFTER_SECONDS = 1
+
+inference_pool = InferencePool(
+    system,
+    kind=INFERENCE_POOL,
+    max_workers=INFERENCE_WORKERS,
+    max_pending=INFERENCE_MAX_PENDING,
+    engine_kwargs={"low_latency": True, "use_ensemble": USE_ENSEMBLE}
+)
+
+def pool_saturated_error(e):
+    """503 telling the client to back off and retry"""
+    logger.warning(f"Rejecting request: {e}")
+    return HTTPException(
+        status_code=503,
+        detail="Server is at capacity, retry shortly",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+    )
+
+# Concurrent /recommendations calls are coalesced into one recommend_batch
+# call of up to MICRO_BATCH_MAX_SIZE profiles, waiting at most MICRO_BATCH_MAX_WAIT_MS
+MICRO_BATCH_MAX_SIZE = int(os.environ.get("MICRO_BATCH_MAX_SIZE", DEFAULT_MAX_BATCH_SIZE))
+MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get("MICRO_BATCH_MAX_WAIT_MS", DEFAULT_MAX_WAIT_MS))
+
+async def score_profiles(users):
+    return await inference_pool.run("recommend_batch", users, chunk_size=BATCH_CHUNK_SIZE, use_cache=True)
+
+recommendation_batcher = MicroBatcher(
+    score_profiles,
+    max_batch_size=MICRO_BATCH_MAX_SIZE,
+    max_wait_ms=MICRO_BATCH_MAX_WAIT_MS
+)
+
+# Metrics served at /metrics (Prometheus text format); engine stages share this histogram
+STAGE_SECONDS = REGISTRY.histogram(
+    "recommendation_stage_seconds", "Time spent in each stage of recommendation generation", ("mode", "stage"))
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to handle an HTTP request", ("method", "path"))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "HTTP requests being handled")
+REGISTRY.register(recommendation_batcher.batch_sizes)
+REGISTRY.register(recommendation_batcher.queue_wait)
+
+def collect_runtime_metrics():
+    """Cache, inference pool and batcher counters, read at scrape time"""
+    cache_stats = recommendation_cache.stats()
+    pool_stats = inference_pool.stats()
+    return [
+        ("recommendation_cache_requests_total", "counter", "Recommendation cache lookups by result",
+         [({"result": "hit"}, cache_stats['hits']), ({"result": "miss"}, cache_stats['misses'])]),
+        ("recommendation_cache_evictions_total", "counter", "Entries dropped from the recommendation cache",
+         [({"reason": "size"}, cache_stats['evictions']), ({"reason": "ttl"}, cache_stats['expirations']),
+          ({"reason": "invalidation"}, cache_stats['invalidations'])]),
+        ("recommendation_cache_size", "gauge", "Entries in the recommendation cache", [({}, cache_stats['size'])]),
+        ("inference_pool_pending", "gauge", "Inference calls queued or running", [({}, pool_stats['pending'])]),
+        ("inference_pool_rejected_total", "counter", "Inference calls refused with 503", [({}, pool_stats['rejected'])]),
+        ("micro_batch_waiting", "gauge", "Requests waiting for a micro-batch to fill",
+         [({}, recommendation_batcher.stats()['waiting'])]),
+    ]
+
+REGISTRY.add_collector(collect_runtime_metrics)
+
+# PROFILING=1 lets /recommendations calls be profiled: those sent with an X-Profile header,
+# plus a PROFILE_SAMPLE_RATE fraction of all calls. Profiles are served under /debug/profiles.
+PROFILING_ENABLED = os.environ.get("PROFILING", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", DEFAULT_INTERVAL_MS))
+profile_store = ProfileStore()
+
+def profile_trigger(x_profile):
+    """Why this request is profiled ("header" or "sampled"), or None"""
+    if not PROFILING_ENABLED:
+        return None
+    if x_profile and x_profile != "0":
+        return "header"
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+def json_response(model, endpoint):
+    """Serialize a response model to JSON, recording the time as the response_serialization stage"""
+    started = time.perf_counter()
+    body = model.model_dump_json()
+    STAGE_SECONDS.observe(time.perf_counter() - started, endpoint, "response_serialization")
+    return Response(content=body, media_type="application/json")
+
+@app.middleware("http")
+async def track_requests(request, call_next):
+    # Unknown paths share one label so scanners cannot blow up the series count
+    path = request.url.path if request.url.path in ROUTE_PATHS else "other"
+    HTTP_REQUESTS_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, request.method, path)
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+
+@app.on_event("shutdown")
+def shutdown_inference_pool():
+    inference_pool.shutdown(wait=False)
+
 @app.get("/")
 async def redirect_root():
     return RedirectResponse(url="/docs")
@@ -100,6 +250,8 @@ async def get_model_status():
             "models_loaded": model_info['models_loaded'],
             "best_model": model_info['best_model'],
             "available_models": model_info['available_models'],
+            # Changes whenever cached recommendations go stale; clients key their own caches on it
+            "generation": str(system._cache_generation()) if hasattr(system, '_cache_generation') else None,
             "timestamp": datetime.now()
         }
     except Exception as e:
@@ -109,6 +261,16 @@ async def get_model_status():
             "timestamp": datetime.now()
         }
 
+@app.get("/products")
+async def get_products(risk_level: Optional[str] = None, liquidity: Optional[str] = None,
+                       return_band: Optional[str] = None):
+    """Catalog products matching every given level ('All' or omitted means any), from the catalog index"""
+    if not hasattr(system, 'product_index'):
+        return {"products": {}, "count": 0, "timestamp": datetime.now()}
+    products = {name: dict(details) for name, details in
+                system.product_index.filter_details(risk_level=risk_level, liquidity=liquidity, return_band=return_band)}
+    return {"products": products, "count": len(products), "timestamp": datetime.now()}
+
 @app.get("/health")
 async def health_check():
     model_info = system.get_model_info() if hasattr(system, 'get_model_info') else {}
@@ -117,78 +279,110 @@ async def health_check():
         "timestamp": datetime.now(),
         "system_initialized": hasattr(system, 'investment_products'),
         "models_loaded": model_info.get('models_loaded', False),
-        "best_model": model_info.get('best_model', None)
+        "best_model": model_info.get('best_model', None),
+        "inference_pool": inference_pool.stats()
     }
 
+@app.get("/cache-stats")
+async def get_cache_stats():
+    """Hit rate and size of the recommendation cache"""
+    return {**recommendation_cache.stats(), "timestamp": datetime.now()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics: stage latencies, model loads, cache, fallbacks, in-flight requests"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/batcher-stats")
+async def get_batcher_stats():
+    """Batch size and queue wait distributions of the /recommendations micro-batcher"""
+    return {**recommendation_batcher.stats(), "timestamp": datetime.now()}
+
+@app.get("/debug/profiles")
+async def list_profiles():
+    """Recent request profiles, newest first"""
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set PROFILING=1)")
+    return {"profiles": profile_store.summaries(), "timestamp": datetime.now()}
+
+@app.get("/debug/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str):
+    """One request profile as collapsed stacks, for flamegraph.pl or speedscope"""
+    profile = profile_store.get(profile_id) if PROFILING_ENABLED else None
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile '{profile_id}' not found")
+    return PlainTextResponse(collapsed_stacks(profile))
+
 @app.post("/recommendations", response_model=RecommendationResponse)
-async def get_recommendations(user_profile: UserProfile):
+async def get_recommendations(user_profile: UserProfile, x_profile: Optional[str] = Header(None)):
     """Generate personalized investment recommendations"""
     try:
-        # Convert to dict safely
         user_data = user_profile.model_dump()
+        profile_id = None
+        trigger = profile_trigger(x_profile)
         
-        # Get recommendations with error handling
+        # The engine computes every response field in one pass, batched with concurrent requests
         try:
-            recommendations = system.get_recommendations(user_data=user_data)
-            if not recommendations:
-                recommendations = []
-        except Exception as e:
-            logger.error(f"Error getting recommendations: {e}")
-            recommendations = []
-        
-        # Get user segment safely
-        try:
-            user_segment = system.get_user_segment(user_data)
-        except Exception as e:
-            logger.error(f"Error getting user segment: {e}")
-            user_segment = "balanced_investor"
-        
-        # Get portfolio allocation safely
-        try:
-            portfolio_allocation = system.get_portfolio_allocation(user_data['risk_tolerance'])
-        except Exception as e:
-            logger.error(f"Error getting portfolio allocation: {e}")
-            # Default allocation based on risk tolerance
-            risk = user_data['risk_tolerance'].lower()
-            if risk == 'low':
-                portfolio_allocation = {"Government Bonds": 50, "Money Market": 30, "Fixed Deposits": 20}
-            elif risk == 'high':
-                portfolio_allocation = {"Stocks": 40, "Unit Trusts": 30, "REITs": 20, "Bonds": 10}
-            else:
-                portfolio_allocation = {"Unit Trusts": 35, "Bonds": 30, "Stocks": 20, "Money Market": 15}
-        
-        # Calculate investment probability
-        try:
-            investment_probability = min(0.95, 
-                0.6 + (user_data['monthly_income'] / 100000) * 0.2 + 
-                (user_data['age'] / 100) * 0.15
-            )
-        except:
-            investment_probability = 0.75
-        
-        # Ensure recommendations is a list
-        if not isinstance(recommendations, list):
-            if isinstance(recommendations, dict):
-                recommendations = recommendations.get('detailed_products', [])
+            if trigger:
+                # Scored on its own and past the cache, so the profile shows this request's full work
+                results, profile = await inference_pool.run_profiled(
+                    PROFILE_INTERVAL_MS, "recommend_batch", [user_data],
+                    chunk_size=BATCH_CHUNK_SIZE, use_cache=False)
+                profile_id = profile_store.add(profile, path="/recommendations", trigger=trigger)
+                result = results[0]
             else:
-                recommendations = []
-        
-        response = RecommendationResponse(
-            user_segment=user_segment,
-            risk_tolerance=user_data['risk_tolerance'],
-            recommendations=recommendations[:5],
-            portfolio_allocation=portfolio_allocation,
-            investment_probability=investment_probability,
-            generated_date=datetime.now()
-        )
+                result = await recommendation_batcher.submit(user_data)
+        except PoolSaturated:
+            raise
+        except Exception as e:
+            # get_recommendations falls back to rule-based and emergency results instead of raising
+            logger.error(f"Error getting batched recommendations, scoring alone: {e}")
+            result = await inference_pool.run("recommend", user_data)
         
+        response = json_response(RecommendationResponse.model_validate(result), "single")
+        if profile_id:
+            response.headers["X-Profile-Id"] = profile_id
         return response
         
+    except PoolSaturated as e:
+        raise pool_saturated_error(e)
     except Exception as e:
         logger.error(f"Error in recommendations endpoint: {e}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
 
+@app.post("/recommendations/batch", response_model=BatchRecommendationResponse)
+async def get_batch_recommendations(batch_request: BatchRecommendationRequest):
+    """Generate recommendations for a list of profiles in one vectorized pass"""
+    if len(batch_request.profiles) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large: {len(batch_request.profiles)} profiles (max {MAX_BATCH_SIZE})"
+        )
+
+    try:
+        users = [profile.model_dump() for profile in batch_request.profiles]
+        batch_results = await inference_pool.run("get_batch_recommendations", users, chunk_size=BATCH_CHUNK_SIZE)
+
+        generated_date = datetime.now()
+        results = [
+            RecommendationResponse(generated_date=generated_date, **result)
+            for result in batch_results
+        ]
+
+        return json_response(BatchRecommendationResponse(
+            results=results,
+            count=len(results),
+            generated_date=generated_date
+        ), "batch")
+
+    except PoolSaturated as e:
+        raise pool_saturated_error(e)
+    except Exception as e:
+        logger.error(f"Error in batch recommendations endpoint: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Error generating batch recommendations: {str(e)}")
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     logger.error(f"Global exception: {exc}")
@@ -200,7 +394,16 @@ async def global_exception_handler(request, exc):
         }
     }
 
+# Paths labelled individually in http_request_duration_seconds
+ROUTE_PATHS = frozenset(route.path for route in app.routes)
+
 if __name__ == "__main__":
+    # Server and tunnelling imports are only needed when run as a script,
+    # not in workers that import the app
+    import uvicorn
+    import webbrowser
+    from pyngrok import ngrok
+
     public_url = ngrok.connect(8000)
     print(f"Public URL: {public_url} (will redirect to /docs)")
     webbrowser.open(f"{public_url}/docs")
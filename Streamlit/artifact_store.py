@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import time
+from collections.abc import Mapping
+import joblib
+from compiled_model import CompiledModel, MANIFEST_FILE, artifact_name, file_digest
+from metrics import REGISTRY
+
+MODEL_LOAD_SECONDS = REGISTRY.histogram(
+    "model_load_seconds", "Time to read a model artifact on first use", ("model",),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0))
+
+
+class ArtifactStore:
+    """A folder of models stored one per file, listed in manifest.json.
+
+    Opening the store only reads the manifest; each model is read the first
+    time it is asked for. Weights are memory-mapped read-only (raw .npy for
+    compiled models, uncompressed joblib for sklearn pipelines), so worker
+    processes that load the same model share its pages through the OS page
+    cache instead of each keeping a private copy.
+    """
+
+    def __init__(self, folder, mmap_mode='r'):
+        self.folder = folder
+        self.mmap_mode = mmap_mode
+        with open(os.path.join(folder, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        self._models = {}
+        self._lock = threading.Lock()
+
+    @property
+    def names(self):
+        return list(self.manifest['models'])
+
+    def entry(self, model_name):
+        return self.manifest['models'][model_name]
+
+    def is_current(self, source_path):
+        """False when the store was written from a different version of source_path"""
+        digest = self.manifest.get('source_sha256')
+        if not digest or not os.path.exists(source_path):
+            return True
+        return file_digest(source_path) == digest
+
+    def is_loaded(self, model_name):
+        return model_name in self._models
+
+    def load(self, model_name):
+        """Return the model, reading it on first use (once, even with concurrent callers)"""
+        model = self._models.get(model_name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(model_name)
+                if model is None:
+                    started = time.perf_counter()
+                    model = self._models[model_name] = self._read(self.entry(model_name))
+                    MODEL_LOAD_SECONDS.observe(time.perf_counter() - started, model_name)
+        return model
+
+    def _read(self, entry):
+        path = os.path.join(self.folder, entry['file'])
+        if entry.get('format', 'compiled') == 'joblib':
+            return joblib.load(path, mmap_mode=self.mmap_mode)
+        return CompiledModel.load(path, mmap_mode=self.mmap_mode)
+
+
+class LazyModelPipelines(Mapping):
+    """Read-only {model_name: {'pipeline': model, ...}} view over an ArtifactStore.
+
+    Drop-in for the dict load_saved_models used to hold: listing names and
+    membership tests never touch the model files, and an entry's model is
+    loaded when the entry is first looked up.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, model_name):
+        if model_name not in self.store.manifest['models']:
+            raise KeyError(model_name)
+        entry = self.store.entry(model_name)
+        return {**entry.get('info', {}), 'pipeline': self.store.load(model_name)}
+
+    def __contains__(self, model_name):
+        return model_name in self.store.manifest['models']
+
+    def __iter__(self):
+        return iter(self.store.names)
+
+    def __len__(self):
+        return len(self.store.names)
+
+
+def split_pipelines(pipelines_path, output_folder):
+    """Write every model in investment_model_pipelines.pkl to its own uncompressed joblib file"""
+    bundle = joblib.load(pipelines_path)
+    os.makedirs(output_folder, exist_ok=True)
+    manifest = {'models': {}, 'source_sha256': file_digest(pipelines_path)}
+
+    for model_name, model_entry in bundle.items():
+        file_name = artifact_name(model_name) + '.joblib'
+        # compress=0 keeps the arrays in place on disk so joblib can memory-map them
+        joblib.dump(model_entry['pipeline'], os.path.join(output_folder, file_name), compress=0)
+        manifest['models'][model_name] = {
+            'file': file_name,
+            'format': 'joblib',
+            'info': {key: value for key, value in model_entry.items() if key != 'pipeline'}
+        }
+
+    with open(os.path.join(output_folder, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return list(manifest['models'])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Split the pickled pipeline bundle into one file per model")
+    parser.add_argument("--pipelines", default=os.path.join("deployment", "investment_model_pipelines.pkl"))
+    parser.add_argument("--output", default=os.path.join("deployment", "pipelines"))
+    args = parser.parse_args()
+
+    for model_name in split_pipelines(args.pipelines, args.output):
+        print(f"✅ {model_name}")
+    print(f"🚀 Artifact store written to {args.output}")
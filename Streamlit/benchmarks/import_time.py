@@ -0,0 +1,98 @@
+"""Import-time check for the recommendation engine.
+
+Runs `python -X importtime -c "import Investment_System"` in fresh
+interpreters and fails (exit code 1) when:
+
+- any UI, HTTP or training library (streamlit, plotly, requests, pyngrok,
+  sklearn, ...) ends up imported by the core engine, or
+- the engine's own import cost, on top of numpy/pandas/joblib which are
+  imported first, goes over the budget (median of --runs).
+
+Run from the Streamlit folder:
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget-ms 150 --runs 7
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORE_MODULE = "Investment_System"
+CORE_DEPENDENCIES = ["numpy", "pandas", "joblib"]
+
+# Top-level packages the core import path must not pull in
+FORBIDDEN_MODULES = [
+    "streamlit", "plotly", "requests", "pyngrok", "webbrowser",
+    "sklearn", "xgboost", "lightgbm", "fastapi", "uvicorn"
+]
+
+DEFAULT_BUDGET_MS = 100.0
+
+
+def measure_import(module, preload=()):
+    """Import module in a fresh interpreter: (cumulative import time in ms, top-level packages loaded)"""
+    code = "; ".join([f"import {name}" for name in preload] + [
+        f"import {module}",
+        "import sys",
+        "print(','.join(sorted({name.split('.')[0] for name in sys.modules})))",
+    ])
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ENGINE_DIR, capture_output=True, text=True, check=True
+    )
+
+    cumulative_us = None
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:"):
+            continue
+        fields = [field.strip() for field in line[len("import time:"):].split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            cumulative_us = int(fields[1])
+
+    if cumulative_us is None:
+        raise RuntimeError(f"No -X importtime entry for {module}")
+    loaded = set(result.stdout.strip().splitlines()[-1].split(","))
+    return cumulative_us / 1000.0, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if importing the core engine gets slower or heavier")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="allowed import time of the engine itself, after its core dependencies")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    engine_times, total_times = [], []
+    loaded = set()
+    for _ in range(args.runs):
+        engine_ms, loaded = measure_import(CORE_MODULE, preload=CORE_DEPENDENCIES)
+        total_ms, _ = measure_import(CORE_MODULE)
+        engine_times.append(engine_ms)
+        total_times.append(total_ms)
+
+    engine_ms = statistics.median(engine_times)
+    total_ms = statistics.median(total_times)
+    print(f"📦 import {CORE_MODULE}: {total_ms:.1f} ms cold, "
+          f"{engine_ms:.1f} ms on top of {', '.join(CORE_DEPENDENCIES)} (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    heavy = sorted(name for name in FORBIDDEN_MODULES if name in loaded)
+    if heavy:
+        print(f"❌ Core import pulled in: {', '.join(heavy)}")
+        failed = True
+    if engine_ms > args.budget_ms:
+        print(f"❌ Import time over budget by {engine_ms - args.budget_ms:.1f} ms")
+        failed = True
+
+    if not failed:
+        print("✅ Core import within budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
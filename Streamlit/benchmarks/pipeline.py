@@ -0,0 +1,256 @@
+"""Latency and throughput benchmarks for the recommendation pipeline.
+
+Runs each benchmark on synthetic profiles (benchmarks/profiles.py) after a
+warm-up, and reports:
+
+- single-profile latency percentiles (p50/p95/p99, microseconds) for
+  get_recommendations, get_model_prediction, the feature mapping helpers
+  and POST /recommendations through an in-process ASGI client, and
+- batch throughput (profiles per second) for get_batch_recommendations
+  and POST /recommendations/batch.
+
+Results are written as JSON. With --compare, every metric is checked
+against a previous results file and the run fails (exit code 1) when a
+latency grew, or a throughput dropped, by more than --threshold.
+
+Run from the Streamlit folder:
+
+    python benchmarks/pipeline.py --output bench.json
+    python benchmarks/pipeline.py --compare bench.json --threshold 0.3
+    python benchmarks/pipeline.py --only engine --profiles 500
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ENGINE_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ENGINE_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import numpy as np
+import pandas as pd
+from profiles import generate_profiles, DEFAULT_SEED
+
+DEFAULT_PROFILES = 2000
+DEFAULT_WARMUP = 100
+DEFAULT_BATCH_SIZE = 1000
+# Timings on shared machines move by 10% between identical runs
+DEFAULT_THRESHOLD = 0.20
+PERCENTILES = (50, 95, 99)
+
+# Compared by --compare: latency percentiles (lower is better) and throughputs (higher is better)
+LATENCY_METRICS = tuple(f"p{p}_us" for p in PERCENTILES)
+THROUGHPUT_SUFFIX = "_per_s"
+
+
+def latency_stats(samples_s):
+    """Percentiles and mean of per-call timings, in microseconds"""
+    samples_us = np.asarray(samples_s) * 1e6
+    stats = {f"p{p}_us": float(np.percentile(samples_us, p)) for p in PERCENTILES}
+    stats["mean_us"] = float(samples_us.mean())
+    stats["calls"] = len(samples_us)
+    return stats
+
+
+def time_calls(fn, profiles, warmup):
+    """Per-call seconds of fn(profile) over profiles[warmup:], after calling it on profiles[:warmup]"""
+    for profile in profiles[:warmup]:
+        fn(profile)
+    timings = np.empty(len(profiles) - warmup)
+    for i, profile in enumerate(profiles[warmup:]):
+        started = time.perf_counter()
+        fn(profile)
+        timings[i] = time.perf_counter() - started
+    return timings
+
+
+def time_batch(fn, batch, repeats=5):
+    """Best-of-repeats throughput of fn(batch), in profiles per second"""
+    fn(batch)
+    best = min(_elapsed(fn, batch) for _ in range(repeats))
+    return {"profiles_per_s": len(batch) / best, "batch_size": len(batch), "best_s": best}
+
+
+def _elapsed(fn, batch):
+    started = time.perf_counter()
+    fn(batch)
+    return time.perf_counter() - started
+
+
+def bench_engine(profiles, warmup, batch_size):
+    from Investment_System import InvestmentRecommendationSystem
+
+    # No recommendation cache, so every call does the full work
+    system = InvestmentRecommendationSystem(low_latency=True)
+    reference = InvestmentRecommendationSystem(low_latency=False)
+    results = {}
+
+    results["get_recommendations"] = latency_stats(
+        time_calls(lambda p: system.get_recommendations(user_data=p), profiles, warmup))
+    results["get_model_prediction"] = latency_stats(
+        time_calls(system.get_model_prediction, profiles, warmup))
+    results["get_model_prediction_dataframe"] = latency_stats(
+        time_calls(reference.get_model_prediction, profiles, warmup))
+    results["map_user_data_to_model_features"] = latency_stats(
+        time_calls(system._map_user_data_to_model_features, profiles, warmup))
+    results["feature_builder_row_values"] = latency_stats(
+        time_calls(system.feature_builder.row_values, profiles, warmup))
+
+    batch = pd.DataFrame(profiles[:batch_size])
+    results["get_batch_recommendations"] = time_batch(system.get_batch_recommendations, batch)
+    results["feature_builder_build"] = time_batch(system.feature_builder.build, batch)
+    return results
+
+
+def bench_api(profiles, warmup, batch_size):
+    try:
+        import httpx
+    except ImportError:
+        print("⚠️ httpx not installed, skipping API benchmarks")
+        return {}
+
+    import api
+
+    async def run():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def post_one(profile):
+                response = await client.post("/recommendations", json=profile)
+                response.raise_for_status()
+
+            for profile in profiles[:warmup]:
+                await post_one(profile)
+            # Timed profiles are all distinct from the warm-up ones, so none is a cache hit
+            timings = np.empty(len(profiles) - warmup)
+            for i, profile in enumerate(profiles[warmup:]):
+                started = time.perf_counter()
+                await post_one(profile)
+                timings[i] = time.perf_counter() - started
+
+            batch = {"profiles": profiles[:batch_size]}
+            await client.post("/recommendations/batch", json=batch)
+            best = None
+            for _ in range(5):
+                started = time.perf_counter()
+                response = await client.post("/recommendations/batch", json=batch)
+                response.raise_for_status()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+
+            return {
+                "api_recommendations": latency_stats(timings),
+                "api_recommendations_batch": {
+                    "profiles_per_s": batch_size / best, "batch_size": batch_size, "best_s": best
+                }
+            }
+
+    try:
+        return asyncio.run(run())
+    finally:
+        api.inference_pool.shutdown()
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ENGINE_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "cpu_count": os.cpu_count()
+    }
+
+
+def compare(current, baseline, threshold):
+    """Regressions beyond threshold: [(benchmark, metric, baseline, current, relative change)]"""
+    regressions = []
+    for name, metrics in current.items():
+        for metric, value in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            if not old or not (metric in LATENCY_METRICS or metric.endswith(THROUGHPUT_SUFFIX)):
+                continue
+            change = (value - old) / old
+            worse = -change if metric.endswith(THROUGHPUT_SUFFIX) else change
+            if worse > threshold:
+                regressions.append((name, metric, old, value, change))
+    return regressions
+
+
+def print_results(results):
+    for name, metrics in results.items():
+        if "p50_us" in metrics:
+            print(f"  {name:<34} p50 {metrics['p50_us']:>9.1f} us  p95 {metrics['p95_us']:>9.1f} us  "
+                  f"p99 {metrics['p99_us']:>9.1f} us")
+        else:
+            print(f"  {name:<34} {metrics['profiles_per_s']:>12,.0f} profiles/s (batch {metrics['batch_size']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the recommendation pipeline")
+    parser.add_argument("--profiles", type=int, default=DEFAULT_PROFILES, help="profiles timed per benchmark")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--only", choices=["engine", "api"], help="run one group of benchmarks")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="previous results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative slowdown before a metric counts as a regression")
+    args = parser.parse_args()
+
+    # Engine and API log per request at DEBUG only, but keep benchmark output clean
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    logging.getLogger().setLevel(logging.WARNING)
+    os.chdir(ENGINE_DIR)
+
+    profiles = generate_profiles(args.profiles + args.warmup, seed=args.seed)
+    warmup, timed = profiles[:args.warmup], profiles[args.warmup:]
+    batch_size = min(args.batch_size, len(profiles))
+
+    results = {}
+    if args.only in (None, "engine"):
+        results.update(bench_engine(warmup + timed, len(warmup), batch_size))
+    if args.only in (None, "api"):
+        results.update(bench_api(warmup + timed, len(warmup), batch_size))
+
+    report = {
+        "environment": environment(),
+        "settings": {"profiles": args.profiles, "warmup": args.warmup, "batch_size": batch_size, "seed": args.seed},
+        "results": results
+    }
+    print(f"📊 Benchmarks ({args.profiles} profiles, seed {args.seed}):")
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for name, metric, old, value, change in regressions:
+            print(f"❌ {name} {metric}: {old:,.1f} -> {value:,.1f} ({change:+.0%})")
+        if regressions:
+            return 1
+        print(f"✅ No regressions over {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""Synthetic user profiles for benchmarks, in the shape of api.UserProfile.
+
+Each categorical field deals its values (the options offered by
+streamlit_app.py) from its own reshuffled deck, so every run of
+len(values) consecutive profiles covers all of them while the
+combinations across fields vary. Numeric fields are drawn from
+realistic Kenyan ranges. Same seed, same profiles.
+"""
+import random
+
+CATEGORIES = {
+    "location": ["Urban", "Semi-Urban", "Rural"],
+    "education": ["Primary", "Secondary", "College/University", "Postgraduate"],
+    "employment": ["Employed", "Self-Employed", "Student", "Retired", "Unemployed"],
+    "emergency_fund": ["Yes", "No", "Partial"],
+    "risk_tolerance": ["Low", "Medium", "High", "Very High"],
+    "investment_horizon": ["Short-term (< 2 years)", "Medium-term (2-5 years)", "Long-term (5+ years)"],
+    "investment_experience": ["Beginner", "Intermediate", "Advanced"],
+}
+
+INVESTMENT_GOALS = ["Retirement Planning", "Children's Education", "Emergency Fund", "Wealth Building",
+                    "Regular Income", "Home Purchase", "Business Investment", "Travel/Leisure"]
+PREFERRED_SECTORS = ["Government Securities", "Banking/Finance", "Real Estate", "Technology",
+                     "Agriculture", "Energy", "Manufacturing", "Telecommunications", "No Preference"]
+
+DEFAULT_SEED = 42
+
+
+def generate_profiles(n, seed=DEFAULT_SEED):
+    """n UserProfile-shaped dicts"""
+    rng = random.Random(seed)
+    decks = {field: [] for field in CATEGORIES}
+
+    profiles = []
+    for i in range(n):
+        monthly_income = round(rng.lognormvariate(10.3, 0.8), -2)
+        profile = {
+            "name": f"user_{i}",
+            "age": rng.randint(18, 80),
+            "household_size": rng.randint(1, 10),
+            "monthly_income": monthly_income,
+            "monthly_expenses": round(monthly_income * rng.uniform(0.3, 1.2), -2),
+            "current_savings": round(rng.expovariate(1 / 100000), -3),
+            "debt_amount": round(rng.expovariate(1 / 30000), -3) if rng.random() < 0.5 else 0,
+            "dependents": rng.randint(0, 6),
+            "investment_amount": round(rng.uniform(1000, 500000), -3),
+            "investment_goals": rng.sample(INVESTMENT_GOALS, rng.randint(1, 3)),
+            "preferred_sectors": rng.sample(PREFERRED_SECTORS, rng.randint(0, 2)),
+        }
+        for field, deck in decks.items():
+            if not deck:
+                deck.extend(CATEGORIES[field])
+                rng.shuffle(deck)
+            profile[field] = deck.pop()
+        profiles.append(profile)
+    return profiles
@@ -0,0 +1,481 @@
+"""Offline bulk scoring of survey files.
+
+Streams a CSV, Parquet or JSONL file through the engine chunk by chunk
+and writes one result row per respondent as it goes, so memory is
+bounded by --chunk-size and files larger than RAM can be scored:
+
+    read_chunks -> to_profiles -> score_chunks -> ResultWriter
+
+Input rows are either FinAccess survey rows (columns as in
+data/feature_names.csv, mapped with FINACCESS_COLUMNS) or rows already in
+the API's UserProfile shape (--schema profile). Only the columns that
+are used are read. Each chunk is scored with one vectorized
+get_batch_recommendations call.
+
+With --workers N the input is split into shards (line-aligned byte
+ranges of CSV/JSONL, or groups of Parquet row groups) that are scored by
+N processes. Each worker builds the engine once and writes its own part
+file; parts are appended to the output in input order as they finish.
+
+Run from the Streamlit folder:
+
+    python bulk_score.py finaccess.csv results.parquet
+    python bulk_score.py profiles.jsonl results.csv --schema profile --top-n 3
+    python bulk_score.py finaccess.csv results.csv --workers 8
+"""
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_CHUNK_SIZE = 10000
+DEFAULT_TOP_N = 5
+FORMATS = ("csv", "parquet", "jsonl")
+SCHEMAS = ("finaccess", "profile")
+
+# Shards per worker, so a slow shard does not leave the other workers idle at the end
+SHARDS_PER_WORKER = 4
+# Block size for scanning CSV/JSONL files for line boundaries
+SCAN_BLOCK_SIZE = 1 << 24
+
+# Engine built in each worker process by bulk_score_parallel
+_worker_system = None
+
+# FinAccess survey column -> UserProfile field. Fields with no survey
+# counterpart (education, employment, savings, debt, experience) take the
+# engine's defaults.
+FINACCESS_COLUMNS = {
+    'age': 'age',
+    'household_size': 'household_size',
+    'monthly income': 'monthly_income',
+    'monthly_expenditure': 'monthly_expenses',
+    'location_type': 'location'
+}
+
+# UserProfile fields read with --schema profile
+PROFILE_FIELDS = [
+    'age', 'location', 'education', 'employment', 'household_size', 'monthly_income',
+    'monthly_expenses', 'current_savings', 'debt_amount', 'dependents', 'emergency_fund',
+    'risk_tolerance', 'investment_horizon', 'investment_amount', 'investment_experience'
+]
+
+
+def file_format(path):
+    """csv, parquet or jsonl, from the file extension"""
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    extension = {"pq": "parquet", "ndjson": "jsonl"}.get(extension, extension)
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported file type '{path}', expected one of {FORMATS}")
+    return extension
+
+
+class _ByteRange(io.RawIOBase):
+    """Read-only view of bytes [start, end) of a file"""
+
+    def __init__(self, path, start, end):
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        read = self._file.readinto(memoryview(buffer)[:size])
+        self._remaining -= read
+        return read
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def _open_range(path, start, end):
+    return io.TextIOWrapper(io.BufferedReader(_ByteRange(path, start, end)), encoding="utf-8")
+
+
+def read_chunks(path, columns, chunk_size=DEFAULT_CHUNK_SIZE, shard=None):
+    """Yield DataFrames of at most chunk_size rows, holding only the wanted columns present in the file.
+
+    shard (from plan_shards) limits reading to its byte range or row groups.
+    """
+    wanted = set(columns)
+    fmt = file_format(path)
+
+    if fmt == "csv":
+        if shard is None:
+            try:
+                reader = pd.read_csv(path, usecols=lambda column: column in wanted, chunksize=chunk_size)
+            except pd.errors.EmptyDataError:
+                # Not even a header: nothing to score
+                return
+            yield from reader
+            return
+        # The range starts after the header, so the column names are read separately
+        names = list(pd.read_csv(path, nrows=0).columns)
+        with _open_range(path, shard['start'], shard['end']) as handle:
+            yield from pd.read_csv(handle, header=None, names=names, usecols=lambda column: column in wanted,
+                                   chunksize=chunk_size)
+
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        present = [name for name in parquet_file.schema_arrow.names if name in wanted]
+        row_groups = shard['row_groups'] if shard is not None else None
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=present, row_groups=row_groups):
+            yield batch.to_pandas()
+
+    else:
+        handle = path if shard is None else _open_range(path, shard['start'], shard['end'])
+        try:
+            for chunk in pd.read_json(handle, lines=True, chunksize=chunk_size):
+                yield chunk[[name for name in chunk.columns if name in wanted]]
+        finally:
+            if shard is not None:
+                handle.close()
+
+
+def _count_lines(path, start, end):
+    count = 0
+    with _ByteRange(path, start, end) as raw:
+        while True:
+            block = raw.read(SCAN_BLOCK_SIZE)
+            if not block:
+                return count
+            count += block.count(b"\n")
+
+
+def plan_shards(path, n_shards):
+    """Split a file into up to n_shards contiguous shards.
+
+    Each shard is a dict with 'index' and 'first_row' (its first data row
+    in the whole file, for row-number ids), plus 'start'/'end' byte offsets
+    aligned to line starts (CSV, JSONL) or 'row_groups' (Parquet). Byte
+    ranges assume one record per line, i.e. no quoted newlines in CSV.
+    """
+    fmt = file_format(path)
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        metadata = pq.ParquetFile(path).metadata
+        row_counts = [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+        groups = [list(group) for group in np.array_split(np.arange(len(row_counts)), n_shards) if len(group)]
+        shards = []
+        first_row = 0
+        for index, group in enumerate(groups):
+            shards.append({'index': index, 'first_row': first_row, 'row_groups': [int(i) for i in group]})
+            first_row += sum(row_counts[i] for i in group)
+        return shards
+
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        data_start = len(f.readline()) if fmt == "csv" else 0
+        boundaries = [data_start]
+        for k in range(1, n_shards):
+            f.seek(max(data_start, size * k // n_shards))
+            if f.tell() > data_start:
+                # Move to the start of the next line
+                f.readline()
+            boundaries.append(min(f.tell(), size))
+    boundaries = sorted(set(boundaries + [size]))
+
+    shards = []
+    first_row = 0
+    for index, (start, end) in enumerate(zip(boundaries, boundaries[1:])):
+        shards.append({'index': index, 'first_row': first_row, 'start': start, 'end': end})
+        # Every shard but the last ends right after a newline, so its line count is its row count
+        first_row += _count_lines(path, start, end)
+    return shards
+
+
+def to_profiles(chunks, schema="finaccess", id_column=None, first_row=0):
+    """Yield (ids, profiles DataFrame) per chunk; ids come from id_column or the running row number"""
+    offset = first_row
+    for chunk in chunks:
+        ids = chunk[id_column].to_numpy() if id_column else np.arange(offset, offset + len(chunk))
+        offset += len(chunk)
+
+        if schema == "finaccess":
+            fields = [field for column, field in FINACCESS_COLUMNS.items() if column in chunk.columns]
+            if not fields:
+                raise ValueError(f"None of the FinAccess columns {list(FINACCESS_COLUMNS)} are in the input")
+            profiles = chunk.rename(columns=FINACCESS_COLUMNS)[fields].copy()
+            if 'location' in profiles.columns:
+                # Survey values are 'URBAN'/'rural' style; the engine expects 'Urban'/'Rural'
+                profiles['location'] = profiles['location'].astype(str).str.strip().str.title()
+            # Respondents never stated a risk tolerance, so derive it from age, income and experience
+            profiles['risk_tolerance'] = ""
+        else:
+            profiles = chunk[[field for field in PROFILE_FIELDS if field in chunk.columns]]
+
+        yield ids, profiles.reset_index(drop=True)
+
+
+def score_chunks(system, profile_chunks, top_n=DEFAULT_TOP_N):
+    """Yield (ids, batch results) per chunk, scored in one vectorized call each"""
+    for ids, profiles in profile_chunks:
+        yield ids, system.get_batch_recommendations(profiles, top_n=top_n)
+
+
+def result_columns(top_n):
+    """Column names of result_rows, in order"""
+    columns = ['id', 'user_segment', 'risk_tolerance', 'investment_probability']
+    for rank in range(1, top_n + 1):
+        columns += [f'product_{rank}', f'suitability_{rank}']
+    return columns + ['portfolio_allocation']
+
+
+def result_rows(ids, results, top_n):
+    """Flat result records: one product name and suitability column per rank, allocation as JSON"""
+    rows = []
+    for row_id, result in zip(ids, results):
+        row = {
+            'id': row_id.item() if hasattr(row_id, 'item') else row_id,
+            'user_segment': result['user_segment'],
+            'risk_tolerance': result['risk_tolerance'],
+            'investment_probability': result['investment_probability']
+        }
+        recommendations = result['recommendations']
+        for rank in range(1, top_n + 1):
+            product = recommendations[rank - 1] if rank <= len(recommendations) else None
+            row[f'product_{rank}'] = product['name'] if product else None
+            row[f'suitability_{rank}'] = product['suitability_score'] if product else np.nan
+        row['portfolio_allocation'] = json.dumps(result['portfolio_allocation'])
+        rows.append(row)
+    return rows
+
+
+class ResultWriter:
+    """Appends result chunks to a CSV, Parquet or JSONL file as they are scored.
+
+    An output is written even when no rows are: a header-only CSV, an empty
+    Parquet file with the result schema, or an empty JSONL file.
+    """
+
+    def __init__(self, path, top_n=DEFAULT_TOP_N):
+        self.path = path
+        self.format = file_format(path)
+        self.top_n = top_n
+        self.rows_written = 0
+        self._file = None
+        self._parquet_writer = None
+
+    def write(self, ids, results):
+        if not len(results):
+            return
+        if self.format == "jsonl":
+            if self._file is None:
+                self._file = open(self.path, "w", encoding="utf-8")
+            for row_id, result in zip(ids, results):
+                record = {'id': row_id.item() if hasattr(row_id, 'item') else row_id, **result}
+                self._file.write(json.dumps(record) + "\n")
+
+        else:
+            frame = pd.DataFrame(result_rows(ids, results, self.top_n))
+            if self.format == "csv":
+                frame.to_csv(self.path, mode="w" if self.rows_written == 0 else "a",
+                             header=self.rows_written == 0, index=False)
+            else:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if self._parquet_writer is None:
+                    # Product columns are typed explicitly so an all-empty first chunk cannot fix them as null
+                    schema = pa.schema([
+                        field.with_type(pa.string()) if field.name.startswith("product_") else field
+                        for field in table.schema
+                    ])
+                    self._parquet_writer = pq.ParquetWriter(self.path, schema)
+                self._parquet_writer.write_table(table.cast(self._parquet_writer.schema))
+
+        self.rows_written += len(results)
+
+    def close(self):
+        if self.rows_written == 0:
+            self._write_empty()
+        if self._file is not None:
+            self._file.close()
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+    def _write_empty(self):
+        if self.format == "jsonl":
+            if self._file is None:
+                self._file = open(self.path, "w", encoding="utf-8")
+        elif self.format == "csv":
+            pd.DataFrame(columns=result_columns(self.top_n)).to_csv(self.path, index=False)
+        elif self._parquet_writer is None:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            types = {'id': pa.int64(), 'investment_probability': pa.float64()}
+            schema = pa.schema([
+                (name, types.get(name, pa.float64() if name.startswith("suitability_") else pa.string()))
+                for name in result_columns(self.top_n)
+            ])
+            self._parquet_writer = pq.ParquetWriter(self.path, schema)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+def _input_columns(schema, id_column):
+    columns = list(FINACCESS_COLUMNS) if schema == "finaccess" else list(PROFILE_FIELDS)
+    if id_column:
+        columns.append(id_column)
+    return columns
+
+
+def bulk_score(system, input_path, output_path, schema="finaccess", chunk_size=DEFAULT_CHUNK_SIZE,
+               top_n=DEFAULT_TOP_N, id_column=None, shard=None, verbose=True):
+    """Score input_path (or one shard of it) into output_path chunk by chunk; returns the number of rows written"""
+    chunks = read_chunks(input_path, _input_columns(schema, id_column), chunk_size, shard)
+    first_row = shard['first_row'] if shard is not None else 0
+    scored = score_chunks(system, to_profiles(chunks, schema, id_column, first_row), top_n)
+
+    started = time.perf_counter()
+    with ResultWriter(output_path, top_n) as writer:
+        for ids, results in scored:
+            writer.write(ids, results)
+            if verbose:
+                elapsed = time.perf_counter() - started
+                print(f"📦 {writer.rows_written:,} rows scored ({writer.rows_written / elapsed:,.0f} rows/s)")
+    return writer.rows_written
+
+
+def _init_worker_system(engine_kwargs):
+    global _worker_system
+    from Investment_System import InvestmentRecommendationSystem
+    _worker_system = InvestmentRecommendationSystem(**engine_kwargs)
+
+
+def _score_shard(input_path, part_path, shard, schema, chunk_size, top_n, id_column):
+    return bulk_score(_worker_system, input_path, part_path, schema, chunk_size, top_n, id_column,
+                      shard=shard, verbose=False)
+
+
+class _PartMerger:
+    """Appends worker part files to the output: byte copies for CSV/JSONL, row group by row group for Parquet"""
+
+    def __init__(self, path):
+        self.path = path
+        self.format = file_format(path)
+        self._output = None
+        self.parts = 0
+
+    def append(self, part_path):
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+            part = pq.ParquetFile(part_path)
+            for i in range(part.num_row_groups):
+                table = part.read_row_group(i)
+                if self._output is None:
+                    self._output = pq.ParquetWriter(self.path, table.schema)
+                self._output.write_table(table)
+        else:
+            if self._output is None:
+                self._output = open(self.path, "wb")
+            with open(part_path, "rb") as part:
+                if self.format == "csv" and self.parts:
+                    # Only the first part keeps its header
+                    part.readline()
+                shutil.copyfileobj(part, self._output)
+        self.parts += 1
+
+    def close(self):
+        if self._output is not None:
+            self._output.close()
+
+
+def bulk_score_parallel(input_path, output_path, workers, schema="finaccess", chunk_size=DEFAULT_CHUNK_SIZE,
+                        top_n=DEFAULT_TOP_N, id_column=None, engine_kwargs=None):
+    """bulk_score over shards of input_path on a pool of worker processes, merged in input order.
+
+    Each worker builds its own engine once (models are loaded lazily, from
+    memory-mapped artifacts where available, so workers share the weights
+    through the page cache). Returns the number of rows written.
+    """
+    shards = plan_shards(input_path, workers * SHARDS_PER_WORKER)
+    part_folder = tempfile.mkdtemp(prefix="bulk_score_", dir=os.path.dirname(os.path.abspath(output_path)))
+    part_paths = [os.path.join(part_folder, f"part-{shard['index']:05d}.{file_format(output_path)}") for shard in shards]
+    print(f"🔀 {len(shards)} shards on {workers} worker processes")
+
+    started = time.perf_counter()
+    rows = [None] * len(shards)
+    next_part = 0
+    merger = _PartMerger(output_path)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker_system,
+                                 initargs=(engine_kwargs or {},)) as executor:
+            futures = {
+                executor.submit(_score_shard, input_path, part_path, shard, schema, chunk_size, top_n, id_column):
+                    shard['index']
+                for shard, part_path in zip(shards, part_paths)
+            }
+            for future in as_completed(futures):
+                rows[futures[future]] = future.result()
+
+                # Append every finished part that is next in input order
+                while next_part < len(shards) and rows[next_part] is not None:
+                    if rows[next_part]:
+                        merger.append(part_paths[next_part])
+                        os.remove(part_paths[next_part])
+                    next_part += 1
+
+                done = sum(count for count in rows if count is not None)
+                elapsed = time.perf_counter() - started
+                print(f"📦 {done:,} rows scored ({done / elapsed:,.0f} rows/s), "
+                      f"{next_part}/{len(shards)} shards merged")
+
+        if merger.parts == 0:
+            # Empty input (no shards, or only empty ones): write the same empty output as bulk_score
+            ResultWriter(output_path, top_n).close()
+    finally:
+        merger.close()
+        shutil.rmtree(part_folder, ignore_errors=True)
+    return sum(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+    from Investment_System import InvestmentRecommendationSystem
+
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet/JSONL file of respondents in chunks")
+    parser.add_argument("input", help="FinAccess survey rows, or UserProfile rows with --schema profile")
+    parser.add_argument("output", help="results file (.csv, .parquet or .jsonl)")
+    parser.add_argument("--schema", choices=SCHEMAS, default="finaccess")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows read and scored at a time")
+    parser.add_argument("--top-n", type=int, default=DEFAULT_TOP_N, help="products per respondent")
+    parser.add_argument("--id-column", help="input column copied to the output id (default: row number)")
+    parser.add_argument("--ensemble", action="store_true", help="score with all models (see ensemble.py)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, each scoring shards of the input")
+    args = parser.parse_args()
+
+    try:
+        file_format(args.input)
+        file_format(args.output)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if args.workers > 1:
+        rows = bulk_score_parallel(args.input, args.output, args.workers, args.schema, args.chunk_size,
+                                   args.top_n, args.id_column, engine_kwargs={"use_ensemble": args.ensemble})
+    else:
+        system = InvestmentRecommendationSystem(use_ensemble=args.ensemble)
+        rows = bulk_score(system, args.input, args.output, args.schema, args.chunk_size, args.top_n,
+                          args.id_column)
+    print(f"✅ {rows:,} results written to {args.output}")
@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from types import MappingProxyType
+from typing import NamedTuple, Tuple
+from product_index import ProductCatalogIndex, ALTERNATIVE_PRODUCTS
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "investment_products.json")
+
+# Seconds between checks of the catalog file's modification time
+DEFAULT_POLL_INTERVAL = 2.0
+
+REQUIRED_FIELDS = ('description', 'risk_level', 'expected_return', 'liquidity')
+
+
+class ProductRecord(NamedTuple):
+    """One compiled catalog entry"""
+    name: str
+    description: str
+    risk_level: str
+    expected_return: str
+    liquidity: str
+    pros: Tuple[str, ...]
+    cons: Tuple[str, ...]
+
+    def details(self):
+        """Fields other than the name, as a dict"""
+        return {field: getattr(self, field) for field in self._fields[1:]}
+
+
+class CatalogSnapshot:
+    """Immutable, compiled view of one version of the catalog file.
+
+    Strings are interned (risk and liquidity levels repeat across products)
+    and products are stored as ProductRecord tuples. Everything the engine
+    reads (investment_products, the product index, the risk categories) is
+    built here once, so a request holding a snapshot never sees a half
+    loaded catalog.
+    """
+
+    def __init__(self, catalog, generation=0, mtime_ns=None):
+        products = catalog.get('products')
+        if not isinstance(products, dict) or not products:
+            raise ValueError("Catalog has no 'products' mapping")
+
+        records = []
+        for name, details in products.items():
+            missing = [field for field in REQUIRED_FIELDS if field not in details]
+            if missing:
+                raise ValueError(f"Product '{name}' is missing {missing}")
+            records.append(ProductRecord(
+                name=sys.intern(name),
+                description=details['description'],
+                risk_level=sys.intern(details['risk_level']),
+                expected_return=sys.intern(details['expected_return']),
+                liquidity=sys.intern(details['liquidity']),
+                pros=tuple(details.get('pros', ())),
+                cons=tuple(details.get('cons', ()))
+            ))
+
+        self.generation = generation
+        self.mtime_ns = mtime_ns
+        self.records = tuple(records)
+        self.category_info = MappingProxyType(catalog.get('risk_categories', {}))
+
+        alternative = self.category_info.get('alternative', {}).get('products', ALTERNATIVE_PRODUCTS)
+        self.index = ProductCatalogIndex({record.name: record.details() for record in self.records},
+                                         alternative_products=alternative)
+        # Read-only {name: details} in the shape _define_investment_products used to return
+        self.investment_products = MappingProxyType({name: self.index.details(name) for name in self.index.names})
+
+    @classmethod
+    def from_file(cls, path, generation=0):
+        mtime_ns = os.stat(path).st_mtime_ns
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f), generation=generation, mtime_ns=mtime_ns)
+
+
+class CatalogStore:
+    """Holds the current CatalogSnapshot for a catalog file and swaps in new versions.
+
+    current() is what request paths call. At most every poll_interval seconds
+    it stats the file; if the modification time moved, one caller compiles a
+    new snapshot while everyone else keeps getting the old one, then the
+    reference is replaced in a single assignment. Requests that already
+    hold a snapshot finish on it. A file that fails to load is reported and
+    the previous snapshot stays in service.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path=DEFAULT_CATALOG_PATH, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.path = os.path.abspath(path)
+        self.poll_interval = poll_interval
+        self._reload_lock = threading.Lock()
+        self._snapshot = CatalogSnapshot.from_file(self.path)
+        self._seen_mtime_ns = self._snapshot.mtime_ns
+        self._next_check = time.monotonic() + (poll_interval or 0)
+
+    @classmethod
+    def shared(cls, path=DEFAULT_CATALOG_PATH, poll_interval=DEFAULT_POLL_INTERVAL):
+        """One store per catalog file per process, so engine instances share the compiled snapshot"""
+        path = os.path.abspath(path)
+        with cls._shared_lock:
+            store = cls._shared.get(path)
+            if store is None:
+                store = cls._shared[path] = cls(path, poll_interval)
+            return store
+
+    @property
+    def generation(self):
+        return self._snapshot.generation
+
+    def current(self):
+        """The latest snapshot, reloading first if the file changed (never blocks on another reload)"""
+        if self.poll_interval is not None and time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self.poll_interval
+            self.reload_if_changed()
+        return self._snapshot
+
+    def reload_if_changed(self):
+        """Swap in a new snapshot if the file's mtime moved; returns True when it did"""
+        # Whoever gets the lock does the reload; other callers carry on with the old snapshot
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            try:
+                mtime_ns = os.stat(self.path).st_mtime_ns
+            except OSError as e:
+                logger.error("❌ Product catalog unavailable, keeping current version: %s", e)
+                return False
+            if mtime_ns == self._seen_mtime_ns:
+                return False
+            # Recorded up front so a broken file is not retried on every poll
+            self._seen_mtime_ns = mtime_ns
+
+            try:
+                new_snapshot = CatalogSnapshot.from_file(self.path, generation=self._snapshot.generation + 1)
+            except Exception as e:
+                logger.error("❌ Error reloading product catalog, keeping current version: %s", e)
+                return False
+
+            self._snapshot = new_snapshot
+            logger.info("🔄 Product catalog reloaded (%d products)", len(new_snapshot.records))
+            return True
+        finally:
+            self._reload_lock.release()
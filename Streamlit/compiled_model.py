@@ -0,0 +1,688 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+
+# Absolute tolerance an exported model must meet against the sklearn pipeline
+EXPORT_TOLERANCE = 1e-9
+
+# Models whose library returns float32 probabilities (XGBoost) are held to one float32 ulp at 1.0
+FLOAT32_TOLERANCE = 2.0 ** -23
+
+MANIFEST_FILE = "manifest.json"
+
+# Per-node missing-value handling codes for the flat tree arrays
+MISSING_NAN = 0        # NaN takes the default branch (sklearn, XGBoost, LightGBM 'NaN')
+MISSING_AS_ZERO = 1    # NaN is compared as 0.0 (LightGBM 'None')
+MISSING_ZERO = 2       # NaN and |x| <= 1e-35 take the default branch (LightGBM 'Zero')
+LIGHTGBM_ZERO_THRESHOLD = 1e-35
+
+
+class CompiledModel:
+    """A fitted pipeline reduced to plain arrays and evaluated with NumPy.
+
+    Holds the preprocessing as column blocks (imputed/scaled numeric columns,
+    one-hot columns) and the classifier as either a linear layer or a flat
+    tree ensemble. Loading one needs only NumPy, never sklearn. It exposes
+    feature_names_in_ and predict_proba like the pipeline it came from, so it
+    can stand in for it anywhere the engine scores a DataFrame or matrix.
+    """
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.arrays = arrays
+        self.feature_names_in_ = np.array(meta['feature_names'], dtype=object)
+        self.classes_ = np.asarray(arrays['classes'])
+
+    # ------------------------------------------------------------------ scoring
+
+    def predict_proba(self, X):
+        """Class probabilities, (n_samples, n_classes), for a DataFrame or array in feature order"""
+        if hasattr(X, 'columns'):
+            X = X[list(self.meta['feature_names'])].to_numpy(dtype=float)
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X[None, :]
+
+        Xt = self._transform(X)
+        model = self.meta['model']
+        if model['kind'] == 'linear':
+            return self._linear_proba(Xt, model)
+        return self._tree_proba(Xt, model)
+
+    def _transform(self, X):
+        parts = []
+        for block in self.meta['blocks']:
+            a = self.arrays
+            key = block['key']
+            columns = X[:, a[key + '_positions']]
+            if block['kind'] == 'numeric':
+                columns = np.where(np.isnan(columns), a[key + '_fill'], columns)
+                if key + '_mean' in a:
+                    columns = (columns - a[key + '_mean']) / a[key + '_scale']
+                parts.append(columns)
+            elif block['kind'] == 'onehot':
+                columns = np.where(np.isnan(columns), a[key + '_fill'], columns)
+                categories, offsets, keep = a[key + '_categories'], a[key + '_offsets'], a[key + '_keep']
+                for j in range(columns.shape[1]):
+                    cats = categories[offsets[j]:offsets[j + 1]][keep[offsets[j]:offsets[j + 1]]]
+                    parts.append((columns[:, j:j + 1] == cats[None, :]).astype(float))
+        if not parts:
+            return np.empty((X.shape[0], 0))
+        return parts[0] if len(parts) == 1 else np.hstack(parts)
+
+    def _linear_proba(self, Xt, model):
+        decision = Xt @ self.arrays['coef'].T + self.arrays['intercept']
+        if model['link'] == 'softmax':
+            if decision.shape[1] == 1:
+                decision = np.hstack([-decision, decision])
+            decision = decision - decision.max(axis=1, keepdims=True)
+            exp = np.exp(decision)
+            return exp / exp.sum(axis=1, keepdims=True)
+
+        prob = 1.0 / (1.0 + np.exp(-decision))
+        if prob.shape[1] == 1:
+            return np.hstack([1 - prob, prob])
+        return prob / prob.sum(axis=1, keepdims=True)
+
+    def _tree_proba(self, Xt, model):
+        leaf_values = self.arrays['value'][self.leaf_nodes(Xt)]  # (n_samples, n_trees, n_outputs)
+
+        if model['aggregate'] == 'mean':
+            return leaf_values.mean(axis=1)
+
+        if model.get('accumulate') == 'float32':
+            # XGBoost adds tree outputs one at a time onto a float32 margin
+            margin = np.concatenate([
+                np.full((len(Xt), 1), model['base_score'], dtype=np.float32),
+                leaf_values[:, :, 0].astype(np.float32)
+            ], axis=1)
+            raw = np.cumsum(margin, axis=1, dtype=np.float32)[:, -1]
+            # Correctly rounded float32 exp; XGBoost's own expf can still differ by one ulp
+            prob = np.float32(1) / (np.exp(-raw.astype(float)).astype(np.float32) + np.float32(1))
+            return np.column_stack([1 - prob, prob])
+
+        raw = model['base_score'] + leaf_values.sum(axis=1)[:, 0]
+        prob = 1.0 / (1.0 + np.exp(-model.get('sigmoid', 1.0) * raw))
+        return np.column_stack([1 - prob, prob])
+
+    def leaf_nodes(self, Xt):
+        """Leaf index reached in every tree, shape (n_samples, n_trees), traversing all trees at once"""
+        a = self.arrays
+        model = self.meta['model']
+        feature, threshold = a['feature'], a['threshold']
+        left, right, default_left = a['left'], a['right'], a['default_left']
+        missing_type = a.get('missing_type')
+
+        if model.get('input_dtype') == 'float32':
+            Xt = Xt.astype(np.float32)
+
+        nodes = np.broadcast_to(a['roots'], (Xt.shape[0], len(a['roots']))).copy()
+        rows = np.arange(Xt.shape[0])[:, None]
+        strict = model.get('comparison') == '<'
+
+        for _ in range(model['max_depth']):
+            is_split = left[nodes] >= 0
+            if not is_split.any():
+                break
+            x = Xt[rows, feature[nodes]]
+            missing = np.isnan(x)
+            if missing_type is not None:
+                # LightGBM: 'None' splits read NaN as 0.0, 'Zero' splits send 0.0 the default way too
+                node_missing = missing_type[nodes]
+                x = np.where(missing & (node_missing == MISSING_AS_ZERO), 0.0, x)
+                missing = np.isnan(x) | ((node_missing == MISSING_ZERO) & (np.abs(x) <= LIGHTGBM_ZERO_THRESHOLD))
+            go_left = x < threshold[nodes] if strict else x <= threshold[nodes]
+            go_left = np.where(missing, default_left[nodes], go_left)
+            nodes = np.where(is_split, np.where(go_left, left[nodes], right[nodes]), nodes)
+        return nodes
+
+    # ------------------------------------------------------------ persistence
+
+    def save(self, path):
+        """Write the model as a folder of raw .npy arrays plus meta.json, so it can be memory-mapped"""
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f)
+        for key, value in self.arrays.items():
+            np.save(os.path.join(path, key + '.npy'), np.ascontiguousarray(value), allow_pickle=False)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """Load a model written by save(); needs only NumPy. mmap_mode='r' maps the arrays read-only"""
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {
+            file_name[:-len('.npy')]: np.load(os.path.join(path, file_name), mmap_mode=mmap_mode, allow_pickle=False)
+            for file_name in sorted(os.listdir(path)) if file_name.endswith('.npy')
+        }
+        return cls(meta, arrays)
+
+
+# ---------------------------------------------------------------------- export
+# Everything below runs on fitted sklearn objects. It identifies them by their
+# fitted attributes rather than isinstance checks, so this module can be
+# imported (and CompiledModel loaded) without sklearn installed.
+
+def compile_pipeline(pipeline, feature_names=None):
+    """Compile a fitted pipeline (ColumnTransformer/scaler/encoder + linear or tree model)"""
+    steps = [step for _, step in pipeline.steps] if hasattr(pipeline, 'steps') else [pipeline]
+    estimator = steps[-1]
+
+    if feature_names is None:
+        feature_names = getattr(pipeline, 'feature_names_in_', None)
+        if feature_names is None:
+            # Fitted on a bare array: columns are positional
+            feature_names = [f"f{i}" for i in range(pipeline.n_features_in_)]
+    feature_names = [str(name) for name in feature_names]
+
+    arrays = {}
+    blocks = _compile_preprocessing(steps[:-1], feature_names, arrays)
+    model = _compile_estimator(estimator, arrays)
+    return CompiledModel({'feature_names': feature_names, 'blocks': blocks, 'model': model}, arrays)
+
+
+def _compile_preprocessing(steps, feature_names, arrays):
+    if not steps:
+        return _identity_blocks(len(feature_names), arrays)
+    if len(steps) != 1:
+        raise ValueError("Only a single preprocessing step is supported")
+
+    step = steps[0]
+    if not hasattr(step, 'transformers_'):
+        return [_compile_numeric(step, np.arange(len(feature_names)), arrays)]
+
+    fitted_names = [str(name) for name in step.feature_names_in_]
+    blocks = []
+    for _, transformer, columns in step.transformers_:
+        if isinstance(transformer, str) and transformer == 'drop' or len(columns) == 0:
+            continue
+        names = [fitted_names[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+        positions = np.array([feature_names.index(name) for name in names])
+        if isinstance(transformer, str) and transformer == 'passthrough':
+            transformer = None
+        blocks.append(_compile_numeric(transformer, positions, arrays)
+                      if not _has_onehot(transformer) else
+                      _compile_onehot(transformer, positions, arrays))
+    return blocks
+
+
+def _new_block(kind, arrays, width):
+    return {'kind': kind, 'key': f"b{sum(1 for k in arrays if k.endswith('_positions'))}", 'width': width}
+
+
+def _pipeline_steps(transformer):
+    if transformer is None:
+        return []
+    return [step for _, step in transformer.steps] if hasattr(transformer, 'steps') else [transformer]
+
+
+def _has_onehot(transformer):
+    return any(hasattr(step, 'categories_') for step in _pipeline_steps(transformer))
+
+
+def _compile_numeric(transformer, positions, arrays):
+    """Imputer (any fitted statistics_) followed by an optional StandardScaler"""
+    block = _new_block('numeric', arrays, len(positions))
+    key = block['key']
+    arrays[key + '_positions'] = np.asarray(positions, dtype=np.intp)
+    arrays[key + '_fill'] = np.full(len(positions), np.nan)
+
+    for step in _pipeline_steps(transformer):
+        if hasattr(step, 'statistics_'):
+            arrays[key + '_fill'] = np.asarray(step.statistics_, dtype=float)
+        elif hasattr(step, 'scale_') and hasattr(step, 'mean_'):
+            mean = step.mean_ if step.with_mean else np.zeros(len(positions))
+            scale = step.scale_ if step.with_std else np.ones(len(positions))
+            arrays[key + '_mean'] = np.asarray(mean, dtype=float)
+            arrays[key + '_scale'] = np.asarray(scale, dtype=float)
+        else:
+            raise ValueError(f"Unsupported numeric transformer: {type(step).__name__}")
+    return block
+
+
+def _compile_onehot(transformer, positions, arrays):
+    """Optional imputer followed by a OneHotEncoder over numeric-coded categories"""
+    block = _new_block('onehot', arrays, len(positions))
+    key = block['key']
+    arrays[key + '_positions'] = np.asarray(positions, dtype=np.intp)
+    arrays[key + '_fill'] = np.full(len(positions), np.nan)
+
+    for step in _pipeline_steps(transformer):
+        if hasattr(step, 'statistics_'):
+            arrays[key + '_fill'] = np.asarray(step.statistics_, dtype=float)
+        elif hasattr(step, 'categories_'):
+            if getattr(step, 'handle_unknown', 'error') == 'error':
+                raise ValueError("OneHotEncoder(handle_unknown='error') cannot be compiled")
+            try:
+                categories = [np.asarray(c, dtype=float) for c in step.categories_]
+            except (TypeError, ValueError):
+                raise ValueError("Only numeric-coded one-hot categories can be compiled")
+            drop_idx = getattr(step, 'drop_idx_', None)
+            keep = []
+            for j, cats in enumerate(categories):
+                mask = np.ones(len(cats), dtype=bool)
+                if drop_idx is not None and drop_idx[j] is not None:
+                    mask[int(drop_idx[j])] = False
+                keep.append(mask)
+            arrays[key + '_categories'] = np.concatenate(categories)
+            arrays[key + '_offsets'] = np.cumsum([0] + [len(c) for c in categories])
+            arrays[key + '_keep'] = np.concatenate(keep)
+        else:
+            raise ValueError(f"Unsupported categorical transformer: {type(step).__name__}")
+    return block
+
+
+def _compile_estimator(estimator, arrays):
+    arrays['classes'] = np.asarray(estimator.classes_)
+    name = type(estimator).__name__
+
+    if hasattr(estimator, 'coef_') and hasattr(estimator, 'intercept_'):
+        arrays['coef'] = np.atleast_2d(np.asarray(estimator.coef_, dtype=float))
+        arrays['intercept'] = np.atleast_1d(np.asarray(estimator.intercept_, dtype=float))
+        multi_class = getattr(estimator, 'multi_class', 'auto')
+        n_classes = len(estimator.classes_)
+        ovr = (multi_class in ('ovr', 'warn')
+               or n_classes <= 2 or getattr(estimator, 'solver', None) == 'liblinear')
+        return {'kind': 'linear', 'link': 'logistic' if ovr else 'softmax'}
+
+    if hasattr(estimator, 'tree_'):
+        trees = [(estimator.tree_, 1.0)]
+        model = {'kind': 'trees', 'aggregate': 'mean'}
+    elif name in ('RandomForestClassifier', 'ExtraTreesClassifier'):
+        trees = [(tree.tree_, 1.0) for tree in estimator.estimators_]
+        model = {'kind': 'trees', 'aggregate': 'mean'}
+    elif name == 'GradientBoostingClassifier':
+        if estimator.estimators_.shape[1] != 1:
+            raise ValueError("Only binary GradientBoostingClassifier can be compiled")
+        trees = [(stage[0].tree_, estimator.learning_rate) for stage in estimator.estimators_]
+        base = estimator._raw_predict_init(np.zeros((1, estimator.n_features_in_)))
+        model = {'kind': 'trees', 'aggregate': 'logit_sum', 'base_score': float(base[0, 0])}
+    else:
+        raise ValueError(f"Unsupported estimator: {name}")
+
+    model.update(_flatten_sklearn_trees(trees, arrays, normalize=(model['aggregate'] == 'mean')))
+    # sklearn trees compare float32 inputs against float64 thresholds, going left on <=
+    model.update({'input_dtype': 'float32', 'comparison': '<='})
+    return model
+
+
+def _flatten_sklearn_trees(trees, arrays, normalize):
+    """Concatenate sklearn Tree objects into one set of flat node arrays"""
+    flat = []
+    for tree, scale in trees:
+        value = tree.value[:, 0, :].astype(float)
+        if normalize:
+            # Same normalisation DecisionTreeClassifier.predict_proba applies
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            value = value / normalizer
+        else:
+            value = scale * value
+
+        missing_left = getattr(tree, 'missing_go_to_left', None)
+        flat.append({
+            'feature': tree.feature,
+            'threshold': tree.threshold,
+            'left': tree.children_left,
+            'right': tree.children_right,
+            'value': value,
+            'default_left': missing_left if missing_left is not None else np.ones(tree.node_count, dtype=bool),
+            'max_depth': int(tree.max_depth)
+        })
+    return _store_flat_trees(flat, arrays)
+
+
+def _store_flat_trees(trees, arrays):
+    """Write trees given as per-tree node arrays (children indexed within the tree, -1 for a leaf)"""
+    features, thresholds, lefts, rights, values, defaults, missing, roots = [], [], [], [], [], [], [], []
+    offset, max_depth = 0, 0
+
+    for tree in trees:
+        left = np.asarray(tree['left'], dtype=np.int64)
+        right = np.asarray(tree['right'], dtype=np.int64)
+        is_split = left >= 0
+        value = np.asarray(tree['value'], dtype=float)
+
+        roots.append(offset)
+        features.append(np.where(is_split, tree['feature'], 0))
+        thresholds.append(np.where(is_split, tree['threshold'], 0.0))
+        lefts.append(np.where(is_split, left + offset, -1))
+        rights.append(np.where(is_split, right + offset, -1))
+        values.append(value.reshape(len(left), -1))
+        defaults.append(np.asarray(tree['default_left'], dtype=bool))
+        missing.append(np.asarray(tree.get('missing_type', np.full(len(left), MISSING_NAN)), dtype=np.int8))
+        offset += len(left)
+        max_depth = max(max_depth, tree['max_depth'])
+
+    arrays['feature'] = np.concatenate(features).astype(np.intp)
+    arrays['threshold'] = np.concatenate(thresholds).astype(float)
+    arrays['left'] = np.concatenate(lefts).astype(np.intp)
+    arrays['right'] = np.concatenate(rights).astype(np.intp)
+    arrays['value'] = np.concatenate(values)
+    arrays['default_left'] = np.concatenate(defaults)
+    arrays['roots'] = np.asarray(roots, dtype=np.intp)
+    missing = np.concatenate(missing)
+    if (missing != MISSING_NAN).any():
+        arrays['missing_type'] = missing
+    return {'max_depth': max_depth}
+
+
+def _tree_depth(left, right):
+    """Depth of a tree given child index arrays, root at node 0"""
+    depth = np.zeros(len(left), dtype=np.intp)
+    for node in range(len(left)):
+        for child in (left[node], right[node]):
+            if child >= 0:
+                depth[child] = depth[node] + 1
+    return int(depth.max()) if len(depth) else 0
+
+
+def compile_xgboost(model, feature_names=None):
+    """Compile an XGBClassifier (or a binary:logistic Booster) into a CompiledModel.
+
+    Reads the booster's JSON model: XGBoost goes left on x < threshold with
+    float32 features, sends missing values along default_left and adds tree
+    outputs to a float32 margin, all of which the compiled model reproduces.
+    """
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+
+    objective = learner['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"Unsupported XGBoost objective: {objective}")
+    gbm = learner['gradient_booster']
+    if gbm['name'] != 'gbtree':
+        raise ValueError(f"Unsupported XGBoost booster: {gbm['name']}")
+
+    tree_dumps = gbm['model']['trees']
+    best_iteration = booster.attr('best_iteration')
+    if best_iteration is not None:
+        tree_dumps = tree_dumps[:int(best_iteration) + 1]
+
+    trees = []
+    for tree in tree_dumps:
+        if tree.get('categories_nodes'):
+            raise ValueError("Categorical XGBoost splits cannot be compiled")
+        left = np.asarray(tree['left_children'], dtype=np.int64)
+        right = np.asarray(tree['right_children'], dtype=np.int64)
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        trees.append({
+            'feature': np.asarray(tree['split_indices'], dtype=np.int64),
+            # float32 threshold widened to float64, compared against float32 inputs
+            'threshold': conditions.astype(float),
+            'left': left,
+            'right': right,
+            # A leaf's output is stored in split_conditions
+            'value': np.where(left < 0, conditions, 0.0).astype(float),
+            'default_left': np.asarray(tree['default_left'], dtype=bool),
+            'max_depth': _tree_depth(left, right)
+        })
+
+    n_features = int(learner['learner_model_param']['num_feature'])
+    if feature_names is None:
+        feature_names = booster.feature_names or [f"f{i}" for i in range(n_features)]
+
+    # base_score is a probability for binary:logistic; the margin starts at its logit
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    arrays = {'classes': np.asarray(getattr(model, 'classes_', [0, 1]))}
+    model_meta = {
+        'kind': 'trees', 'aggregate': 'logit_sum', 'accumulate': 'float32',
+        'base_score': float(np.float32(np.log(base_score / (1 - base_score)))),
+        'input_dtype': 'float32', 'comparison': '<'
+    }
+    model_meta.update(_store_flat_trees(trees, arrays))
+    return CompiledModel({'feature_names': list(feature_names), 'blocks': _identity_blocks(n_features, arrays),
+                          'model': model_meta}, arrays)
+
+
+LIGHTGBM_MISSING_TYPES = {'NaN': MISSING_NAN, 'None': MISSING_AS_ZERO, 'Zero': MISSING_ZERO}
+
+
+def compile_lightgbm(model, feature_names=None):
+    """Compile an LGBMClassifier (or a binary Booster) into a CompiledModel.
+
+    Walks the dump_model() tree structures: LightGBM goes left on x <= threshold
+    in float64 and applies each split's missing_type, which is kept per node.
+    """
+    booster = model.booster_ if hasattr(model, 'booster_') else model
+    best_iteration = booster.best_iteration if booster.best_iteration > 0 else None
+    dump = booster.dump_model(num_iteration=best_iteration)
+
+    objective = dump['objective'].split()
+    if objective[0] != 'binary' or dump['num_tree_per_iteration'] != 1:
+        raise ValueError(f"Unsupported LightGBM objective: {dump['objective']}")
+    if dump.get('average_output'):
+        raise ValueError("LightGBM random forest mode cannot be compiled")
+    sigmoid = float(next((p.split(':')[1] for p in objective[1:] if p.startswith('sigmoid:')), 1.0))
+
+    trees = []
+    for info in dump['tree_info']:
+        pending = [(info['tree_structure'], -1, False, 0)]
+        flat = {'feature': [], 'threshold': [], 'left': [], 'right': [], 'value': [],
+                'default_left': [], 'missing_type': [], 'max_depth': 0}
+        while pending:
+            node, parent, is_left, depth = pending.pop()
+            index = len(flat['feature'])
+            if parent >= 0:
+                flat['left' if is_left else 'right'][parent] = index
+            flat['max_depth'] = max(flat['max_depth'], depth)
+
+            if 'leaf_value' in node:
+                flat['feature'].append(0)
+                flat['threshold'].append(0.0)
+                flat['value'].append(node['leaf_value'])
+                flat['default_left'].append(True)
+                flat['missing_type'].append(MISSING_NAN)
+                flat['left'].append(-1)
+                flat['right'].append(-1)
+                continue
+
+            if node['decision_type'] != '<=':
+                raise ValueError("Categorical LightGBM splits cannot be compiled")
+            flat['feature'].append(node['split_feature'])
+            flat['threshold'].append(node['threshold'])
+            flat['value'].append(0.0)
+            flat['default_left'].append(node['default_left'])
+            flat['missing_type'].append(LIGHTGBM_MISSING_TYPES[node['missing_type']])
+            flat['left'].append(-1)
+            flat['right'].append(-1)
+            pending.append((node['right_child'], index, False, depth + 1))
+            pending.append((node['left_child'], index, True, depth + 1))
+        trees.append(flat)
+
+    if feature_names is None:
+        feature_names = dump['feature_names']
+    arrays = {'classes': np.asarray(getattr(model, 'classes_', [0, 1]))}
+    model_meta = {
+        'kind': 'trees', 'aggregate': 'logit_sum', 'base_score': 0.0, 'sigmoid': sigmoid,
+        'input_dtype': 'float64', 'comparison': '<='
+    }
+    model_meta.update(_store_flat_trees(trees, arrays))
+    return CompiledModel({'feature_names': list(feature_names), 'blocks': _identity_blocks(len(feature_names), arrays),
+                          'model': model_meta}, arrays)
+
+
+def _identity_blocks(n_features, arrays):
+    """Preprocessing that passes every column through unchanged"""
+    block = _new_block('numeric', arrays, n_features)
+    arrays[block['key'] + '_positions'] = np.arange(n_features)
+    arrays[block['key'] + '_fill'] = np.full(n_features, np.nan)
+    return [block]
+
+
+def compile_model(model, feature_names=None):
+    """Compile a sklearn pipeline/estimator, XGBoost or LightGBM model, whichever model is"""
+    if hasattr(model, 'get_booster') or hasattr(model, 'save_raw'):
+        return compile_xgboost(model, feature_names)
+    if hasattr(model, 'booster_') or hasattr(model, 'dump_model'):
+        return compile_lightgbm(model, feature_names)
+    return compile_pipeline(model, feature_names)
+
+
+def verify_compiled(compiled, pipeline, X, tolerance=None):
+    """Largest gap against pipeline.predict_proba on X; raises if above tolerance"""
+    if tolerance is None:
+        tolerance = FLOAT32_TOLERANCE if compiled.meta['model'].get('accumulate') == 'float32' else EXPORT_TOLERANCE
+    expected = pipeline.predict_proba(X)
+    actual = compiled.predict_proba(X)
+    gap = float(np.max(np.abs(expected - actual))) if len(expected) else 0.0
+    if gap > tolerance:
+        raise ValueError(f"Compiled model differs from predict_proba by {gap:.3e} (tolerance {tolerance:.0e})")
+    return gap
+
+
+def probe_matrix(models, n_samples, seed=42):
+    """Verification inputs for models without profile data (e.g. the raw FinAccess models).
+
+    Every column of a tree split is drawn from that split's thresholds, the
+    adjacent float64/float32 values on both sides, 0, 1 and NaN, so each
+    comparison and missing-value branch is exercised. Other columns are
+    standard normal.
+    """
+    n_features = len(models[0].meta['feature_names'])
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n_samples, n_features))
+
+    split_values = [[] for _ in range(n_features)]
+    for model in models:
+        a = model.arrays
+        if 'feature' not in a:
+            continue
+        is_split = a['left'] >= 0
+        for feature, threshold in zip(a['feature'][is_split], a['threshold'][is_split]):
+            split_values[feature].append(threshold)
+
+    for j, thresholds in enumerate(split_values):
+        if not thresholds:
+            continue
+        t = np.unique(thresholds)
+        t32 = t.astype(np.float32)
+        candidates = np.concatenate([
+            t, np.nextafter(t, np.inf), np.nextafter(t, -np.inf),
+            np.nextafter(t32, np.float32(np.inf)).astype(float),
+            np.nextafter(t32, np.float32(-np.inf)).astype(float),
+            [0.0, 1.0, np.nan]
+        ])
+        X[:, j] = rng.choice(candidates, n_samples)
+    return X
+
+
+def artifact_name(model_name):
+    """File-system friendly model name, e.g. 'Random Forest' -> 'random_forest'"""
+    return ''.join(ch if ch.isalnum() else '_' for ch in model_name.lower()).strip('_')
+
+
+def file_digest(path):
+    """SHA-256 of a file, used to tie compiled models to the pickle they came from"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def export_compiled_models(model_pipelines, output_folder, X_check, best_model_name=None, source_path=None):
+    """Compile every pipeline in a deployment bundle, verify it on X_check and write it out.
+
+    model_pipelines is the dict stored in investment_model_pipelines.pkl.
+    Writes one .npy folder per model plus a manifest.json that ArtifactStore
+    reads, and returns the gaps.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    manifest = {
+        'models': {},
+        'best_model_name': best_model_name,
+        'source_sha256': file_digest(source_path) if source_path else None
+    }
+    gaps = {}
+
+    for model_name, model_entry in model_pipelines.items():
+        pipeline = model_entry['pipeline']
+        compiled = model_entry.get('compiled') or compile_model(pipeline)
+        gaps[model_name] = verify_compiled(compiled, pipeline, model_entry.get('X_check', X_check))
+
+        file_name = artifact_name(model_name)
+        compiled.save(os.path.join(output_folder, file_name))
+        manifest['models'][model_name] = {
+            'file': file_name,
+            'format': 'compiled',
+            'info': {key: model_entry[key] for key in ('type', 'metrics') if key in model_entry},
+            'max_gap': gaps[model_name]
+        }
+        if model_entry.get('source'):
+            manifest['models'][model_name]['source_sha256'] = file_digest(model_entry['source'])
+
+    with open(os.path.join(output_folder, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return gaps
+
+
+if __name__ == "__main__":
+    import argparse
+    import joblib
+    import pandas as pd
+    from feature_builder import FeatureBuilder
+    from fast_inference import PARITY_PROFILES
+
+    parser = argparse.ArgumentParser(description="Compile trained models into NumPy-only models")
+    parser.add_argument("--pipelines", default=os.path.join("deployment", "investment_model_pipelines.pkl"))
+    parser.add_argument("--config", default=os.path.join("deployment", "investment_model_config.pkl"))
+    parser.add_argument("--models-dir", help="compile the standalone models in this folder (e.g. ../models) instead")
+    parser.add_argument("--output", help="defaults to deployment/compiled, or <models-dir>/compiled")
+    parser.add_argument("--samples", type=int, default=5000, help="rows used for verification")
+    args = parser.parse_args()
+
+    if args.models_dir:
+        # Standalone FinAccess models (XGBoost, LightGBM, sklearn); files that fail to load or compile are skipped
+        output = args.output or os.path.join(args.models_dir, "compiled")
+        bundle = {}
+        for file_name in sorted(os.listdir(args.models_dir)):
+            if not file_name.endswith("_model.pkl"):
+                continue
+            path = os.path.join(args.models_dir, file_name)
+            model_name = file_name[:-len("_model.pkl")]
+            try:
+                model = joblib.load(path)
+                bundle[model_name] = {'pipeline': model, 'compiled': compile_model(model), 'source': path}
+            except Exception as e:
+                print(f"❌ Skipping {file_name}: {str(e)}")
+
+        X_check = probe_matrix([entry['compiled'] for entry in bundle.values()], args.samples)
+        for entry in bundle.values():
+            if entry['compiled'].meta['model']['kind'] == 'linear':
+                # Linear models reject NaN; check them on the same rows with gaps filled
+                entry['X_check'] = np.nan_to_num(X_check)
+        gaps = export_compiled_models(bundle, output, X_check)
+
+    else:
+        output = args.output or os.path.join("deployment", "compiled")
+        bundle = joblib.load(args.pipelines)
+        config = joblib.load(args.config) if os.path.exists(args.config) else {}
+
+        # Verification set: the parity profiles plus random profiles across every category
+        rng = np.random.default_rng(42)
+        n = args.samples
+        profiles = pd.concat([pd.DataFrame(PARITY_PROFILES), pd.DataFrame({
+            'age': rng.integers(18, 90, n),
+            'monthly_income': rng.lognormal(10.5, 1.0, n).round(),
+            'monthly_expenses': rng.lognormal(10.0, 1.0, n).round(),
+            'current_savings': rng.lognormal(10.0, 2.0, n).round(),
+            'debt_amount': rng.choice([0.0, 10000.0, 150000.0], n),
+            'dependents': rng.integers(0, 6, n),
+            'household_size': rng.integers(1, 10, n),
+            'location': rng.choice(['Urban', 'Semi-Urban', 'Rural'], n),
+            'education': rng.choice(['Primary', 'Secondary', 'College/University', 'Postgraduate'], n),
+            'employment': rng.choice(['Employed', 'Self-Employed', 'Student', 'Retired', 'Unemployed'], n),
+            'emergency_fund': rng.choice(['Yes', 'No', 'Partial'], n),
+            'investment_experience': rng.choice(['Beginner', 'Intermediate', 'Advanced'], n),
+        })], ignore_index=True)
+
+        first_pipeline = next(iter(bundle.values()))['pipeline']
+        X_check = FeatureBuilder().build_frame(profiles, columns=list(first_pipeline.feature_names_in_))
+        gaps = export_compiled_models(bundle, output, X_check, config.get('best_model'), args.pipelines)
+
+    for model_name, gap in gaps.items():
+        print(f"✅ {model_name}: max |Δp| = {gap:.2e}")
+    print(f"🚀 Compiled models written to {output}")
@@ -0,0 +1,196 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+ENSEMBLE_CONFIG_FILE = "ensemble_config.json"
+ENSEMBLE_METHODS = ("weighted", "stacking")
+
+# Cheapest member, scored first; rows it is confident about skip the others
+DEFAULT_GATE_MODEL = "Logistic Regression"
+# max(p, 1 - p) at or above which the gate model's answer is used as-is
+DEFAULT_GATE_THRESHOLD = 0.9
+
+# Clip before taking logits for stacking
+PROBABILITY_EPSILON = 1e-7
+
+DEFAULT_CONFIG = {
+    "method": "weighted",
+    "weights": {},
+    "gate_model": DEFAULT_GATE_MODEL,
+    "gate_threshold": DEFAULT_GATE_THRESHOLD
+}
+
+
+def load_ensemble_config(source=None, deployment_folder="deployment"):
+    """Ensemble settings from a dict, a JSON file path, or deployment/ensemble_config.json"""
+    if isinstance(source, dict):
+        return {**DEFAULT_CONFIG, **source}
+
+    path = source or os.path.join(deployment_folder, ENSEMBLE_CONFIG_FILE)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return {**DEFAULT_CONFIG, **json.load(f)}
+    return dict(DEFAULT_CONFIG)
+
+
+def _positive_proba(model, X):
+    prediction_proba = model.predict_proba(X)
+    column = 1 if prediction_proba.shape[1] > 1 else 0
+    return np.asarray(prediction_proba[:, column], dtype=float)
+
+
+def _logit(p):
+    p = np.clip(p, PROBABILITY_EPSILON, 1 - PROBABILITY_EPSILON)
+    return np.log(p / (1 - p))
+
+
+def fit_stacking(member_probabilities, y, iterations=25, l2=1e-3):
+    """Fit stacking weights (logistic regression on member logits) with Newton steps.
+
+    member_probabilities maps model name -> positive-class probabilities on
+    a held-out set, y holds the 0/1 labels. Returns the "stacking" section
+    of an ensemble config.
+    """
+    names = list(member_probabilities)
+    X = np.column_stack([np.ones(len(y))] + [_logit(np.asarray(member_probabilities[name], dtype=float))
+                                            for name in names])
+    y = np.asarray(y, dtype=float)
+    beta = np.zeros(X.shape[1])
+    penalty = l2 * np.eye(X.shape[1])
+    penalty[0, 0] = 0.0
+
+    for _ in range(iterations):
+        p = 1.0 / (1.0 + np.exp(-(X @ beta)))
+        gradient = X.T @ (p - y) + penalty @ beta
+        hessian = (X * (p * (1 - p))[:, None]).T @ X + penalty
+        step = np.linalg.solve(hessian, gradient)
+        beta -= step
+        if np.max(np.abs(step)) < 1e-10:
+            break
+
+    return {"intercept": float(beta[0]), "coefficients": dict(zip(names, map(float, beta[1:])))}
+
+
+class ModelEnsemble:
+    """Blends the positive-class probabilities of several loaded models.
+
+    method="weighted" averages member probabilities with the configured
+    weights (missing weights count as 1). method="stacking" applies a
+    logistic regression to the member logits (see fit_stacking).
+
+    If gate_model is one of the members it is scored first on every row;
+    rows where it is at least gate_threshold confident return its
+    probability directly, and only the remaining borderline rows are
+    scored by the other members, in parallel on a thread pool. Members
+    are looked up in model_pipelines when first needed, so with lazily
+    loaded pipelines the expensive models are not even loaded until a
+    borderline row comes in.
+    """
+
+    def __init__(self, model_pipelines, members=None, method="weighted", weights=None, stacking=None,
+                 gate_model=DEFAULT_GATE_MODEL, gate_threshold=DEFAULT_GATE_THRESHOLD, max_workers=None):
+        if method not in ENSEMBLE_METHODS:
+            raise ValueError(f"Unknown ensemble method '{method}', expected one of {ENSEMBLE_METHODS}")
+
+        self.model_pipelines = model_pipelines
+        self.members = list(members or model_pipelines.keys())
+        missing = [name for name in self.members if name not in model_pipelines]
+        if missing:
+            raise ValueError(f"Ensemble members not loaded: {missing}")
+        if not self.members:
+            raise ValueError("Ensemble has no members")
+
+        self.method = method
+        self.weights = {name: float((weights or {}).get(name, 1.0)) for name in self.members}
+        if method == "stacking":
+            if not stacking:
+                raise ValueError("Stacking ensemble needs 'stacking' coefficients (see fit_stacking)")
+            self.intercept = float(stacking.get("intercept", 0.0))
+            self.coefficients = {name: float(stacking["coefficients"].get(name, 0.0)) for name in self.members}
+
+        self.gate_model = gate_model if gate_model in self.members else None
+        self.gate_threshold = gate_threshold
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or len(self.members),
+                                            thread_name_prefix="ensemble")
+        # Rows answered by the gate model alone vs by the full ensemble, counted from many inference threads
+        self.gated_rows = 0
+        self.blended_rows = 0
+        self._counts_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, model_pipelines, config):
+        return cls(
+            model_pipelines,
+            members=config.get("members"),
+            method=config.get("method", "weighted"),
+            weights=config.get("weights"),
+            stacking=config.get("stacking"),
+            gate_model=config.get("gate_model"),
+            gate_threshold=config.get("gate_threshold", DEFAULT_GATE_THRESHOLD)
+        )
+
+    def member_probabilities(self, X, members=None):
+        """{model name: positive-class probabilities}, members scored in parallel"""
+        members = list(members or self.members)
+        try:
+            futures = {name: self._executor.submit(_positive_proba, self.model_pipelines[name]['pipeline'], X)
+                       for name in members}
+        except RuntimeError:
+            # Shut down (replaced by a reload) while this call was in flight: score inline
+            return {name: _positive_proba(self.model_pipelines[name]['pipeline'], X) for name in members}
+        return {name: future.result() for name, future in futures.items()}
+
+    def blend(self, probabilities):
+        """Combine member probabilities according to the ensemble method"""
+        if self.method == "stacking":
+            z = self.intercept + sum(self.coefficients[name] * _logit(p) for name, p in probabilities.items())
+            return 1.0 / (1.0 + np.exp(-z))
+
+        total_weight = sum(self.weights[name] for name in probabilities)
+        return sum(self.weights[name] * p for name, p in probabilities.items()) / total_weight
+
+    def predict_proba(self, X):
+        """Positive-class probability for each row of X (a 1-D array)"""
+        if self.gate_model is None:
+            self._count(0, len(X))
+            return self.blend(self.member_probabilities(X))
+
+        gate_proba = _positive_proba(self.model_pipelines[self.gate_model]['pipeline'], X)
+        borderline = np.flatnonzero(np.maximum(gate_proba, 1 - gate_proba) < self.gate_threshold)
+        self._count(len(X) - len(borderline), len(borderline))
+        if len(borderline) == 0:
+            return gate_proba
+
+        rows = X.iloc[borderline] if hasattr(X, 'iloc') else X[borderline]
+        others = [name for name in self.members if name != self.gate_model]
+        probabilities = self.member_probabilities(rows, others)
+        probabilities[self.gate_model] = gate_proba[borderline]
+
+        result = gate_proba.copy()
+        result[borderline] = self.blend({name: probabilities[name] for name in self.members})
+        return result
+
+    def _count(self, gated, blended):
+        with self._counts_lock:
+            self.gated_rows += gated
+            self.blended_rows += blended
+
+    def shutdown(self, wait=False):
+        """Stop the member thread pool; calls already running finish"""
+        self._executor.shutdown(wait=wait)
+
+    def describe(self):
+        with self._counts_lock:
+            gated_rows, blended_rows = self.gated_rows, self.blended_rows
+        return {
+            'method': self.method,
+            'members': self.members,
+            'weights': self.weights if self.method == "weighted" else None,
+            'gate_model': self.gate_model,
+            'gate_threshold': self.gate_threshold if self.gate_model else None,
+            'gated_rows': gated_rows,
+            'blended_rows': blended_rows
+        }
@@ -0,0 +1,198 @@
+import operator
+import threading
+import numpy as np
+from feature_builder import MODEL_FEATURES
+
+
+# Profiles covering every branch of the feature mapping, used to check the
+# fast path against the DataFrame path when a model is loaded
+PARITY_PROFILES = [
+    {'age': 24, 'location': 'Urban', 'education': 'College/University', 'employment': 'Employed',
+     'household_size': 2, 'monthly_income': 120000, 'monthly_expenses': 60000, 'current_savings': 300000,
+     'debt_amount': 20000, 'dependents': 0, 'emergency_fund': 'Yes', 'risk_tolerance': 'High',
+     'investment_horizon': 'Long-term (5+ years)', 'investment_experience': 'Advanced'},
+    {'age': 38, 'location': 'Semi-Urban', 'education': 'Secondary', 'employment': 'Self-Employed',
+     'household_size': 5, 'monthly_income': 45000, 'monthly_expenses': 30000, 'current_savings': 40000,
+     'debt_amount': 0, 'dependents': 3, 'emergency_fund': 'Partial', 'risk_tolerance': 'Medium',
+     'investment_horizon': 'Medium-term (2-5 years)', 'investment_experience': 'Intermediate'},
+    {'age': 61, 'location': 'Rural', 'education': 'Primary', 'employment': 'Retired',
+     'household_size': 1, 'monthly_income': 18000, 'monthly_expenses': 15000, 'current_savings': 5000,
+     'debt_amount': 50000, 'dependents': 0, 'emergency_fund': 'No', 'risk_tolerance': 'Low',
+     'investment_horizon': 'Short-term (< 2 years)', 'investment_experience': 'Beginner'},
+    {'age': 50, 'location': 'Urban', 'education': 'Postgraduate', 'employment': 'Unemployed',
+     'household_size': 4, 'monthly_income': 0, 'monthly_expenses': 10000, 'current_savings': 0,
+     'debt_amount': 0, 'dependents': 2, 'emergency_fund': 'No', 'risk_tolerance': 'Low',
+     'investment_horizon': 'Medium-term (2-5 years)', 'investment_experience': 'Beginner'},
+]
+
+
+def _sklearn_class(transformer):
+    """Class name of a scikit-learn transformer, without importing sklearn here"""
+    cls = type(transformer)
+    return cls.__name__ if cls.__module__.startswith('sklearn.') else None
+
+
+def _compile_transformer(transformer, n_features, dtype):
+    """A plain-array function applying a fitted transformer's statistics, or None for passthrough.
+
+    sklearn's own transform() re-validates every call and warns when the
+    columns it was fitted on by name arrive as a bare array. The fitted
+    statistics are applied directly instead, so nothing is checked per row;
+    the column count is checked here, once. Raises ValueError for anything
+    else.
+    """
+    if transformer is None or (isinstance(transformer, str) and transformer == 'passthrough'):
+        return None
+
+    kind = _sklearn_class(transformer)
+    if kind == 'Pipeline':
+        funcs = [_compile_transformer(step, n_features, dtype) for _, step in transformer.steps]
+        funcs = [func for func in funcs if func is not None]
+
+        def apply(X):
+            for func in funcs:
+                X = func(X)
+            return X
+        return apply
+
+    if n_features is not None and getattr(transformer, 'n_features_in_', n_features) != n_features:
+        raise ValueError(f"{kind or type(transformer).__name__} was fitted on "
+                         f"{transformer.n_features_in_} columns, not {n_features}")
+
+    if kind == 'SimpleImputer':
+        statistics = np.asarray(transformer.statistics_)
+        missing = transformer.missing_values
+        if (statistics.dtype.kind not in 'fiu' or transformer.add_indicator
+                or not (isinstance(missing, float) and np.isnan(missing))):
+            raise ValueError("Only NaN imputation of numeric columns is supported")
+        statistics = statistics.astype(dtype)
+        if np.isnan(statistics).any():
+            raise ValueError("SimpleImputer drops all-missing columns; not supported")
+
+        def apply(X):
+            return np.where(np.isnan(X), statistics, X)
+        return apply
+
+    if kind == 'StandardScaler':
+        mean, scale = transformer.mean_, transformer.scale_
+
+        # In place on a copy, as StandardScaler does: float64 statistics, rounded to the row's dtype
+        def apply(X):
+            X = X.copy()
+            if mean is not None:
+                X -= mean
+            if scale is not None:
+                X /= scale
+            return X
+        return apply
+
+    raise ValueError(f"Unsupported transformer: {type(transformer).__name__}")
+
+
+class FastRowScorer:
+    """Single-profile scorer that skips the pandas round-trip.
+
+    Each thread keeps a preallocated row buffer in a fixed feature
+    order. A profile is written into it in place and pushed through the
+    fitted pipeline step by step as plain arrays. The ColumnTransformer's
+    name-based column selection is resolved to buffer positions once, here,
+    against its feature_names_in_, and the imputer/scaler steps are applied
+    from their fitted statistics; that one-time check is what makes it safe
+    to skip sklearn's per-call DataFrame, validation and feature-name
+    handling.
+
+    float32 halves the buffer and matches what sklearn trees compare in, but
+    a float32 scaler step can move a value across a split threshold; pass
+    dtype=np.float64 for models where check_parity shows that happening.
+
+    Raises ValueError for pipeline layouts it cannot unroll; callers should
+    keep using the DataFrame path in that case.
+    """
+
+    def __init__(self, pipeline, feature_builder, feature_names=None, dtype=np.float32):
+        self.feature_names = list(feature_names) if feature_names is not None else list(MODEL_FEATURES)
+        self.feature_builder = feature_builder
+        self.dtype = np.dtype(dtype)
+        self._local = threading.local()
+
+        unknown = [name for name in self.feature_names if name not in MODEL_FEATURES]
+        if unknown:
+            raise ValueError(f"No feature mapping for: {unknown}")
+
+        # Pick the mapped features straight out of FeatureBuilder.row_values
+        self._take = operator.itemgetter(*[MODEL_FEATURES.index(name) for name in self.feature_names])
+
+        steps = [step for _, step in pipeline.steps] if hasattr(pipeline, 'steps') else [pipeline]
+        self.estimator = steps[-1]
+        if not hasattr(self.estimator, 'predict_proba'):
+            raise ValueError("Final estimator has no predict_proba")
+        self.transforms = [self._resolve_step(step, first=(i == 0)) for i, step in enumerate(steps[:-1])]
+
+        # A bare model fitted on named columns (e.g. a CompiledModel) takes them in its own order
+        if not self.transforms and hasattr(self.estimator, 'feature_names_in_'):
+            fitted_names = list(self.estimator.feature_names_in_)
+            missing = [name for name in fitted_names if name not in self.feature_names]
+            if missing:
+                raise ValueError(f"Model expects features the row buffer does not have: {missing}")
+            positions = np.array([self.feature_names.index(name) for name in fitted_names], dtype=np.intp)
+            self.transforms = [[(None, positions)]]
+
+    def _resolve_step(self, step, first):
+        """Turn a pipeline step into (transformer, positions) blocks over the row"""
+        if not hasattr(step, 'transformers_'):
+            if first and list(getattr(step, 'feature_names_in_', self.feature_names)) != self.feature_names:
+                raise ValueError("First step was fitted on a different column order")
+            n_features = len(self.feature_names) if first else getattr(step, 'n_features_in_', None)
+            return [(_compile_transformer(step, n_features, self.dtype), None)]
+
+        if not first:
+            raise ValueError("ColumnTransformer is only supported as the first step")
+        if getattr(step, 'sparse_output_', False):
+            raise ValueError("Sparse ColumnTransformer output is not supported")
+
+        fitted_names = list(step.feature_names_in_)
+        missing = [name for name in fitted_names if name not in self.feature_names]
+        if missing:
+            raise ValueError(f"Model expects features the row buffer does not have: {missing}")
+
+        blocks = []
+        for _, transformer, columns in step.transformers_:
+            if transformer == 'drop' or len(columns) == 0:
+                continue
+            names = [fitted_names[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+            if not all(isinstance(name, str) for name in names):
+                raise ValueError(f"Unsupported column selector: {columns}")
+            positions = np.array([self.feature_names.index(name) for name in names], dtype=np.intp)
+            blocks.append((_compile_transformer(transformer, len(positions), self.dtype), positions))
+        return blocks
+
+    def _row_buffer(self):
+        row = getattr(self._local, 'row', None)
+        if row is None:
+            row = self._local.row = np.zeros((1, len(self.feature_names)), dtype=self.dtype)
+        return row
+
+    def predict_proba(self, user_data):
+        """Probability array (1, n_classes) for one profile"""
+        row = self._row_buffer()
+        row[0] = self._take(self.feature_builder.row_values(user_data))
+
+        X = row
+        for blocks in self.transforms:
+            parts = []
+            for transformer, positions in blocks:
+                block = X if positions is None else X[:, positions]
+                parts.append(block if transformer is None else transformer(block))
+            X = parts[0] if len(parts) == 1 else np.hstack(parts)
+
+        return self.estimator.predict_proba(X)
+
+    def check_parity(self, reference, profiles=None):
+        """Largest absolute gap between this scorer and reference(user_data) over profiles"""
+        profiles = PARITY_PROFILES if profiles is None else profiles
+        worst = 0.0
+        for user_data in profiles:
+            expected = np.asarray(reference(user_data), dtype=float)
+            actual = self.predict_proba(user_data).astype(float)
+            worst = max(worst, float(np.max(np.abs(expected - actual))))
+        return worst
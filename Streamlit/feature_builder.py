@@ -0,0 +1,272 @@
+import numpy as np
+import pandas as pd
+from collections.abc import Mapping
+
+
+# Every feature produced by InvestmentRecommendationSystem._map_user_data_to_model_features,
+# in the same order the scalar path builds them
+MODEL_FEATURES = [
+    'age', 'monthly_income', 'monthly_expenses', 'current_savings', 'debt_amount',
+    'dependents', 'household_size', 'education_level_encoded', 'location_type_encoded',
+    'savings_usage', 'formal_service_use', 'mobile_banking', 'risk_score',
+    'investment_capacity', 'financial_stability'
+]
+
+# Fields copied straight from the profile; absent values become 0 (as _add_missing_features does)
+DIRECT_FEATURES = [
+    'age', 'monthly_income', 'monthly_expenses', 'current_savings',
+    'debt_amount', 'dependents', 'household_size'
+]
+
+# Ordinal encodings as lookup arrays. The trailing element is the value for
+# anything outside the category list, so an index of -1 lands on it.
+EDUCATION_LEVELS = ['Primary', 'Secondary', 'College/University', 'Postgraduate']
+EDUCATION_CODES = np.array([0, 1, 2, 3, 1], dtype=float)
+
+LOCATION_TYPES = ['Rural', 'Semi-Urban', 'Urban']
+LOCATION_CODES = np.array([0, 1, 2, 2], dtype=float)
+LOCATION_MOBILE_POINTS = np.array([0.0, 0.2, 0.2, 0.0])
+
+EMPLOYMENT_TYPES = ['Employed', 'Self-Employed']
+EMPLOYMENT_SERVICE_POINTS = np.array([0.3, 0.3, 0.0])
+EMPLOYMENT_STABILITY_POINTS = np.array([0.3, 0.2, 0.0])
+
+EMERGENCY_FUND_TYPES = ['Yes', 'Partial']
+EMERGENCY_FUND_POINTS = np.array([0.3, 0.15, 0.0])
+
+# Same encodings as plain dicts, for the single-profile path
+EDUCATION_ENCODING = dict(zip(EDUCATION_LEVELS, EDUCATION_CODES.tolist()))
+LOCATION_ENCODING = dict(zip(LOCATION_TYPES, LOCATION_CODES.tolist()))
+
+
+def present_fields(user_data):
+    """The profile without its None fields, which count as absent everywhere; unchanged if it has none"""
+    if None in user_data.values():
+        return {key: value for key, value in user_data.items() if value is not None}
+    return user_data
+
+
+class FeatureBuilder:
+    """Build the model feature matrix for many profiles at once.
+
+    Column-wise equivalent of row_values (which the engine's
+    _map_user_data_to_model_features uses) plus _add_missing_features. Accepts a DataFrame, a mapping of field name to
+    array, or a list of profile dicts; missing fields and NaN/None values are
+    treated the same way the scalar path treats an absent key.
+    """
+
+    def __init__(self, columns=None):
+        self.columns = list(columns) if columns is not None else list(MODEL_FEATURES)
+        unknown = [c for c in self.columns if c not in MODEL_FEATURES]
+        if unknown:
+            raise ValueError(f"Unknown model features: {unknown}")
+
+    def build(self, profiles, columns=None):
+        """Return an (n_profiles, n_columns) float64 matrix in column order"""
+        columns = self.columns if columns is None else list(columns)
+        features = self._compute(self._as_columns(profiles))
+        if not columns:
+            return np.empty((len(features['age']), 0))
+        return np.column_stack([features[name] for name in columns])
+
+    def build_frame(self, profiles, columns=None):
+        """Same as build(), wrapped in a DataFrame with the feature names"""
+        columns = self.columns if columns is None else list(columns)
+        return pd.DataFrame(self.build(profiles, columns), columns=columns)
+
+    def row_values(self, user_data):
+        """Features for a single profile as a tuple in MODEL_FEATURES order.
+
+        Scalar counterpart of build() for one-row inference: no dicts or
+        DataFrames are created. None fields count as absent, as in build().
+        Raises on malformed values (e.g. a text income) so callers can fall
+        back to the reference mapping.
+        """
+        get = present_fields(user_data).get
+        age = get('age', 30)
+        income = get('monthly_income', 30000)
+        expenses = get('monthly_expenses', 20000)
+        savings = get('current_savings', 0)
+        debt = get('debt_amount', 0)
+        location = get('location', 'Urban')
+        employment = get('employment', 'Employed')
+        experience = get('investment_experience', 'Beginner')
+
+        savings_usage = min(1.0, savings / (income * 6)) if income > 0 else 0.0
+
+        formal = 0
+        if 'Advanced' in experience:
+            formal += 0.4
+        elif 'Intermediate' in experience:
+            formal += 0.2
+        if employment in EMPLOYMENT_TYPES:
+            formal += 0.3
+        if income > 50000:
+            formal += 0.3
+
+        mobile = 0.5
+        if age < 45:
+            mobile += 0.3
+        if location == 'Urban' or location == 'Semi-Urban':
+            mobile += 0.2
+        if income > 30000:
+            mobile += 0.2
+
+        risk = 0.3
+        if age < 35:
+            risk += 0.3
+        elif age > 55:
+            risk -= 0.2
+        if income > 100000:
+            risk += 0.2
+        elif income < 25000:
+            risk -= 0.1
+        if 'Advanced' in experience:
+            risk += 0.3
+        elif 'Beginner' in experience:
+            risk -= 0.2
+
+        if income > 0:
+            capacity = ((income - expenses) / income) * (1 - debt / income)
+        else:
+            capacity = 0
+
+        stability_employment = get('employment', 'Unemployed')
+        emergency_fund = get('emergency_fund', 'No')
+        stability = 0.2
+        if stability_employment == 'Employed':
+            stability += 0.3
+        elif stability_employment == 'Self-Employed':
+            stability += 0.2
+        if emergency_fund == 'Yes':
+            stability += 0.3
+        elif emergency_fund == 'Partial':
+            stability += 0.15
+        if income > 0:
+            stability += min(0.2, (savings / income) * 0.05)
+
+        return (
+            # Direct features: absent fields are 0, as in _add_missing_features
+            get('age', 0),
+            get('monthly_income', 0),
+            get('monthly_expenses', 0),
+            get('current_savings', 0),
+            get('debt_amount', 0),
+            get('dependents', 0),
+            get('household_size', 0),
+            EDUCATION_ENCODING.get(get('education', 'Secondary'), 1),
+            LOCATION_ENCODING.get(location, 2),
+            savings_usage,
+            min(1.0, formal),
+            min(1.0, mobile),
+            max(0.0, min(1.0, risk)),
+            max(0.0, min(1.0, capacity)),
+            max(0.0, min(1.0, stability)),
+        )
+
+    def _as_columns(self, profiles):
+        if isinstance(profiles, (pd.DataFrame, Mapping)):
+            return profiles
+        return pd.DataFrame(list(profiles))
+
+    def _length(self, profiles):
+        if isinstance(profiles, pd.DataFrame):
+            return len(profiles)
+        return len(next(iter(profiles.values()))) if profiles else 0
+
+    def _numeric(self, profiles, field, default):
+        """Numeric column as float64, with absent values replaced by default"""
+        if field not in profiles:
+            return np.full(self._length(profiles), default, dtype=float)
+        values = np.array(profiles[field], dtype=float)
+        values[np.isnan(values)] = default
+        return values
+
+    def _factorize(self, profiles, field, default):
+        """Integer codes plus distinct values for a column; code -1 means absent"""
+        if field not in profiles:
+            return np.full(self._length(profiles), -1, dtype=np.intp), [default]
+        values = profiles[field]
+        if not hasattr(values, 'dtype'):
+            values = np.asarray(values, dtype=object)
+        codes, uniques = pd.factorize(values)
+        # Absent values are coded -1, which indexes the trailing default
+        return codes, [*uniques, default]
+
+    def _category_index(self, profiles, field, categories, default):
+        """Index of each profile's value in categories, or -1 when it is not one of them"""
+        codes, uniques = self._factorize(profiles, field, default)
+        positions = {category: i for i, category in enumerate(categories)}
+        return np.array([positions.get(value, -1) for value in uniques], dtype=np.intp)[codes]
+
+    def _substring_flags(self, profiles, field, default, substrings):
+        """One boolean array per substring: does the profile's value contain it"""
+        codes, uniques = self._factorize(profiles, field, default)
+        uniques = [str(value) for value in uniques]
+        return [np.array([substring in value for value in uniques], dtype=bool)[codes]
+                for substring in substrings]
+
+    def _compute(self, profiles):
+        features = {}
+
+        # Direct mappings (absent values are filled with 0 by _add_missing_features)
+        for field in DIRECT_FEATURES:
+            features[field] = self._numeric(profiles, field, 0)
+
+        age = self._numeric(profiles, 'age', 30)
+        income = self._numeric(profiles, 'monthly_income', 30000)
+        expenses = self._numeric(profiles, 'monthly_expenses', 20000)
+        savings = self._numeric(profiles, 'current_savings', 0)
+        debt = self._numeric(profiles, 'debt_amount', 0)
+
+        location_codes = self._category_index(profiles, 'location', LOCATION_TYPES, 'Urban')
+        employment_codes = self._category_index(profiles, 'employment', EMPLOYMENT_TYPES, 'Employed')
+        # Financial stability defaults a missing employment to 'Unemployed' (as row_values does)
+        stability_employment_codes = self._category_index(profiles, 'employment', EMPLOYMENT_TYPES, 'Unemployed')
+        emergency_codes = self._category_index(profiles, 'emergency_fund', EMERGENCY_FUND_TYPES, 'No')
+        education_codes = self._category_index(profiles, 'education', EDUCATION_LEVELS, 'Secondary')
+        advanced, intermediate, beginner = self._substring_flags(
+            profiles, 'investment_experience', 'Beginner', ['Advanced', 'Intermediate', 'Beginner'])
+
+        positive_income = income > 0
+        safe_income = np.where(positive_income, income, 1.0)
+
+        features['education_level_encoded'] = EDUCATION_CODES[education_codes]
+        features['location_type_encoded'] = LOCATION_CODES[location_codes]
+
+        # Savings usage: months of savings relative to six months of income
+        features['savings_usage'] = np.where(
+            positive_income, np.minimum(1.0, savings / (safe_income * 6)), 0.0)
+
+        # Formal service use
+        formal = 0 + np.select([advanced, intermediate], [0.4, 0.2], default=0.0)
+        formal = formal + EMPLOYMENT_SERVICE_POINTS[employment_codes]
+        formal = formal + np.where(income > 50000, 0.3, 0.0)
+        features['formal_service_use'] = np.minimum(1.0, formal)
+
+        # Mobile banking usage
+        mobile = 0.5 + np.where(age < 45, 0.3, 0.0)
+        mobile = mobile + LOCATION_MOBILE_POINTS[location_codes]
+        mobile = mobile + np.where(income > 30000, 0.2, 0.0)
+        features['mobile_banking'] = np.minimum(1.0, mobile)
+
+        # Risk score (_calculate_risk_score)
+        risk = 0.3 + np.select([age < 35, age > 55], [0.3, -0.2], default=0.0)
+        risk = risk + np.select([income > 100000, income < 25000], [0.2, -0.1], default=0.0)
+        risk = risk + np.select([advanced, beginner], [0.3, -0.2], default=0.0)
+        features['risk_score'] = np.clip(risk, 0.0, 1.0)
+
+        # Investment capacity (_calculate_investment_capacity)
+        debt_to_income = np.where(positive_income, debt / safe_income, 1)
+        capacity = np.where(positive_income, (income - expenses) / safe_income, 0)
+        capacity = capacity * (1 - debt_to_income)
+        features['investment_capacity'] = np.clip(capacity, 0.0, 1.0)
+
+        # Financial stability (_calculate_financial_stability)
+        stability = 0.2 + EMPLOYMENT_STABILITY_POINTS[stability_employment_codes]
+        stability = stability + EMERGENCY_FUND_POINTS[emergency_codes]
+        stability = stability + np.where(
+            positive_income, np.minimum(0.2, (savings / safe_income) * 0.05), 0.0)
+        features['financial_stability'] = np.clip(stability, 0.0, 1.0)
+
+        return features
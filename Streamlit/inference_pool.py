@@ -0,0 +1,124 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from request_profiler import profile_call
+
+
+POOL_KINDS = ("thread", "process")
+DEFAULT_KIND = "thread"
+DEFAULT_MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+# Requests allowed queued or running at once, per worker, before new ones are refused
+DEFAULT_QUEUE_PER_WORKER = 8
+
+# Engine built in each worker process by a process pool
+_worker_engine = None
+
+
+class PoolSaturated(Exception):
+    """Raised instead of queueing when the inference pool is at max_pending"""
+
+
+def _init_worker_engine(engine_class, engine_kwargs):
+    global _worker_engine
+    _worker_engine = engine_class(**engine_kwargs)
+
+
+def _call_worker_engine(method, *args, **kwargs):
+    return getattr(_worker_engine, method)(*args, **kwargs)
+
+
+class InferencePool:
+    """Runs engine calls off the event loop, with a bounded backlog.
+
+    kind="thread" calls methods on the given engine from a thread pool,
+    sharing its loaded models and cache. kind="process" builds one engine
+    per worker process (type(engine)(**engine_kwargs)), so CPU-bound
+    scoring does not hold the server's GIL; arguments and results are
+    pickled across.
+
+    At most max_pending calls are queued or running at once. run() raises
+    PoolSaturated rather than queueing past that, so callers can answer
+    503 immediately instead of letting latency grow without bound. run()
+    and the counters are only used from the event loop thread.
+    """
+
+    def __init__(self, engine, kind=DEFAULT_KIND, max_workers=DEFAULT_MAX_WORKERS, max_pending=None,
+                 engine_kwargs=None):
+        if kind not in POOL_KINDS:
+            raise ValueError(f"Unknown pool kind '{kind}', expected one of {POOL_KINDS}")
+
+        self.engine = engine
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending or max_workers * DEFAULT_QUEUE_PER_WORKER
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+        if kind == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker_engine,
+                initargs=(type(engine), engine_kwargs or {})
+            )
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+
+    @property
+    def saturated(self):
+        return self.pending >= self.max_pending
+
+    async def run(self, method, *args, **kwargs):
+        """Await engine.<method>(*args, **kwargs) on a worker; raises PoolSaturated when full"""
+        if self.kind == "process":
+            call = functools.partial(_call_worker_engine, method, *args, **kwargs)
+        else:
+            call = functools.partial(getattr(self.engine, method), *args, **kwargs)
+        return await self._submit(call)
+
+    async def run_profiled(self, interval_ms, method, *args, **kwargs):
+        """Like run(), sampling the worker's stack every interval_ms: (result, profile)"""
+        # The profiler runs inside the worker (thread or process) that does the work
+        if self.kind == "process":
+            call = functools.partial(profile_call, interval_ms, _call_worker_engine, method, *args, **kwargs)
+        else:
+            call = functools.partial(profile_call, interval_ms, getattr(self.engine, method), *args, **kwargs)
+        return await self._submit(call)
+
+    async def _submit(self, call):
+        if self.saturated:
+            self.rejected += 1
+            raise PoolSaturated(f"Inference pool is full ({self.pending}/{self.max_pending} pending)")
+
+        loop = asyncio.get_running_loop()
+        future = self._executor.submit(call)
+        self.pending += 1
+        # Counted down when the work itself finishes, even if the awaiting request went away
+        future.add_done_callback(lambda _: self._finished_threadsafe(loop))
+        return await asyncio.wrap_future(future)
+
+    def _finished_threadsafe(self, loop):
+        try:
+            loop.call_soon_threadsafe(self._finished)
+        except RuntimeError:
+            # Event loop already closed (server shutting down)
+            pass
+
+    def _finished(self):
+        self.pending -= 1
+        self.completed += 1
+
+    def stats(self):
+        return {
+            'kind': self.kind,
+            'max_workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'pending': self.pending,
+            'completed': self.completed,
+            'rejected': self.rejected
+        }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,59 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Overridden by the LOG_LEVEL environment variable (DEBUG shows per-request detail)
+DEFAULT_LEVEL = "INFO"
+
+_listener = None
+
+
+def configure_logging(level=None, stream=None, fmt=LOG_FORMAT):
+    """Route all logging through a queue to one background writer thread.
+
+    The root logger gets a single QueueHandler, so a request thread that
+    logs only puts the record on an in-memory queue; the QueueListener
+    thread does the writing to stream (stderr by default). Records below
+    level are dropped before any message formatting happens, which keeps
+    the per-request DEBUG calls in the engine free at INFO.
+
+    Safe to call more than once: later calls only change the level.
+    Returns the root logger.
+    """
+    global _listener
+
+    level = level or os.environ.get("LOG_LEVEL", DEFAULT_LEVEL)
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _listener is not None:
+        return root
+
+    log_queue = queue.SimpleQueue()
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(logging.Formatter(fmt))
+
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    # Flush whatever is still queued when the process exits
+    atexit.register(stop_logging)
+    return root
+
+
+def stop_logging():
+    """Stop the background writer after draining the queue"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
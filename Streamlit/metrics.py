@@ -0,0 +1,214 @@
+import bisect
+import math
+import threading
+import weakref
+
+
+# Latency buckets in seconds (upper bounds), from 50 microseconds to 2.5 seconds
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _ShardOwner:
+    """Held only by a thread's local storage; collected (and its shard retired) when the thread exits"""
+
+    __slots__ = ('__weakref__',)
+
+
+class _PerThreadMetric:
+    """Base for metrics whose values live in one shard per recording thread.
+
+    A thread only ever writes its own shard (a dict of label values ->
+    value), so recording needs no lock; the lock is taken once per thread,
+    to register its shard. Scrapes add the shards up. When a thread exits
+    and its thread-local storage is released, its shard is folded into a
+    base accumulator: counts never go backwards, and pools that replace
+    their threads do not grow the shard list.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        # Reentrant: a retiring shard's finalizer may run on a thread that already holds it
+        self._shards_lock = threading.RLock()
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = {}
+            owner = self._local.owner = _ShardOwner()
+            weakref.finalize(owner, self._retire, shard).atexit = False
+            self._local.shard = shard
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def _retire(self, shard):
+        """Fold a finished thread's shard into the base accumulator"""
+        with self._shards_lock:
+            self._shards = [other for other in self._shards if other is not shard]
+            for labels, value in shard.items():
+                self._retired[labels] = self._merge(self._retired.get(labels), value)
+
+    def _merged(self):
+        """{label values: merged value} across the base accumulator and all thread shards"""
+        with self._shards_lock:
+            shards = list(self._shards)
+            merged = dict(self._retired)
+        for shard in shards:
+            # list() copies in one step, so a writer adding a label set cannot break the iteration
+            for labels, value in list(shard.items()):
+                merged[labels] = self._merge(merged.get(labels), value)
+        return merged
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self._merged().items()):
+            lines.extend(self._render_series(labels, value))
+        return lines
+
+
+class Counter(_PerThreadMetric):
+    """Monotonic count, e.g. fallback recommendations served"""
+
+    kind = "counter"
+
+    def inc(self, *labelvalues, amount=1):
+        shard = self._shard()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._merged().get(labelvalues, 0)
+
+    def _merge(self, total, value):
+        return (total or 0) + value
+
+    def _render_series(self, labels, value):
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"]
+
+
+class Gauge(Counter):
+    """Value that goes up and down, e.g. requests in flight (per-thread deltas are summed)"""
+
+    kind = "gauge"
+
+    def dec(self, *labelvalues, amount=1):
+        self.inc(*labelvalues, amount=-amount)
+
+
+class Histogram(_PerThreadMetric):
+    """Bucketed observations (Prometheus histogram: cumulative le buckets, _sum and _count)"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labelvalues):
+        shard = self._shard()
+        counts = shard.get(labelvalues)
+        if counts is None:
+            # One slot per bucket, one for +Inf, then sum and count
+            counts = shard[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+    def _merge(self, total, value):
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+    def snapshot(self, *labelvalues):
+        """Per-bucket (not cumulative) counts, count and mean, for JSON stats endpoints"""
+        counts = self._merged().get(labelvalues) or [0] * (len(self.buckets) + 1) + [0.0, 0]
+        labels = [f"<={bound:g}" for bound in self.buckets] + [f">{self.buckets[-1]:g}"]
+        return {
+            'buckets': dict(zip(labels, counts)),
+            'count': counts[-1],
+            'mean': counts[-2] / counts[-1] if counts[-1] else 0.0
+        }
+
+    def _render_series(self, labels, counts):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            le = (("le", _format_value(bound)),)
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+        label_text = _format_labels(self.labelnames, labels)
+        lines.append(f"{self.name}_sum{label_text} {_format_value(counts[-2])}")
+        lines.append(f"{self.name}_count{label_text} {counts[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics plus scrape-time collectors, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Add a metric; a metric already registered under the name is returned instead"""
+        # Re-importing a module (e.g. Streamlit reruns) returns the existing metric
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collect):
+        """collect() -> [(name, type, documentation, [(labels dict, value), ...])], called on each scrape"""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collect in collectors:
+            for name, kind, documentation, samples in collect():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    label_text = _format_labels(tuple(labels), tuple(labels.values()))
+                    lines.append(f"{name}{label_text} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by the engine and the API
+REGISTRY = MetricsRegistry()
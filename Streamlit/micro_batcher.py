@@ -0,0 +1,101 @@
+import asyncio
+import time
+from metrics import Histogram
+
+
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 2.0
+
+# Histogram upper bounds: profiles per batch, and seconds spent waiting for a batch
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_WAIT_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-item requests into one batched call.
+
+    submit(item) parks the caller on a future. When no batch is being
+    scored the item is dispatched at once, so a lone request pays no
+    batching delay. Otherwise items collect and are handed to score_batch
+    (an async callable taking a list and returning a list of results in
+    the same order) as soon as max_batch_size are waiting, or max_wait_ms
+    after the first of them arrived, whichever comes first. So batching
+    adds at most max_wait_ms to any request, and under load the per-call
+    overhead is paid once per batch. Batches are dispatched without
+    waiting for earlier ones to finish; an exception from score_batch is
+    raised in every caller of that batch.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, score_batch, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+        # metrics.Histogram, so the API can also publish them at /metrics
+        self.batch_sizes = Histogram("micro_batch_size", "Profiles per micro-batch", buckets=BATCH_SIZE_BUCKETS)
+        self.queue_wait = Histogram("micro_batch_queue_wait_seconds", "Time a request waited for its micro-batch",
+                                    buckets=QUEUE_WAIT_BUCKETS)
+
+    async def submit(self, item):
+        """Result of score_batch for item, computed together with whatever else is waiting"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size or not self._tasks:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        # Callers that gave up while waiting are left out of the batch
+        batch = [entry for entry in self._pending[:self.max_batch_size] if not entry[1].done()]
+        del self._pending[:self.max_batch_size]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        if not batch:
+            return
+
+        now = time.perf_counter()
+        self.batch_sizes.observe(len(batch))
+        for _, _, queued_at in batch:
+            self.queue_wait.observe(now - queued_at)
+
+        task = asyncio.ensure_future(self._run(batch))
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        try:
+            results = await self.score_batch([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch scorer returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'waiting': len(self._pending),
+            'in_flight_batches': len(self._tasks),
+            'batch_size': self.batch_sizes.snapshot(),
+            'queue_wait_seconds': self.queue_wait.snapshot()
+        }
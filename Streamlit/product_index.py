@@ -0,0 +1,202 @@
+import re
+from types import MappingProxyType
+import numpy as np
+
+
+RISK_LEVELS = ('Low', 'Medium', 'High', 'Very High')
+LIQUIDITY_LEVELS = ('High', 'Medium', 'Low', 'Very Low')
+
+# Risk category name -> product risk_level it collects
+RISK_CATEGORY_LEVELS = {
+    'low_risk': 'Low',
+    'medium_risk': 'Medium',
+    'high_risk': 'High',
+    'very_high_risk': 'Very High'
+}
+
+# Alternative investments (unique/specialized products)
+ALTERNATIVE_PRODUCTS = (
+    'Cooperative Society Investments (SACCOs)',
+    'Agricultural Investment',
+    'Small Business Investment/Entrepreneurship',
+    'Education Savings Plans'
+)
+
+# Risk categories recommended for each risk tolerance, in priority order
+RISK_TOLERANCE_CATEGORIES = {
+    'Low': ('low_risk',),
+    'Medium': ('medium_risk', 'low_risk'),
+    'High': ('high_risk', 'medium_risk'),
+    'Very High': ('very_high_risk', 'high_risk')
+}
+DEFAULT_RISK_CATEGORIES = ('medium_risk',)
+
+# Products taken from each category for a risk-tolerance recommendation
+PRODUCTS_PER_CATEGORY = 3
+
+# Return bands by the midpoint of the expected_return range, in percent
+RETURN_BANDS = (('Low', float('-inf'), 9.0), ('Medium', 9.0, 15.0), ('High', 15.0, float('inf')))
+RETURN_RANGE = re.compile(r'\s*([-+]?\d+(?:\.\d+)?)%?\s*(?:-|to)\s*([-+]?\d+(?:\.\d+)?)%\s*')
+
+
+def return_band(expected_return):
+    """'Low'/'Medium'/'High' for an expected_return string like '8-12%' or '-50% to +100%'"""
+    match = RETURN_RANGE.fullmatch(expected_return or '')
+    if not match:
+        return None
+    midpoint = (float(match.group(1)) + float(match.group(2))) / 2
+    for band, low, high in RETURN_BANDS:
+        if low <= midpoint < high:
+            return band
+    return None
+
+
+def _level_code(levels, level):
+    return levels.index(level) if level in levels else -1
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class ProductCatalogIndex:
+    """Immutable lookup structure over the investment product catalog.
+
+    Built once per catalog. Products are numbered in catalog order, and
+    every risk level, liquidity level, return band and risk category is an
+    int bitset over those numbers, so a combined filter is a few ANDs and
+    only the matching products are visited. Product details and the
+    per-risk-tolerance recommendation lists are prebuilt as read-only
+    mappings and tuples and returned as-is, so callers must copy before
+    changing them.
+
+    For ranking the whole catalog, risk and liquidity levels are also
+    encoded as int8 arrays by product number (RISK_LEVELS/LIQUIDITY_LEVELS
+    index, -1 for anything else), and rank_priority holds each risk
+    tolerance's tie-break order.
+    """
+
+    def __init__(self, investment_products, alternative_products=ALTERNATIVE_PRODUCTS):
+        self.names = tuple(investment_products)
+        self._position = {name: i for i, name in enumerate(self.names)}
+        self._details = tuple(_freeze(investment_products[name]) for name in self.names)
+
+        self._risk_bits = {}
+        self._liquidity_bits = {}
+        self._return_bits = {}
+        for i, details in enumerate(self._details):
+            bit = 1 << i
+            risk_level = details.get('risk_level', 'Medium')
+            self._risk_bits[risk_level] = self._risk_bits.get(risk_level, 0) | bit
+            liquidity = details.get('liquidity')
+            self._liquidity_bits[liquidity] = self._liquidity_bits.get(liquidity, 0) | bit
+            band = return_band(details.get('expected_return'))
+            self._return_bits[band] = self._return_bits.get(band, 0) | bit
+
+        # Category buckets, as name tuples in catalog order
+        self.risk_categories = MappingProxyType({
+            **{category: self._names_for(self._risk_bits.get(level, 0))
+               for category, level in RISK_CATEGORY_LEVELS.items()},
+            # Listed names are kept even if not in the catalog, as before
+            'alternative': tuple(alternative_products)
+        })
+
+        # Prebuilt get_recommendations_by_risk_tolerance results
+        self._records = {
+            name: MappingProxyType({
+                'product': name,
+                'risk_level': details.get('risk_level', 'Medium'),
+                'expected_return': details.get('expected_return', '8-12%'),
+                'liquidity': details.get('liquidity', 'Medium'),
+                'description': details.get('description', '')
+            })
+            for name, details in zip(self.names, self._details)
+        }
+        self._recommendations = {
+            risk_tolerance: self._build_recommendations(categories)
+            for risk_tolerance, categories in RISK_TOLERANCE_CATEGORIES.items()
+        }
+        self._default_recommendations = self._build_recommendations(DEFAULT_RISK_CATEGORIES)
+
+        self.risk_codes = np.array([_level_code(RISK_LEVELS, details.get('risk_level', 'Medium'))
+                                    for details in self._details], dtype=np.int8)
+        self.liquidity_codes = np.array([_level_code(LIQUIDITY_LEVELS, details.get('liquidity'))
+                                         for details in self._details], dtype=np.int8)
+        # One row per RISK_LEVELS code plus a last row for other risk tolerances (code -1):
+        # that tolerance's recommended products first, in listed order, then the rest in catalog order
+        self.rank_priority = np.array(
+            [self._build_priority(self._recommendations.get(level, self._default_recommendations))
+             for level in RISK_LEVELS] + [self._build_priority(self._default_recommendations)],
+            dtype=np.intp
+        )
+        # Display fields of each product as they appear in a recommendation
+        self.display_fields = tuple(
+            (name, details.get('expected_return', '8-12%'), details.get('risk_level', 'Medium').title(),
+             details.get('liquidity', 'Medium').title(), details.get('description', '')[:200],
+             details.get('pros', ())[:3], details.get('cons', ())[:3])
+            for name, details in zip(self.names, self._details)
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, product_name):
+        return product_name in self._position
+
+    def _names_for(self, bits):
+        """Names of the products set in bits, in catalog order; visits only the set bits"""
+        names = []
+        while bits:
+            lowest = bits & -bits
+            names.append(self.names[lowest.bit_length() - 1])
+            bits ^= lowest
+        return tuple(names)
+
+    def _build_recommendations(self, categories):
+        return tuple(
+            self._records[product]
+            for category in categories
+            for product in self.risk_categories.get(category, ())[:PRODUCTS_PER_CATEGORY]
+            if product in self._records
+        )
+
+    def _build_priority(self, preferred):
+        """Tie-break rank of each product number: preferred records first, then catalog order"""
+        order = list(dict.fromkeys(self._position[record['product']] for record in preferred))
+        listed = set(order)
+        order += [i for i in range(len(self.names)) if i not in listed]
+        priority = np.empty(len(self.names), dtype=np.intp)
+        priority[order] = np.arange(len(order))
+        return priority
+
+    def details(self, product_name):
+        """Read-only details for a product, or an empty mapping"""
+        position = self._position.get(product_name)
+        return self._details[position] if position is not None else MappingProxyType({})
+
+    def products_by_category(self, category):
+        """Product names in a risk category ('low_risk', ..., 'alternative')"""
+        return self.risk_categories.get(category, ())
+
+    def recommendations_for(self, risk_tolerance):
+        """Prebuilt recommendation records for a risk tolerance"""
+        return self._recommendations.get(risk_tolerance, self._default_recommendations)
+
+    def filter(self, risk_level=None, liquidity=None, return_band=None):
+        """Names of products matching every given criterion (None or 'All' means any)"""
+        bits = (1 << len(self.names)) - 1
+        for criterion, buckets in ((risk_level, self._risk_bits),
+                                   (liquidity, self._liquidity_bits),
+                                   (return_band, self._return_bits)):
+            if criterion is not None and criterion != 'All':
+                bits &= buckets.get(criterion, 0)
+        return self._names_for(bits)
+
+    def filter_details(self, risk_level=None, liquidity=None, return_band=None):
+        """(name, details) pairs for filter()"""
+        return tuple((name, self._details[self._position[name]])
+                     for name in self.filter(risk_level, liquidity, return_band))
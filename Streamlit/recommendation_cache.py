@@ -0,0 +1,131 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+# Every profile field get_recommendations reads. dependents and household_size
+# only reach the output through the model features, but they do reach it.
+FINGERPRINT_FIELDS = (
+    'age', 'monthly_income', 'monthly_expenses', 'current_savings', 'debt_amount',
+    'dependents', 'household_size', 'location', 'education', 'employment',
+    'emergency_fund', 'investment_experience', 'investment_horizon', 'risk_tolerance'
+)
+
+DEFAULT_MAXSIZE = 4096
+DEFAULT_TTL = 300.0
+
+# Stands in for a field that is absent or None; the engine treats the two alike (present_fields)
+_ABSENT = "<absent>"
+
+
+def profile_fingerprint(user_data, income_bucket=None, age_bucket=None):
+    """Canonical hash of the output-relevant fields of a profile (FINGERPRINT_FIELDS)"""
+    canonical = []
+    for field in FINGERPRINT_FIELDS:
+        value = user_data.get(field)
+        if value is None:
+            value = _ABSENT
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = float(value)
+            bucket = income_bucket if field == 'monthly_income' else (age_bucket if field == 'age' else None)
+            if bucket:
+                value = (value // bucket) * bucket
+        canonical.append(value)
+    payload = json.dumps(canonical, default=str, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class RecommendationCache:
+    """In-process LRU cache with a TTL for get_recommendations results.
+
+    Keys are a canonical hash of only the profile fields that affect the
+    output (FINGERPRINT_FIELDS), so field order, extra fields and 30 vs 30.0
+    do not matter. income_bucket/age_bucket (off by default) round those two
+    fields down to a bucket width before hashing. That trades exactness for
+    hit rate: profiles in the same bucket share one result.
+
+    Entries belong to a generation (model and catalog versions, given by the
+    caller): a lookup with a different generation clears the cache first,
+    and a put for a generation that is no longer current is dropped.
+    Values are deep-copied in and out, so callers may modify what they get.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL, income_bucket=None, age_bucket=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.income_bucket = income_bucket
+        self.age_bucket = age_bucket
+        self._entries = OrderedDict()
+        self._generation = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def fingerprint(self, user_data):
+        """Canonical hash of the output-relevant fields of a profile, with this cache's buckets"""
+        return profile_fingerprint(user_data, self.income_bucket, self.age_bucket)
+
+    def _check_generation(self, generation):
+        if generation != self._generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._generation = generation
+
+    def get(self, key, generation=None):
+        """Cached value for key, or None"""
+        with self._lock:
+            self._check_generation(generation)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def put(self, key, value, generation=None):
+        value = copy.deepcopy(value)
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if generation != self._generation:
+                # Computed against models or a catalog that have since been replaced
+                return
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
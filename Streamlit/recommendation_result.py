@@ -0,0 +1,28 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass(slots=True)
+class RecommendationResult:
+    """Everything the API returns for one profile, computed once by the engine.
+
+    Field names match api.RecommendationResponse, which is built from it
+    with model_validate (from_attributes), so no dict is copied or coerced
+    on the way out.
+    """
+    user_segment: str
+    risk_tolerance: str
+    recommendations: List[Dict[str, Any]] = field(default_factory=list)
+    portfolio_allocation: Dict[str, float] = field(default_factory=dict)
+    investment_probability: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, result):
+        """From a get_batch_recommendations result"""
+        return cls(
+            user_segment=result['user_segment'],
+            risk_tolerance=result['risk_tolerance'],
+            recommendations=result['recommendations'],
+            portfolio_allocation=result['portfolio_allocation'],
+            investment_probability=result['investment_probability']
+        )
@@ -0,0 +1,152 @@
+import logging
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+# Remote engine settings for the Streamlit app; ENGINE_URL unset means the engine runs in-process
+ENGINE_URL = os.environ.get("ENGINE_URL", "").rstrip("/")
+ENGINE_CONNECT_TIMEOUT = float(os.environ.get("ENGINE_CONNECT_TIMEOUT", 2.0))
+ENGINE_READ_TIMEOUT = float(os.environ.get("ENGINE_READ_TIMEOUT", 10.0))
+ENGINE_RETRIES = int(os.environ.get("ENGINE_RETRIES", 2))
+ENGINE_POOL_SIZE = int(os.environ.get("ENGINE_POOL_SIZE", 10))
+ENGINE_FALLBACK = os.environ.get("ENGINE_FALLBACK", "1") == "1"
+
+# Retried with backoff: the API answers 503 with Retry-After when its inference pool is saturated
+RETRY_STATUSES = (502, 503, 504)
+RETRY_BACKOFF = 0.2
+# /model-status is re-read at most this often (it carries the cache generation)
+MODEL_STATUS_TTL = 30.0
+
+NO_MODEL_INFO = {'models_loaded': False, 'best_model': None, 'available_models': []}
+
+
+class RemoteEngineError(Exception):
+    """The engine service could not be reached or answered with an error"""
+
+
+class _RemoteProductIndex:
+    """The part of ProductCatalogIndex the app uses, answered by GET /products"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def filter_details(self, risk_level=None, liquidity=None, return_band=None):
+        """(name, details) pairs for products matching every given criterion"""
+        return self.client._call('product_index', '_remote_filter_details', risk_level, liquidity, return_band)
+
+
+class RemoteEngineClient:
+    """Stands in for InvestmentRecommendationSystem by calling the api.py service.
+
+    Requests go through one requests.Session with a pooled, keep-alive
+    connection adapter, connect/read timeouts and retries with backoff on
+    connection errors and 502/503/504. When a call still fails and a
+    fallback factory was given (e.g. InvestmentRecommendationSystem), the
+    call is answered by a local engine built on first use, so the UI keeps
+    working while the service is down without loading the models up front.
+    """
+
+    def __init__(self, base_url=ENGINE_URL, fallback=None, connect_timeout=ENGINE_CONNECT_TIMEOUT,
+                 read_timeout=ENGINE_READ_TIMEOUT, retries=ENGINE_RETRIES, pool_size=ENGINE_POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.fallback = fallback
+        self.product_index = _RemoteProductIndex(self)
+        self._local = None
+        self._local_lock = threading.Lock()
+        self._model_status = None
+        self._model_status_at = 0.0
+
+        retry = Retry(total=retries, backoff_factor=RETRY_BACKOFF, status_forcelist=RETRY_STATUSES,
+                      allowed_methods=frozenset({"GET", "POST"}), respect_retry_after_header=True,
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _request(self, method, path, **kwargs):
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise RemoteEngineError(f"{method} {path} failed: {e}") from e
+
+    def _local_engine(self):
+        with self._local_lock:
+            if self._local is None:
+                logger.warning("🔁 Loading the local engine as a fallback for %s", self.base_url)
+                self._local = self.fallback()
+            return self._local
+
+    def _call(self, attribute, remote_method, *args, **kwargs):
+        """Remote call, or the same call on the local engine's attribute when it fails"""
+        try:
+            return getattr(self, remote_method)(*args, **kwargs)
+        except RemoteEngineError as e:
+            if self.fallback is None:
+                raise
+            logger.warning("⚠️ Engine service unavailable, answering locally: %s", e)
+            target = self._local_engine()
+            if attribute == 'product_index':
+                return target.product_index.filter_details(*args, **kwargs)
+            return getattr(target, attribute)(*args, **kwargs)
+
+    def _remote_recommendations(self, user_data):
+        result = self._request("POST", "/recommendations", json=user_data)
+        # Same shape as InvestmentRecommendationSystem.get_recommendations
+        return {
+            'user_segment': result.get('user_segment'),
+            'risk_tolerance': result.get('risk_tolerance'),
+            'detailed_products': result.get('recommendations') or [],
+            'portfolio_allocation': result.get('portfolio_allocation') or {},
+            'investment_probability': result.get('investment_probability')
+        }
+
+    def _remote_filter_details(self, risk_level=None, liquidity=None, return_band=None):
+        params = {key: value for key, value in
+                  (('risk_level', risk_level), ('liquidity', liquidity), ('return_band', return_band))
+                  if value is not None}
+        return tuple(self._request("GET", "/products", params=params)['products'].items())
+
+    def _remote_model_status(self):
+        now = time.monotonic()
+        if self._model_status is None or now - self._model_status_at > MODEL_STATUS_TTL:
+            status = self._request("GET", "/model-status")
+            if status.get('status') != 'success':
+                raise RemoteEngineError(f"GET /model-status: {status.get('message')}")
+            self._model_status, self._model_status_at = status, now
+        return self._model_status
+
+    def get_recommendations(self, user_id=None, user_data=None, df=None):
+        """Recommendations for user_data from the service"""
+        return self._call('get_recommendations', '_remote_recommendations', user_data=user_data)
+
+    def get_model_info(self):
+        try:
+            status = self._remote_model_status()
+        except RemoteEngineError as e:
+            if self.fallback is None:
+                logger.warning("⚠️ Could not read the engine's model status: %s", e)
+                return dict(NO_MODEL_INFO)
+            return self._local_engine().get_model_info()
+        return {key: status.get(key) for key in NO_MODEL_INFO}
+
+    def _cache_generation(self):
+        """The service's cache generation, so UI caches drop results when its models or catalog change"""
+        try:
+            return ('remote', self._remote_model_status().get('generation'))
+        except RemoteEngineError:
+            if self.fallback is None:
+                return ('remote', None)
+            return ('local',) + tuple(self._local_engine()._cache_generation())
+
+    def close(self):
+        self.session.close()
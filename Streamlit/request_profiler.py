@@ -0,0 +1,133 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+
+DEFAULT_INTERVAL_MS = 1.0
+# Profiles kept for the debug endpoints; older ones are dropped
+DEFAULT_MAX_PROFILES = 50
+
+# Profiles running right now, and the GIL switch interval to restore when the last one ends
+_active_lock = threading.Lock()
+_active_profiles = 0
+_saved_switch_interval = None
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _lower_switch_interval(interval):
+    """Let the sampler take the GIL every interval, instead of every 5 ms, while profiles run"""
+    global _active_profiles, _saved_switch_interval
+    with _active_lock:
+        if _active_profiles == 0:
+            _saved_switch_interval = sys.getswitchinterval()
+        _active_profiles += 1
+        sys.setswitchinterval(min(sys.getswitchinterval(), interval))
+
+
+def _restore_switch_interval():
+    global _active_profiles
+    with _active_lock:
+        _active_profiles -= 1
+        if _active_profiles == 0:
+            sys.setswitchinterval(_saved_switch_interval)
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack every interval from a background thread.
+
+    Stacks are read with sys._current_frames(), so the profiled code runs
+    unmodified (no tracing hooks) and pays only for the GIL hand-offs.
+    Samples are counted per stack, root first, and only frames below
+    root_code (the code object of the function that started the profiled
+    call) are kept, so stacks start at the profiled call itself.
+    """
+
+    def __init__(self, interval_ms=DEFAULT_INTERVAL_MS, thread_id=None, root_code=None):
+        self.interval = interval_ms / 1000.0
+        self.thread_id = thread_id or threading.get_ident()
+        self.root_code = root_code
+        self.stacks = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            code = None
+            while frame is not None and frame.f_code is not self.root_code:
+                code = frame.f_code
+                labels.append(_frame_label(code))
+                frame = frame.f_back
+            # Skip the moments spent entering and leaving the profiler itself
+            if labels and code.co_filename != __file__:
+                stack = ";".join(reversed(labels))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+                self.samples += 1
+
+    def __enter__(self):
+        _lower_switch_interval(self.interval)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        _restore_switch_interval()
+        return False
+
+
+def profile_call(interval_ms, fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) under a SamplingProfiler: (result, profile dict)"""
+    started = time.perf_counter()
+    with SamplingProfiler(interval_ms, root_code=profile_call.__code__) as profiler:
+        result = fn(*args, **kwargs)
+    return result, {
+        'duration_ms': (time.perf_counter() - started) * 1000.0,
+        'interval_ms': interval_ms,
+        'samples': profiler.samples,
+        'stacks': profiler.stacks
+    }
+
+
+def collapsed_stacks(profile):
+    """Profile in the collapsed-stack format read by flamegraph.pl and speedscope"""
+    lines = [f"{stack} {count}" for stack, count in sorted(profile['stacks'].items())]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+class ProfileStore:
+    """The most recent profiles by id, for retrieval after the profiled request returned"""
+
+    def __init__(self, maxsize=DEFAULT_MAX_PROFILES):
+        self.maxsize = maxsize
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile, **details):
+        """Store a profile_call profile with details (e.g. path, trigger); returns its id"""
+        profile_id = uuid.uuid4().hex[:12]
+        record = {'id': profile_id, 'timestamp': datetime.now().isoformat(), **details, **profile}
+        with self._lock:
+            self._profiles[profile_id] = record
+            while len(self._profiles) > self.maxsize:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def summaries(self):
+        """Newest first, without the stacks"""
+        with self._lock:
+            records = list(self._profiles.values())
+        return [{key: value for key, value in record.items() if key != 'stacks'} for record in reversed(records)]
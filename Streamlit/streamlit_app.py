@@ -7,19 +7,32 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import json
+import inspect
 import requests
 from typing import Dict, Any, List
 import warnings
+from streamlit.errors import StreamlitAPIException
 warnings.filterwarnings('ignore')
 
-# Import your InvestmentRecommendationSystem class here
-from Investment_System import InvestmentRecommendationSystem
+from logging_setup import configure_logging
+from recommendation_cache import profile_fingerprint
+from remote_engine import RemoteEngineClient, ENGINE_URL, ENGINE_FALLBACK
 
+configure_logging()
 
-# Initialize the system
+
+def load_local_system():
+    # Imported here so a remote-mode UI never imports the engine unless it falls back
+    from Investment_System import InvestmentRecommendationSystem
+    return InvestmentRecommendationSystem()
+
+# Initialize the system: a client of the api.py service when ENGINE_URL is set
+# (models are then only loaded here if the service is down), else the engine in-process
 @st.cache_resource
 def load_system():
-    return InvestmentRecommendationSystem()
+    if ENGINE_URL:
+        return RemoteEngineClient(ENGINE_URL, fallback=load_local_system if ENGINE_FALLBACK else None)
+    return load_local_system()
 
 # Page config
 st.set_page_config(
@@ -35,7 +48,8 @@ st.markdown("<h1 style='text-align: center;'>🏛️ Kenya Investment Advisor</h
 if 'theme' not in st.session_state:
     st.session_state.theme = 'light'
 
-# Theme-adaptive CSS function
+# Theme-adaptive CSS function; one shared string per theme, not rebuilt on reruns
+@st.cache_resource(show_spinner=False)
 def get_theme_css(theme):
     if theme == 'dark':
         return """
@@ -369,9 +383,6 @@ def get_theme_css(theme):
 </style>
 """
 
-# Apply theme CSS
-st.markdown(get_theme_css(st.session_state.theme), unsafe_allow_html=True)
-
 # --- Initialize session state for navigation ---
 if "theme" not in st.session_state:
     # Detect system theme on first load
@@ -387,6 +398,7 @@ if "theme" not in st.session_state:
 if "page" not in st.session_state:
     st.session_state.page = "🏠 Home"
 
+# Apply theme CSS
 st.markdown(get_theme_css(st.session_state.theme), unsafe_allow_html=True)
 
 # --- Sidebar Navigation ---
@@ -458,91 +470,103 @@ if 'current_step' not in st.session_state:
 # Load system
 system = load_system()
 
-# HOME PAGE
-if page == "🏠 Home":
-        
-    col1, col2, col3 = st.columns([1, 2, 1])
-    
-    st.markdown("""
-    <div class="card">
-        <h2>Your Personal Investment Guide</h2>
-        <p style="font-size: 1.2rem;">
-            Make informed investment decisions with our AI-powered recommendation system, 
-            specifically designed for the Kenyan market. Get personalized advice based on 
-            your financial profile, goals, and risk tolerance.
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Key features
-    st.markdown('<h2 class="sub-header">🌟 Key Features</h2>', unsafe_allow_html=True)
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.markdown("""
-        <div class="card">
-            <h3>🎯 Personalized Recommendations</h3>
-            <p>Get investment advice tailored to your unique financial situation and goals.</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown("""
-        <div class="card">
-            <h3>📈 Kenya Market Focus</h3>
-            <p>Specialized knowledge of Kenyan investment products and market conditions.</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown("""
-        <div class="card">
-            <h3>🤖 AI-Powered Analysis</h3>
-            <p>Advanced algorithms analyze your profile to suggest the best investment options.</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    # Quick stats
-    st.markdown('<h2 class="sub-header">📊 Investment Landscape Overview</h2>', unsafe_allow_html=True)
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown("""
-        <div class="metric-card">
-            <h3>16+</h3>
-            <p>Investment Options</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown("""
-        <div class="metric-card">
-            <h3>3-50%</h3>
-            <p>Return Range</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown("""
-        <div class="metric-card">
-            <h3>All Levels</h3>
-            <p>Risk Categories</p>
-        </div>
-        """, unsafe_allow_html=True)
+# Reruns (theme toggle, download button, expanders) re-execute the step 4 code;
+# these serve an unchanged profile without calling the engine or rebuilding figures
+@st.cache_data(show_spinner=False, max_entries=256)
+def cached_recommendations(profile_key, generation, _user_profile):
+    """get_recommendations, keyed on the profile fingerprint and the model/catalog generation"""
+    return system.get_recommendations(user_data=_user_profile)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def allocation_pie(allocation_items, theme):
+    """Portfolio allocation pie chart for (product, percent) pairs, styled for the theme"""
+    colors = ['#2E8B57', '#4682B4', '#FF9800', '#F44336', '#9C27B0'] if theme == 'light' else ['#4CAF50', '#81C784', '#FFA726', '#EF5350', '#BA68C8']
+    text_color = 'black' if theme == 'light' else 'white'
+
+    fig = px.pie(values=[percent for _, percent in allocation_items], names=[name for name, _ in allocation_items],
+                 title="Recommended Portfolio Distribution", color_discrete_sequence=colors)
+    fig.update_traces(
+                    textposition='outside', 
+                    textinfo='percent+label',
+                    outsidetextfont=dict(color=text_color)
+                    )
     
-    with col4:
-        st.markdown("""
-        <div class="metric-card">
-            <h3>Personalized</h3>
-            <p>Recommendations</p>
-        </div>
-        """, unsafe_allow_html=True)
+    # Adjust chart background based on theme
+    if theme == 'dark':
+        fig.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font=dict(color=text_color),
+            legend=dict(font=dict(color=text_color))
+        )
+    return fig
+
+# Investments page: products per page, and whether expanders report .open (Streamlit with
+# expander on_change); older versions render every expander's contents up front
+CATALOG_PAGE_SIZE = 8
+LAZY_EXPANDERS = 'on_change' in inspect.signature(st.expander).parameters
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def risk_gauge(risk_level, theme):
+    """Risk gauge for a product's risk level; the same figure serves every product at that level"""
+    # Risk indicator
+    risk_colors = {
+        'Low': '#28a745' if theme == 'light' else '#4CAF50',
+        'Medium': '#ffc107' if theme == 'light' else '#FF9800', 
+        'High': '#dc3545' if theme == 'light' else '#F44336',
+        'Very High': '#6f42c1' if theme == 'light' else '#BA68C8'
+    }
+    
+    fig = go.Figure(go.Indicator(
+        mode = "gauge+number",
+        value = {'Low': 25, 'Medium': 50, 'High': 75, 'Very High': 100}[risk_level],
+        domain = {'x': [0, 1], 'y': [0, 1]},
+        title = {'text': "Risk Level"},
+        gauge = {
+            'axis': {'range': [None, 100]},
+            'bar': {'color': risk_colors[risk_level]},
+            'steps': [
+                {'range': [0, 25], 'color': "lightgray"},
+                {'range': [25, 50], 'color': "gray"},
+                {'range': [50, 75], 'color': "lightgray"},
+                {'range': [75, 100], 'color': "gray"}
+            ],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': 90
+            }
+        }
+    ))
+    fig.update_layout(height=200, margin=dict(l=20, r=20, t=40, b=20))
     
+    # Adjust gauge background based on theme
+    if theme == 'dark':
+        fig.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font=dict(color='white')
+        )
+    return fig
 
-# INVESTMENT RECOMMENDATIONS PAGE
-elif page == "💼 Recommendations":
+# Fragments rerun on their own when their widgets change (Streamlit 1.37+); on older
+# versions the wrapped functions run as plain code and every interaction reruns the script
+fragment = getattr(st, 'fragment', None) or (lambda func: func)
+FRAGMENT_RERUN = hasattr(st, 'fragment') and 'scope' in inspect.signature(st.rerun).parameters
+
+def rerun_fragment():
+    """Rerun the fragment being run, or the whole script where fragments are unsupported"""
+    if FRAGMENT_RERUN:
+        try:
+            st.rerun(scope="fragment")
+        except StreamlitAPIException:
+            # The fragment is running as part of a full rerun
+            pass
+    st.rerun()
+
+@fragment
+def recommendation_wizard():
+    """Profile steps 1-4; widget changes and step changes rerun only this fragment"""
     st.markdown('<h1 class="main-header">Get Your Investment Recommendations</h1>', unsafe_allow_html=True)
     
     # Progress bar
@@ -604,7 +628,7 @@ elif page == "💼 Recommendations":
                     'household_size': household_size
                 })
                 st.session_state.current_step = 2
-                st.rerun()
+                rerun_fragment()
     
     # Step 2: Financial Information
     elif st.session_state.current_step == 2:
@@ -639,7 +663,7 @@ elif page == "💼 Recommendations":
         with col1:
             if st.button("← Back"):
                 st.session_state.current_step = 1
-                st.rerun()
+                rerun_fragment()
         
         with col2:
             if st.button("Next →", type="primary"):
@@ -669,7 +693,7 @@ elif page == "💼 Recommendations":
                         'disposable_income': disposable_income
                     })
                     st.session_state.current_step = 3
-                    st.rerun()
+                    rerun_fragment()
     
     # Step 3: Investment Preferences
     elif st.session_state.current_step == 3:
@@ -728,7 +752,7 @@ elif page == "💼 Recommendations":
         with col1:
             if st.button("← Back"):
                 st.session_state.current_step = 2
-                st.rerun()
+                rerun_fragment()
         
         with col2:
             if st.button("Get Recommendations →", type="primary"):
@@ -765,7 +789,7 @@ elif page == "💼 Recommendations":
                         'preferred_sectors': preferred_sectors
                     })
                     st.session_state.current_step = 4
-                    st.rerun()
+                    rerun_fragment()
     
     # Step 4: Recommendations
     elif st.session_state.current_step == 4:
@@ -790,8 +814,9 @@ elif page == "💼 Recommendations":
                 disposable = st.session_state.user_profile.get('disposable_income', 0)
                 st.write(f"**Disposable Income:** KES {disposable:,}")
         
-        # Generate recommendations
-        recommendations = system.get_recommendations(user_data=st.session_state.user_profile)
+        # Generate recommendations (memoized per profile across reruns)
+        recommendations = cached_recommendations(profile_fingerprint(st.session_state.user_profile),
+                                                 system._cache_generation(), st.session_state.user_profile)
 
         # Display recommendations
         st.markdown('<h2 class="sub-header">🏆 Top Recommendations for You</h2>', unsafe_allow_html=True)
@@ -878,28 +903,8 @@ elif page == "💼 Recommendations":
                 'Government Bonds (Treasury Bonds)': 5
                 }
         
-        # Adjust pie chart colors based on theme
-        colors = ['#2E8B57', '#4682B4', '#FF9800', '#F44336', '#9C27B0'] if st.session_state.theme == 'light' else ['#4CAF50', '#81C784', '#FFA726', '#EF5350', '#BA68C8']
-        text_color = 'black' if st.session_state.theme == 'light' else 'white'
-
-        fig = px.pie(values=list(allocation.values()), names=list(allocation.keys()), 
-                     title="Recommended Portfolio Distribution", color_discrete_sequence=colors)
-        fig.update_traces(
-                        textposition='outside', 
-                        textinfo='percent+label',
-                        outsidetextfont=dict(color=text_color)
-                        )
-        
-        # Adjust chart background based on theme
-        if st.session_state.theme == 'dark':
-            fig.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color=text_color),
-                legend=dict(font=dict(color=text_color))
-            )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        # Pie chart built once per allocation and theme
+        st.plotly_chart(allocation_pie(tuple(allocation.items()), st.session_state.theme), use_container_width=True)
         
         # Action items
         st.markdown('<h2 class="sub-header">📝 Next Steps</h2>', unsafe_allow_html=True)
@@ -937,13 +942,13 @@ elif page == "💼 Recommendations":
         with col1:
             if st.button("← Back to Preferences"):
                 st.session_state.current_step = 3
-                st.rerun()
+                rerun_fragment()
         
         with col2:
             if st.button("🔄 New Assessment", type="primary"):
                 st.session_state.current_step = 1
                 st.session_state.user_profile = {}
-                st.rerun()
+                rerun_fragment()
         
         with col3:
             # Create downloadable report
@@ -962,8 +967,10 @@ elif page == "💼 Recommendations":
                 mime="application/json"
             )
 
-# INVESTMENT OPTIONS PAGE
-elif page == "📊 Investments":
+
+@fragment
+def investments_catalog():
+    """Catalog filters, pages and product expanders, rerun on their own"""
     st.markdown('<h1 class="main-header">📊 Kenya Investment Options Guide</h1>', unsafe_allow_html=True)
     
     # Filter options
@@ -977,25 +984,31 @@ elif page == "📊 Investments":
         liquidity_filter = st.selectbox("Filter by Liquidity", 
                                       ["All", "High", "Medium", "Low", "Very Low"])
     
-    # Get all products
-    products = system.investment_products
-    
-    # Filter products
-    filtered_products = {}
-    for name, details in products.items():
-        if risk_filter != "All" and details['risk_level'] != risk_filter:
-            continue
-        if liquidity_filter != "All" and details['liquidity'] != liquidity_filter:
-            continue
-        filtered_products[name] = details
+    # Filter products through the precomputed catalog index
+    filtered_products = dict(system.product_index.filter_details(risk_level=risk_filter, liquidity=liquidity_filter))
     
     # Display products
     st.markdown(f'<h2 class="sub-header">Found {len(filtered_products)} Investment Options</h2>', unsafe_allow_html=True)
     
-    for name, details in filtered_products.items():
+    # One page of the catalog at a time, so the page stays the same size as the catalog grows
+    pages = max(1, -(-len(filtered_products) // CATALOG_PAGE_SIZE))
+    catalog_page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1) if pages > 1 else 1
+    page_start = (catalog_page - 1) * CATALOG_PAGE_SIZE
+    
+    for name, details in list(filtered_products.items())[page_start:page_start + CATALOG_PAGE_SIZE]:
         risk_class = f"risk-{details['risk_level']}" #.lower().replace(' ', '-')
+        label = f"🔍 {name} - {details['risk_level']} Risk | {details['expected_return']} Returns"
+        
+        if LAZY_EXPANDERS:
+            expander = st.expander(label, key=f"product_{name}", on_change="rerun")
+        else:
+            expander = st.expander(label)
         
-        with st.expander(f"🔍 {name} - {details['risk_level']} Risk | {details['expected_return']} Returns"):
+        with expander:
+            # Collapsed expanders send nothing; their contents are built when opened
+            if LAZY_EXPANDERS and not expander.open:
+                continue
+            
             col1, col2 = st.columns([2, 1])
             
             with col1:
@@ -1011,46 +1024,8 @@ elif page == "📊 Investments":
                     st.metric("Liquidity", details['liquidity'])
             
             with col2:
-                # Risk indicator
-                risk_colors = {
-                    'Low': '#28a745' if st.session_state.theme == 'light' else '#4CAF50',
-                    'Medium': '#ffc107' if st.session_state.theme == 'light' else '#FF9800', 
-                    'High': '#dc3545' if st.session_state.theme == 'light' else '#F44336',
-                    'Very High': '#6f42c1' if st.session_state.theme == 'light' else '#BA68C8'
-                }
-                
-                fig = go.Figure(go.Indicator(
-                    mode = "gauge+number",
-                    value = {'Low': 25, 'Medium': 50, 'High': 75, 'Very High': 100}[details['risk_level']],
-                    domain = {'x': [0, 1], 'y': [0, 1]},
-                    title = {'text': "Risk Level"},
-                    gauge = {
-                        'axis': {'range': [None, 100]},
-                        'bar': {'color': risk_colors[details['risk_level']]},
-                        'steps': [
-                            {'range': [0, 25], 'color': "lightgray"},
-                            {'range': [25, 50], 'color': "gray"},
-                            {'range': [50, 75], 'color': "lightgray"},
-                            {'range': [75, 100], 'color': "gray"}
-                        ],
-                        'threshold': {
-                            'line': {'color': "red", 'width': 4},
-                            'thickness': 0.75,
-                            'value': 90
-                        }
-                    }
-                ))
-                fig.update_layout(height=200, margin=dict(l=20, r=20, t=40, b=20))
-                
-                # Adjust gauge background based on theme
-                if st.session_state.theme == 'dark':
-                    fig.update_layout(
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        font=dict(color='white')
-                    )
-                
-                st.plotly_chart(fig, use_container_width=True, key=f"risk_gauge_{name}")
+                st.plotly_chart(risk_gauge(details['risk_level'], st.session_state.theme),
+                                use_container_width=True, key=f"risk_gauge_{name}")
             
             # Pros and Cons
             col1, col2 = st.columns(2)
@@ -1065,6 +1040,98 @@ elif page == "📊 Investments":
                 for con in details['cons']:
                     st.write(f"• {con}")
 
+
+# HOME PAGE
+if page == "🏠 Home":
+        
+    col1, col2, col3 = st.columns([1, 2, 1])
+    
+    st.markdown("""
+    <div class="card">
+        <h2>Your Personal Investment Guide</h2>
+        <p style="font-size: 1.2rem;">
+            Make informed investment decisions with our AI-powered recommendation system, 
+            specifically designed for the Kenyan market. Get personalized advice based on 
+            your financial profile, goals, and risk tolerance.
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Key features
+    st.markdown('<h2 class="sub-header">🌟 Key Features</h2>', unsafe_allow_html=True)
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.markdown("""
+        <div class="card">
+            <h3>🎯 Personalized Recommendations</h3>
+            <p>Get investment advice tailored to your unique financial situation and goals.</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown("""
+        <div class="card">
+            <h3>📈 Kenya Market Focus</h3>
+            <p>Specialized knowledge of Kenyan investment products and market conditions.</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col3:
+        st.markdown("""
+        <div class="card">
+            <h3>🤖 AI-Powered Analysis</h3>
+            <p>Advanced algorithms analyze your profile to suggest the best investment options.</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Quick stats
+    st.markdown('<h2 class="sub-header">📊 Investment Landscape Overview</h2>', unsafe_allow_html=True)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.markdown("""
+        <div class="metric-card">
+            <h3>16+</h3>
+            <p>Investment Options</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown("""
+        <div class="metric-card">
+            <h3>3-50%</h3>
+            <p>Return Range</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col3:
+        st.markdown("""
+        <div class="metric-card">
+            <h3>All Levels</h3>
+            <p>Risk Categories</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col4:
+        st.markdown("""
+        <div class="metric-card">
+            <h3>Personalized</h3>
+            <p>Recommendations</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+
+# INVESTMENT RECOMMENDATIONS PAGE
+elif page == "💼 Recommendations":
+    recommendation_wizard()
+
+# INVESTMENT OPTIONS PAGE
+elif page == "📊 Investments":
+    investments_catalog()
+
 # ABOUT US PAGE
 elif page == "ℹ️ About Us":
     st.markdown('<h1 class="main-header">ℹ️ About Kenya Investment Advisor</h1>', unsafe_allow_html=True)
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+from product_index import RISK_LEVELS, LIQUIDITY_LEVELS
+
+
+# Integer codes for the levels, as stored in ProductCatalogIndex.risk_codes/liquidity_codes;
+# -1 is a level outside the list
+RISK_CODES = {level: code for code, level in enumerate(RISK_LEVELS)}
+LOW_RISK, MEDIUM_RISK, HIGH_RISK = RISK_CODES['Low'], RISK_CODES['Medium'], RISK_CODES['High']
+LIQUIDITY_CODES = {level: code for code, level in enumerate(LIQUIDITY_LEVELS)}
+HIGH_LIQUIDITY = LIQUIDITY_CODES['High']
+ILLIQUID = (LIQUIDITY_CODES['Low'], LIQUIDITY_CODES['Very Low'])
+
+# Points are sums of tenths; ranking compares them as integers so float rounding cannot reorder ties
+POINT_SCALE = 10
+
+
+def risk_codes(values):
+    """RISK_LEVELS index of each value, -1 when it is not one of them"""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    lookup = np.array([RISK_CODES.get(value, -1) for value in uniques] + [-1], dtype=np.intp)
+    return lookup[codes]
+
+
+def suitability_points(user_risk, age, income, long_term, short_term, product_risk, product_liquidity):
+    """Unclipped suitability points, broadcast over users x products.
+
+    Same rules as InvestmentRecommendationSystem._calculate_suitability_score:
+    0.5 base, plus risk alignment (0.4 same level, 0.2 one apart or unknown),
+    age fit (0.2/0.1), income (0.2/0.1) and horizon/liquidity fit (0.2, else
+    0.1). User arguments are (n_users, 1) arrays, product codes (1, n_products)
+    arrays from ProductCatalogIndex. Added up in the scalar order, so clipped
+    scores match it exactly.
+    """
+    risk_gap = np.abs(user_risk - product_risk)
+    unknown_risk = (user_risk < 0) | (product_risk < 0)
+    risk_points = np.where(unknown_risk, 0.2, np.where(risk_gap == 0, 0.4, np.where(risk_gap == 1, 0.2, 0.0)))
+
+    growth_product = (product_risk == MEDIUM_RISK) | (product_risk == HIGH_RISK)
+    age_points = np.select(
+        [(age < 35) & growth_product, (age >= 50) & (product_risk == LOW_RISK), (age >= 35) & (age < 50)],
+        [0.2, 0.2, 0.1],
+        default=0.0
+    )
+
+    income_points = np.where(income > 100000, 0.2, np.where(income > 50000, 0.1, 0.0))
+
+    illiquid = np.isin(product_liquidity, ILLIQUID)
+    horizon_points = np.where((long_term & illiquid) | (short_term & (product_liquidity == HIGH_LIQUIDITY)), 0.2, 0.1)
+
+    points = 0.5 + risk_points
+    points = points + age_points
+    points = points + income_points
+    return points + horizon_points
+
+
+def top_products(points, priority, k):
+    """(positions, points) of each user's k best products, best first.
+
+    Products are ranked by points, ties broken by priority (lower first,
+    unique per product). argpartition finds the k best without sorting the
+    whole catalog; only those k are then sorted.
+    """
+    n_products = points.shape[1]
+    k = min(k, n_products)
+    if k == 0:
+        return np.empty((len(points), 0), dtype=np.intp), np.empty((len(points), 0))
+
+    # One integer key per product: points first, then the inverted priority
+    keys = np.rint(points * POINT_SCALE).astype(np.int64) * n_products + (n_products - 1 - priority)
+    if k < n_products:
+        candidates = np.argpartition(-keys, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n_products), keys.shape)
+    order = np.argsort(-np.take_along_axis(keys, candidates, axis=1), axis=1)
+    positions = np.take_along_axis(candidates, order, axis=1)
+    return positions, np.take_along_axis(points, positions, axis=1)
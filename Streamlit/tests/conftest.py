@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ENGINE_DIR)
+sys.path.insert(0, os.path.join(ENGINE_DIR, "benchmarks"))
+# The engine resolves deployment/ and the catalog relative to the Streamlit folder
+os.chdir(ENGINE_DIR)
+
+from profiles import generate_profiles
+
+
+@pytest.fixture(scope="session")
+def profiles():
+    return generate_profiles(200, seed=7)
+
+
+@pytest.fixture(scope="session")
+def sklearn_engine():
+    """Engine scoring the sklearn pipelines (not the compiled copies) on the low-latency path"""
+    from Investment_System import InvestmentRecommendationSystem
+    return InvestmentRecommendationSystem(low_latency=True, use_compiled=False)
+
+
+@pytest.fixture(scope="session")
+def deployment_pipelines():
+    """The bundle in deployment/investment_model_pipelines.pkl: {model name: {'pipeline': ...}}"""
+    import joblib
+    return joblib.load(os.path.join("deployment", "investment_model_pipelines.pkl"))
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """Engine as the API runs it: compiled models on the low-latency path, no cache"""
+    from Investment_System import InvestmentRecommendationSystem
+    return InvestmentRecommendationSystem(low_latency=True)
@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+
+@pytest.fixture(scope="module")
+def api():
+    import api
+    return api
+
+
+class Client:
+    """Synchronous calls into the app over an in-process ASGI transport.
+
+    The app's shutdown handler is never run, so the module's inference pool
+    stays open for the other tests.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def request(self, method, path, **kwargs):
+        async def send():
+            transport = httpx.ASGITransport(app=self.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.request(method, path, **kwargs)
+        return asyncio.run(send())
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+
+@pytest.fixture
+def client(api):
+    return Client(api.app)
+
+
+@pytest.fixture
+def profiling(api, monkeypatch):
+    monkeypatch.setattr(api, 'PROFILING_ENABLED', True)
+    engine = api.inference_pool.engine
+    if engine is None:
+        pytest.skip("Profiled calls only reach the engine object on a thread pool")
+    predict = engine.get_model_prediction
+
+    def slow_prediction(user_data):
+        # Long enough for the sampler to see it, and only reached when the cache is bypassed
+        time.sleep(0.02)
+        return predict(user_data)
+
+    monkeypatch.setattr(engine, 'get_model_prediction', slow_prediction)
+
+
+def test_profiles_are_hidden_unless_enabled(api, client, monkeypatch):
+    monkeypatch.setattr(api, 'PROFILING_ENABLED', False)
+    assert client.get("/debug/profiles").status_code == 404
+
+
+def test_repeated_profiled_request_is_scored_and_listed(api, client, profiling, profiles):
+    user_data = dict(profiles[0], name="Profiled")
+    profile_ids = []
+    for _ in range(2):
+        response = client.post("/recommendations", json=user_data, headers={"X-Profile": "1"})
+        assert response.status_code == 200
+        profile_ids.append(response.headers["X-Profile-Id"])
+
+    listed = {summary['id']: summary for summary in client.get("/debug/profiles").json()['profiles']}
+    for profile_id in profile_ids:
+        # The second call would be a cache hit with nothing to sample if the cache were used
+        assert listed[profile_id]['samples'] > 0
+        assert listed[profile_id]['trigger'] == "header"
+        stacks = client.get(f"/debug/profiles/{profile_id}")
+        assert stacks.status_code == 200 and "slow_prediction" in stacks.text
@@ -0,0 +1,132 @@
+import random
+
+import pandas as pd
+import pytest
+
+from bulk_score import (
+    _PartMerger, _input_columns, bulk_score, bulk_score_parallel, plan_shards, read_chunks, result_columns,
+    to_profiles
+)
+
+ROWS = 57
+
+
+@pytest.fixture(scope="module")
+def survey():
+    """FinAccess-style rows with varying line lengths, so shard cuts fall mid-line"""
+    rng = random.Random(11)
+    return pd.DataFrame({
+        'respondent': [f"r{i:03d}" for i in range(ROWS)],
+        'age': [rng.randint(18, 80) for _ in range(ROWS)],
+        'household_size': [rng.randint(1, 9) for _ in range(ROWS)],
+        'monthly income': [rng.choice([900, 15000, 48000, 250000]) for _ in range(ROWS)],
+        'monthly_expenditure': [rng.randint(500, 90000) for _ in range(ROWS)],
+        'location_type': [rng.choice(['URBAN', 'rural', 'Semi-Urban']) for _ in range(ROWS)],
+    })
+
+
+@pytest.fixture(scope="module", params=["csv", "jsonl", "parquet"])
+def survey_file(request, survey, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("bulk") / f"survey.{request.param}")
+    if request.param == "csv":
+        survey.to_csv(path, index=False)
+    elif request.param == "jsonl":
+        survey.to_json(path, orient="records", lines=True)
+    else:
+        survey.to_parquet(path, row_group_size=8, index=False)
+    return path
+
+
+def shard_profiles(path, shard, chunk_size=10):
+    chunks = read_chunks(path, _input_columns("finaccess", None), chunk_size, shard)
+    return list(to_profiles(chunks, first_row=shard['first_row'] if shard else 0))
+
+
+@pytest.mark.parametrize("n_shards", [1, 3, 7])
+def test_shards_are_line_aligned_and_cover_the_file(survey_file, n_shards):
+    shards = plan_shards(survey_file, n_shards)
+    assert 1 <= len(shards) <= n_shards
+    assert [shard['index'] for shard in shards] == list(range(len(shards)))
+    if survey_file.endswith(".parquet"):
+        assert sum((shard['row_groups'] for shard in shards), []) == list(range(8))
+        return
+
+    with open(survey_file, "rb") as f:
+        data = f.read()
+    header = len(data.split(b"\n", 1)[0]) + 1 if survey_file.endswith(".csv") else 0
+    assert shards[0]['start'] == header and shards[-1]['end'] == len(data)
+    for shard, following in zip(shards, shards[1:]):
+        assert shard['end'] == following['start']
+        assert data[following['start'] - 1:following['start']] == b"\n"
+
+
+@pytest.mark.parametrize("n_shards", [3, 7])
+def test_shards_number_rows_as_the_whole_file(survey_file, survey, n_shards):
+    whole = shard_profiles(survey_file, None)
+    sharded = [chunk for shard in plan_shards(survey_file, n_shards) for chunk in shard_profiles(survey_file, shard)]
+
+    ids = [row_id for chunk_ids, _ in sharded for row_id in chunk_ids]
+    assert ids == list(range(ROWS))
+    pd.testing.assert_frame_equal(pd.concat([profiles for _, profiles in sharded], ignore_index=True),
+                                  pd.concat([profiles for _, profiles in whole], ignore_index=True))
+
+
+def test_merged_csv_parts_keep_one_header(tmp_path):
+    parts = []
+    for index, rows in enumerate([[1, 2], [3], [4, 5]]):
+        part = tmp_path / f"part-{index}.csv"
+        pd.DataFrame({'id': rows, 'user_segment': ['x'] * len(rows)}).to_csv(part, index=False)
+        parts.append(str(part))
+
+    merger = _PartMerger(str(tmp_path / "merged.csv"))
+    for part in parts:
+        merger.append(part)
+    merger.close()
+
+    with open(tmp_path / "merged.csv") as f:
+        assert f.read().splitlines() == ["id,user_segment", "1,x", "2,x", "3,x", "4,x", "5,x"]
+
+
+def test_sharded_scoring_matches_one_pass(engine, tmp_path):
+    survey_path = tmp_path / "survey.csv"
+    pd.DataFrame({'respondent': range(30), 'age': range(20, 50), 'monthly income': [20000] * 15 + [90000] * 15,
+                  'location_type': ['URBAN', 'rural'] * 15}).to_csv(survey_path, index=False)
+
+    bulk_score(engine, str(survey_path), str(tmp_path / "whole.csv"), chunk_size=7, top_n=3, verbose=False)
+    merger = _PartMerger(str(tmp_path / "merged.csv"))
+    for shard in plan_shards(str(survey_path), 4):
+        part = str(tmp_path / f"part-{shard['index']}.csv")
+        bulk_score(engine, str(survey_path), part, chunk_size=7, top_n=3, shard=shard, verbose=False)
+        merger.append(part)
+    merger.close()
+
+    whole = pd.read_csv(tmp_path / "whole.csv")
+    assert list(whole['id']) == list(range(30))
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "merged.csv"), whole)
+
+
+@pytest.mark.parametrize("input_name,content", [("empty.csv", ""), ("header.csv", "age,monthly income\n"),
+                                                ("empty.jsonl", "")])
+@pytest.mark.parametrize("output_name", ["out.csv", "out.parquet", "out.jsonl"])
+def test_empty_input_still_writes_an_output(engine, tmp_path, input_name, content, output_name):
+    input_path, output_path = tmp_path / input_name, tmp_path / output_name
+    input_path.write_text(content)
+
+    assert bulk_score(engine, str(input_path), str(output_path), top_n=2, verbose=False) == 0
+    if output_name.endswith(".csv"):
+        assert list(pd.read_csv(output_path).columns) == result_columns(2)
+    elif output_name.endswith(".parquet"):
+        frame = pd.read_parquet(output_path)
+        assert len(frame) == 0 and list(frame.columns) == result_columns(2)
+    else:
+        assert output_path.read_text() == ""
+
+
+def test_empty_input_still_writes_an_output_in_parallel(tmp_path):
+    input_path, output_path = tmp_path / "header.csv", tmp_path / "out.csv"
+    input_path.write_text("age,monthly income\n")
+    # No shards to score, so no worker process is started
+    assert bulk_score_parallel(str(input_path), str(output_path), workers=2, top_n=2) == 0
+    assert list(pd.read_csv(output_path).columns) == result_columns(2)
+    # The part folder is removed
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["header.csv", "out.csv"]
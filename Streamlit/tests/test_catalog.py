@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+
+import pytest
+
+from catalog import CatalogSnapshot, CatalogStore
+
+
+def product(risk_level):
+    return {'description': 'Test product', 'risk_level': risk_level,
+            'expected_return': '5-8%', 'liquidity': 'High', 'pros': ['Pro'], 'cons': ['Con']}
+
+
+def write_catalog(path, products, mtime_ns):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'products': products}, f)
+    # Explicit mtimes: two writes within the filesystem's timestamp resolution would look unchanged
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def catalog_file(tmp_path):
+    path = str(tmp_path / 'products.json')
+    write_catalog(path, {'Bonds': product('Low')}, 1_000_000_000)
+    return path
+
+
+def test_changed_mtime_loads_a_new_generation(catalog_file):
+    store = CatalogStore(catalog_file, poll_interval=0)
+    first = store.current()
+    assert store.current() is first and first.generation == 0
+
+    write_catalog(catalog_file, {'Bonds': product('Low'), 'Stocks': product('High')}, 2_000_000_000)
+    snapshot = store.current()
+    assert snapshot.generation == 1 and store.generation == 1
+    assert set(snapshot.investment_products) == {'Bonds', 'Stocks'}
+    assert store.current() is snapshot
+
+
+def test_broken_file_keeps_the_old_snapshot_and_is_loaded_once(catalog_file, monkeypatch):
+    store = CatalogStore(catalog_file, poll_interval=0)
+    first = store.current()
+    loads = []
+    from_file = CatalogSnapshot.from_file.__func__
+
+    def counting_from_file(cls, path, generation=0):
+        loads.append(path)
+        return from_file(cls, path, generation)
+
+    monkeypatch.setattr(CatalogSnapshot, 'from_file', classmethod(counting_from_file))
+    with open(catalog_file, 'w', encoding='utf-8') as f:
+        f.write('{"products": ')
+    os.utime(catalog_file, ns=(2_000_000_000, 2_000_000_000))
+
+    for _ in range(5):
+        assert store.current() is first
+    assert len(loads) == 1
+
+    write_catalog(catalog_file, {'Stocks': product('High')}, 3_000_000_000)
+    assert set(store.current().investment_products) == {'Stocks'}
+    assert len(loads) == 2
+
+
+def test_current_does_not_wait_for_a_reload(catalog_file, monkeypatch):
+    store = CatalogStore(catalog_file, poll_interval=0)
+    first = store.current()
+    loading, release = threading.Event(), threading.Event()
+    from_file = CatalogSnapshot.from_file.__func__
+
+    def slow_from_file(cls, path, generation=0):
+        loading.set()
+        release.wait(5)
+        return from_file(cls, path, generation)
+
+    monkeypatch.setattr(CatalogSnapshot, 'from_file', classmethod(slow_from_file))
+    write_catalog(catalog_file, {'Stocks': product('High')}, 2_000_000_000)
+    reloader = threading.Thread(target=store.current)
+    reloader.start()
+    try:
+        assert loading.wait(5)
+        # The reload is stuck compiling; other callers keep the old snapshot meanwhile
+        results = []
+        readers = [threading.Thread(target=lambda: results.append(store.current())) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join(1)
+        assert not any(reader.is_alive() for reader in readers)
+        assert results == [first] * 4
+    finally:
+        release.set()
+        reloader.join(5)
+    assert store.current().generation == 1
+
+
+def test_shared_returns_one_store_per_path(catalog_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(CatalogStore, '_shared', {})
+    other_file = str(tmp_path / 'other.json')
+    write_catalog(other_file, {'Stocks': product('High')}, 1_000_000_000)
+
+    store = CatalogStore.shared(catalog_file)
+    monkeypatch.chdir(tmp_path)
+    assert CatalogStore.shared(os.path.basename(catalog_file)) is store
+    assert CatalogStore.shared(other_file) is not store
+    assert set(CatalogStore.shared(other_file).current().investment_products) == {'Stocks'}
+
+
+def test_invalid_catalog_is_rejected():
+    with pytest.raises(ValueError):
+        CatalogSnapshot({'products': {'Bonds': {'description': 'No risk level'}}})
@@ -0,0 +1,46 @@
+import json
+import os
+
+import pytest
+
+from compiled_model import (EXPORT_TOLERANCE, MANIFEST_FILE, CompiledModel, compile_model,
+                            verify_compiled)
+from feature_builder import FeatureBuilder
+
+COMPILED_FOLDER = os.path.join("deployment", "compiled")
+
+
+@pytest.fixture(scope="module")
+def check_frames(deployment_pipelines, profiles):
+    """Each pipeline's verification matrix, built from the generated profiles"""
+    return {name: FeatureBuilder().build_frame(profiles, columns=list(entry['pipeline'].feature_names_in_))
+            for name, entry in deployment_pipelines.items()}
+
+
+def test_compiled_pipelines_match_predict_proba(deployment_pipelines, check_frames):
+    for name, entry in deployment_pipelines.items():
+        gap = verify_compiled(compile_model(entry['pipeline']), entry['pipeline'], check_frames[name])
+        assert gap <= EXPORT_TOLERANCE, name
+
+
+def test_exported_models_match_predict_proba(deployment_pipelines, check_frames):
+    with open(os.path.join(COMPILED_FOLDER, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    assert set(manifest['models']) == set(deployment_pipelines)
+    for name, entry in manifest['models'].items():
+        compiled = CompiledModel.load(os.path.join(COMPILED_FOLDER, entry['file']), mmap_mode='r')
+        verify_compiled(compiled, deployment_pipelines[name]['pipeline'], check_frames[name])
+
+
+def test_verify_compiled_rejects_a_gap(deployment_pipelines, check_frames):
+    name, entry = next(iter(deployment_pipelines.items()))
+    compiled = compile_model(entry['pipeline'])
+
+    class Shifted:
+        meta = compiled.meta
+
+        def predict_proba(self, X):
+            return compiled.predict_proba(X) + 1e-6
+
+    with pytest.raises(ValueError):
+        verify_compiled(Shifted(), entry['pipeline'], check_frames[name])
@@ -0,0 +1,70 @@
+import threading
+
+import numpy as np
+
+from ensemble import ModelEnsemble
+
+
+class ConstantModel:
+    def __init__(self, p):
+        self.p = p
+
+    def predict_proba(self, X):
+        return np.column_stack([1 - np.full(len(X), self.p), np.full(len(X), self.p)])
+
+
+def make_ensemble(gate_p=0.5):
+    pipelines = {
+        'Logistic Regression': {'pipeline': ConstantModel(gate_p)},
+        'Random Forest': {'pipeline': ConstantModel(0.2)},
+        'Decision Tree': {'pipeline': ConstantModel(0.8)},
+    }
+    return ModelEnsemble(pipelines, gate_model='Logistic Regression', gate_threshold=0.9)
+
+
+def ensemble_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith("ensemble")]
+
+
+def test_shutdown_releases_member_threads():
+    before = len(ensemble_threads())
+    for _ in range(5):
+        ensemble = make_ensemble()
+        ensemble.predict_proba(np.zeros((4, 2)))
+        ensemble.shutdown(wait=True)
+    assert len(ensemble_threads()) == before
+
+
+def test_shut_down_ensemble_still_scores():
+    ensemble = make_ensemble()
+    expected = ensemble.predict_proba(np.zeros((4, 2)))
+    ensemble.shutdown(wait=True)
+    assert np.allclose(ensemble.predict_proba(np.zeros((4, 2))), expected)
+
+
+def test_row_counts_are_exact_across_threads():
+    ensemble = make_ensemble()
+    X = np.zeros((3, 2))
+
+    def score():
+        for _ in range(200):
+            ensemble.predict_proba(X)
+
+    threads = [threading.Thread(target=score) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ensemble.shutdown()
+    assert ensemble.describe()['blended_rows'] == 8 * 200 * 3
+    assert ensemble.describe()['gated_rows'] == 0
+
+
+def test_engine_reload_replaces_the_ensemble_pool():
+    from Investment_System import InvestmentRecommendationSystem
+    system = InvestmentRecommendationSystem(low_latency=True, use_ensemble=True)
+    first = system.ensemble
+    assert first is not None
+    system.load_compiled_models()
+    assert system.ensemble is not first
+    assert first._executor._shutdown
@@ -0,0 +1,30 @@
+import warnings
+
+from Investment_System import FAST_PATH_TOLERANCE
+
+
+def test_pipelines_are_sklearn(sklearn_engine):
+    assert sklearn_engine.model_pipelines
+    for model_entry in sklearn_engine.model_pipelines.values():
+        assert type(model_entry['pipeline']).__name__ == 'Pipeline'
+
+
+def test_fast_path_matches_dataframe_path(sklearn_engine, profiles):
+    gaps = sklearn_engine.check_fast_path_parity(profiles)
+    assert set(gaps) == set(sklearn_engine.model_pipelines)
+    for model_name, (dtype, gap) in gaps.items():
+        assert gap <= FAST_PATH_TOLERANCE, f"{model_name} ({dtype}) differs by {gap:.2e}"
+
+
+def test_loader_enables_fast_path(sklearn_engine):
+    assert sklearn_engine.fast_scorer is not None
+
+
+def test_fast_path_skips_sklearn_validation(sklearn_engine, profiles):
+    # Fitted statistics are applied to bare arrays; sklearn's feature-name check would warn per row
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        for model_entry in sklearn_engine.model_pipelines.values():
+            scorer, _ = sklearn_engine._select_fast_scorer(model_entry['pipeline'])
+            for user_data in profiles[:20]:
+                scorer.predict_proba(user_data)
@@ -0,0 +1,64 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_builder import FeatureBuilder, MODEL_FEATURES
+
+PROFILE_FIELDS = [
+    'age', 'monthly_income', 'monthly_expenses', 'current_savings', 'debt_amount', 'dependents',
+    'household_size', 'location', 'education', 'employment', 'emergency_fund', 'investment_experience'
+]
+
+
+def reference_features(engine, user_data):
+    """The engine's DataFrame path: _map_user_data_to_model_features (row_values) plus _add_missing_features"""
+    mapped = pd.DataFrame([engine._map_user_data_to_model_features(user_data)])
+    return engine._add_missing_features(mapped)[MODEL_FEATURES].to_numpy(dtype=float)[0]
+
+
+def with_gaps(profiles, gap, seed=3):
+    """Copies of profiles with three random fields each removed (gap='absent') or set to None"""
+    rng = random.Random(seed)
+    result = []
+    for profile in profiles:
+        profile = dict(profile)
+        for field in rng.sample(PROFILE_FIELDS, 3):
+            if gap == 'absent':
+                del profile[field]
+            else:
+                profile[field] = None
+        result.append(profile)
+    return result
+
+
+@pytest.fixture(params=['complete', 'absent', 'none'])
+def profile_set(request, profiles):
+    return profiles if request.param == 'complete' else with_gaps(profiles, request.param)
+
+
+def test_build_matches_scalar_mapping(sklearn_engine, profile_set):
+    expected = np.vstack([reference_features(sklearn_engine, user_data) for user_data in profile_set])
+    assert np.array_equal(FeatureBuilder().build(profile_set), expected)
+
+
+def test_build_accepts_a_dataframe(profile_set):
+    builder = FeatureBuilder()
+    assert np.array_equal(builder.build(pd.DataFrame(profile_set)), builder.build(profile_set))
+
+
+def test_row_values_match_build(profile_set):
+    # The two implementations of the mapping: scalar (row_values) and columnar (_compute)
+    builder = FeatureBuilder()
+    expected = builder.build(profile_set, columns=MODEL_FEATURES)
+    for user_data, expected_row in zip(profile_set, expected):
+        row = np.array(builder.row_values(user_data), dtype=float)
+        assert np.array_equal(row, expected_row), user_data
+
+
+def test_none_fields_count_as_absent(profiles):
+    builder = FeatureBuilder()
+    with_none = with_gaps(profiles, 'none')
+    absent = [{key: value for key, value in user_data.items() if value is not None} for user_data in with_none]
+    assert np.array_equal(builder.build(with_none), builder.build(absent))
@@ -0,0 +1,69 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from inference_pool import InferencePool, PoolSaturated
+
+
+class StubEngine:
+    """Engine stand-in: blocks on demand and reports which process answered"""
+
+    def __init__(self, offset=0):
+        self.offset = offset
+        self.release = threading.Event()
+
+    def block(self):
+        self.release.wait(5)
+        return "released"
+
+    def describe(self, value):
+        return value + self.offset, os.getpid()
+
+
+def test_full_pool_refuses_instead_of_queueing():
+    engine = StubEngine()
+    pool = InferencePool(engine, kind="thread", max_workers=1, max_pending=1)
+
+    async def main():
+        blocked = asyncio.ensure_future(pool.run("block"))
+        while pool.pending == 0:
+            await asyncio.sleep(0)
+        with pytest.raises(PoolSaturated):
+            await pool.run("describe", 1)
+        engine.release.set()
+        assert await asyncio.wait_for(blocked, timeout=5) == "released"
+        # Give the done callback its turn on the loop, then the slot is free again
+        while pool.pending:
+            await asyncio.sleep(0)
+        return await pool.run("describe", 1)
+
+    try:
+        assert asyncio.run(main()) == (1, os.getpid())
+        stats = pool.stats()
+        assert stats['rejected'] == 1 and stats['completed'] == 2 and stats['pending'] == 0
+    finally:
+        engine.release.set()
+        pool.shutdown()
+
+
+def test_process_pool_builds_an_engine_per_worker():
+    pool = InferencePool(StubEngine(), kind="process", max_workers=1, engine_kwargs={'offset': 10})
+
+    async def main():
+        result = await pool.run("describe", 5)
+        (profiled, _), profile = await pool.run_profiled(1.0, "describe", 1)
+        return result, profiled, profile
+
+    try:
+        (value, pid), profiled, profile = asyncio.run(main())
+        assert value == 15 and pid != os.getpid()
+        assert profiled == 11 and {'duration_ms', 'samples', 'stacks'} <= set(profile)
+    finally:
+        pool.shutdown()
+
+
+def test_unknown_pool_kind_is_rejected():
+    with pytest.raises(ValueError):
+        InferencePool(StubEngine(), kind="fiber")
@@ -0,0 +1,72 @@
+import threading
+
+from metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+def run_threads(target, count):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_counter_adds_up_across_threads():
+    counter = Counter("requests_total", "Requests", ("route",))
+    counter.inc("a")
+    run_threads(lambda: [counter.inc("a"), counter.inc("b", amount=2)], 8)
+    assert counter.value("a") == 9
+    assert counter.value("b") == 16
+    assert counter.value("missing") == 0
+
+
+def test_finished_threads_are_folded_into_the_base():
+    counter = Counter("churn_total", "Counts from short-lived threads")
+    histogram = Histogram("churn_seconds", "Observations from short-lived threads")
+    run_threads(lambda: [counter.inc(), histogram.observe(0.002)], 50)
+    assert counter.value() == 50 and histogram.snapshot()['count'] == 50
+    assert not counter._shards and not histogram._shards
+
+
+def test_gauge_sums_per_thread_deltas():
+    gauge = Gauge("in_flight", "In flight")
+    run_threads(lambda: gauge.inc(amount=3), 4)
+    gauge.dec(amount=5)
+    assert gauge.value() == 7
+
+
+def test_histogram_buckets_sum_and_count():
+    histogram = Histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, "scoring")
+    snapshot = histogram.snapshot("scoring")
+    assert snapshot['buckets'] == {'<=0.1': 2, '<=1': 1, '>1': 1}
+    assert snapshot['count'] == 4 and abs(snapshot['mean'] - 2.65 / 4) < 1e-12
+    assert histogram.snapshot("other")['count'] == 0
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    counter = registry.counter("fallbacks_total", "Fallbacks served", ("kind",))
+    histogram = registry.histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0))
+    counter.inc('say "hi"\n')
+    histogram.observe(0.5, "scoring")
+    registry.add_collector(lambda: [("pool_size", "gauge", "Workers", [({"kind": "thread"}, 2)])])
+    # Registering the same name again returns the existing metric
+    assert registry.counter("fallbacks_total", "Fallbacks served", ("kind",)) is counter
+
+    assert registry.render() == "\n".join([
+        "# HELP fallbacks_total Fallbacks served",
+        "# TYPE fallbacks_total counter",
+        'fallbacks_total{kind="say \\"hi\\"\\n"} 1',
+        "# HELP stage_seconds Stage time",
+        "# TYPE stage_seconds histogram",
+        'stage_seconds_bucket{stage="scoring",le="0.1"} 0',
+        'stage_seconds_bucket{stage="scoring",le="1.0"} 1',
+        'stage_seconds_bucket{stage="scoring",le="+Inf"} 1',
+        'stage_seconds_sum{stage="scoring"} 0.5',
+        'stage_seconds_count{stage="scoring"} 1',
+        "# HELP pool_size Workers",
+        "# TYPE pool_size gauge",
+        'pool_size{kind="thread"} 2',
+    ]) + "\n"
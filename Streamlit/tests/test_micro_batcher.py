@@ -0,0 +1,71 @@
+import asyncio
+
+from micro_batcher import MicroBatcher
+
+
+class RecordingScorer:
+    """score_batch stand-in: doubles each item and records the batches it was given"""
+
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        await asyncio.sleep(0)
+        if self.fail_on is not None and self.fail_on in items:
+            raise ValueError(f"cannot score {self.fail_on}")
+        return [item * 2 for item in items]
+
+
+def test_lone_request_is_dispatched_without_waiting():
+    scorer = RecordingScorer()
+
+    async def main():
+        # With an hour-long window, only immediate dispatch can answer within the timeout
+        batcher = MicroBatcher(scorer, max_batch_size=32, max_wait_ms=3_600_000)
+        return await asyncio.wait_for(batcher.submit(21), timeout=1)
+
+    assert asyncio.run(main()) == 42
+    assert scorer.batches == [[21]]
+
+
+def test_concurrent_submits_coalesce_into_one_batch():
+    scorer = RecordingScorer()
+
+    async def main():
+        batcher = MicroBatcher(scorer, max_batch_size=4, max_wait_ms=3_600_000)
+        # The first goes out alone; the next four wait for it and fill one batch
+        results = await asyncio.wait_for(asyncio.gather(*[batcher.submit(item) for item in range(5)]), timeout=1)
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(main())
+    assert results == [0, 2, 4, 6, 8]
+    assert scorer.batches == [[0], [1, 2, 3, 4]]
+    assert stats['batch_size']['count'] == 2 and stats['waiting'] == 0
+
+
+def test_partial_batch_is_flushed_after_max_wait():
+    scorer = RecordingScorer()
+
+    async def main():
+        batcher = MicroBatcher(scorer, max_batch_size=32, max_wait_ms=5)
+        return await asyncio.wait_for(asyncio.gather(*[batcher.submit(item) for item in range(3)]), timeout=1)
+
+    assert asyncio.run(main()) == [0, 2, 4]
+    assert scorer.batches == [[0], [1, 2]]
+
+
+def test_failing_batch_raises_in_every_waiter():
+    scorer = RecordingScorer(fail_on=2)
+
+    async def main():
+        batcher = MicroBatcher(scorer, max_batch_size=3, max_wait_ms=3_600_000)
+        return await asyncio.wait_for(
+            asyncio.gather(*[batcher.submit(item) for item in range(4)], return_exceptions=True), timeout=1)
+
+    first, *rest = asyncio.run(main())
+    assert first == 0
+    assert scorer.batches == [[0], [1, 2, 3]]
+    assert len(rest) == 3
+    assert all(isinstance(result, ValueError) and str(result) == "cannot score 2" for result in rest)
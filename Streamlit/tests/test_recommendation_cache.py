@@ -0,0 +1,126 @@
+import pytest
+
+import recommendation_cache
+from recommendation_cache import RecommendationCache, profile_fingerprint
+
+
+class FakeClock:
+    """Stands in for the time module in recommendation_cache"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(recommendation_cache, 'time', clock)
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = RecommendationCache(ttl=10)
+    cache.put('key', {'value': 1})
+    clock.now += 9.9
+    assert cache.get('key') == {'value': 1}
+    clock.now += 0.1
+    assert cache.get('key') is None
+    assert cache.stats()['expirations'] == 1 and cache.stats()['size'] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RecommendationCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_new_generation_clears_and_stale_puts_are_dropped():
+    cache = RecommendationCache()
+    # Lookups set the current generation; the engine always looks up before it stores
+    assert cache.get('key', generation=1) is None
+    cache.put('key', 1, generation=1)
+    assert cache.get('key', generation=1) == 1
+    assert cache.get('key', generation=2) is None
+    assert cache.stats()['invalidations'] == 1
+    # Computed under generation 1, stored after generation 2 took over
+    cache.put('key', 1, generation=1)
+    assert cache.stats()['size'] == 0
+
+
+def test_cached_values_are_isolated_copies():
+    cache = RecommendationCache()
+    value = {'recommendations': [{'name': 'Bonds'}]}
+    cache.put('key', value)
+    value['recommendations'].append({'name': 'Changed after put'})
+    first = cache.get('key')
+    first['recommendations'][0]['name'] = 'Changed after get'
+    assert cache.get('key') == {'recommendations': [{'name': 'Bonds'}]}
+
+
+def test_fingerprint_ignores_field_order_extra_fields_and_number_type(profiles):
+    user_data = dict(profiles[0], age=30, monthly_income=45000)
+    reordered = dict(reversed(list(user_data.items())))
+    as_floats = dict(user_data, age=30.0, monthly_income=45000.0)
+    with_extra = dict(user_data, name='Someone', investment_amount=1000)
+    key = profile_fingerprint(user_data)
+    assert profile_fingerprint(reordered) == profile_fingerprint(as_floats) == profile_fingerprint(with_extra) == key
+    assert profile_fingerprint(dict(user_data, age=31)) != key
+
+
+def test_fingerprint_treats_none_as_absent(profiles):
+    user_data = dict(profiles[0])
+    without = {key: value for key, value in user_data.items() if key != 'education'}
+    assert profile_fingerprint(dict(user_data, education=None)) == profile_fingerprint(without)
+
+
+def test_buckets_share_entries(profiles):
+    cache = RecommendationCache(income_bucket=10000, age_bucket=5)
+    user_data = dict(profiles[0], age=31, monthly_income=42000)
+    assert cache.fingerprint(user_data) == cache.fingerprint(dict(user_data, age=34, monthly_income=49999))
+    assert cache.fingerprint(user_data) != cache.fingerprint(dict(user_data, age=35))
+
+
+class BumpedCatalog:
+    """The engine's catalog, reporting the next generation (as after a reload)"""
+
+    def __init__(self, store):
+        self.snapshot = store.current()
+
+    def current(self):
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self.snapshot, name)
+
+    @property
+    def generation(self):
+        return self.snapshot.generation + 1
+
+
+def test_engine_cache_follows_model_and_catalog_changes(profiles, deployment_pipelines, monkeypatch):
+    from Investment_System import InvestmentRecommendationSystem
+
+    cache = RecommendationCache()
+    system = InvestmentRecommendationSystem(low_latency=True, recommendation_cache=cache)
+    user_data = profiles[0]
+
+    first = system.get_recommendations(user_data=user_data)
+    assert system.get_recommendations(user_data=user_data) == first
+    assert cache.hits == 1
+
+    model_name = next(iter(deployment_pipelines))
+    system.set_model(model_name, deployment_pipelines[model_name]['pipeline'])
+    system.get_recommendations(user_data=user_data)
+    assert cache.hits == 1 and cache.stats()['invalidations'] == 1
+
+    monkeypatch.setattr(system, 'catalog', BumpedCatalog(system.catalog))
+    system.get_recommendations(user_data=user_data)
+    assert cache.hits == 1 and cache.stats()['invalidations'] == 2
@@ -0,0 +1,100 @@
+import random
+
+import pandas as pd
+import pytest
+
+GAP_FIELDS = ['age', 'monthly_income', 'investment_horizon', 'risk_tolerance', 'investment_experience', 'location']
+
+
+@pytest.fixture(scope="module")
+def mixed_profiles(profiles):
+    """Generated profiles; the second half each miss two fields (removed or None)"""
+    rng = random.Random(5)
+    result = [dict(profile) for profile in profiles]
+    for profile in result[len(result) // 2:]:
+        for field in rng.sample(GAP_FIELDS, 2):
+            if rng.random() < 0.5:
+                profile[field] = None
+            else:
+                del profile[field]
+    return result
+
+
+def ranking(products):
+    return [(product['name'], round(product['suitability_score'], 9)) for product in products]
+
+
+def test_single_and_batch_rankings_match(engine, mixed_profiles):
+    batch = engine.get_batch_recommendations(pd.DataFrame(mixed_profiles))
+    assert len(batch) == len(mixed_profiles)
+    for user_data, batch_result in zip(mixed_profiles, batch):
+        single = engine.get_recommendations(user_data=user_data)
+        assert single['user_segment'] == batch_result['user_segment'], user_data
+        assert single['risk_tolerance'] == batch_result['risk_tolerance'], user_data
+        assert ranking(single['detailed_products']) == ranking(batch_result['recommendations']), user_data
+        assert single['investment_probability'] == pytest.approx(batch_result['investment_probability'], abs=1e-9)
+
+
+def test_risk_recommendations_name_the_ranked_products(engine, mixed_profiles):
+    for user_data in mixed_profiles:
+        result = engine.get_recommendations(user_data=user_data)
+        assert result['risk_recommendations'] == [product['name'] for product in result['detailed_products']]
+
+
+@pytest.mark.parametrize("batch_size", [10, 100])
+def test_batch_cache_follows_use_cache(profiles, batch_size):
+    from Investment_System import InvestmentRecommendationSystem
+    from recommendation_cache import RecommendationCache
+
+    cache = RecommendationCache()
+    system = InvestmentRecommendationSystem(low_latency=True, recommendation_cache=cache)
+    users = profiles[:batch_size]
+
+    system.get_batch_recommendations(users)
+    assert cache.stats()['size'] == 0 and cache.hits == cache.misses == 0
+
+    first = system.get_batch_recommendations(users, use_cache=True)
+    # One entry per profile, whichever path scored it
+    assert cache.stats()['size'] == batch_size
+    assert system.get_batch_recommendations(users, use_cache=True) == first
+    assert cache.hits == batch_size
+
+
+class SwappingCatalog:
+    """Catalog store stand-in whose snapshot is replaced once ranking has run"""
+
+    def __init__(self, snapshot, replacement):
+        self.snapshot, self.replacement = snapshot, replacement
+
+    def current(self):
+        return self.snapshot
+
+    @property
+    def generation(self):
+        return self.snapshot.generation
+
+
+def test_reload_between_ranking_and_display_keeps_one_snapshot(engine, profiles, monkeypatch):
+    from catalog import CatalogSnapshot
+
+    snapshot = engine.catalog.current()
+    # A smaller catalog reloaded after ranking: positions from the old one are out of range here
+    smaller = CatalogSnapshot({'products': {record.name: record.details() for record in snapshot.records[:2]}},
+                              generation=snapshot.generation + 1)
+    catalog = SwappingCatalog(snapshot, smaller)
+    rank_catalog = engine._rank_catalog
+
+    def rank_then_reload(*args, **kwargs):
+        ranked = rank_catalog(*args, **kwargs)
+        catalog.snapshot = catalog.replacement
+        return ranked
+
+    monkeypatch.setattr(engine, 'catalog', catalog)
+    monkeypatch.setattr(engine, '_rank_catalog', rank_then_reload)
+    names = set(snapshot.index.names)
+
+    batch = engine.get_batch_recommendations(pd.DataFrame(profiles[:20]))
+    catalog.snapshot = snapshot
+    single = engine.get_recommendations(user_data=dict(profiles[0], age=61))
+    for products in [result['recommendations'] for result in batch] + [single['detailed_products']]:
+        assert products and {product['name'] for product in products} <= names